@@ -5,9 +5,22 @@
 """
 
 from .exceptions import *
+from . import jsonlib
 from .dataclasses import *
 from .client import Client
+from .pool import ConnectionPool
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy
+from .cache import ExchangeInfoCache
+from .columnar import TickerSnapshot, CandleFrame
+from .orderbook import OrderBook
+from .quantizer import Quantizer
+from .store import CandleStore
+from .cursors import CursorStore
 from .binance import Binance
 from .bybit import ByBit
 from .kucoin import KuCoin
 from .bitfinex import Bitfinex
+from .aio import AsyncExchange, AsyncBinance, AsyncKuCoin, AsyncByBit, AsyncBitfinex
+from .streams import MarketStream, BinanceStream, ByBitStream, KuCoinStream, BitfinexStream
+from .streams import UserStream, BinanceUserStream, ByBitUserStream, KuCoinUserStream
@@ -0,0 +1,387 @@
+"""Asyncio transport for exchanges.
+
+Async classes reuse request signing and response parsing of the sync exchanges,
+only the transport is replaced with a shared aiohttp session, so a single event loop
+can keep thousands of requests in flight. Endpoints made of a single request return
+Exchange._call and are shared as they are, only endpoints making several requests
+are mirrored here.
+
+Requires aiohttp: pip install excrypt[async]
+
+    async with AsyncBinance() as client:
+        tickers = await client.get_tickers()
+"""
+import asyncio
+
+try:
+    import aiohttp
+except ImportError:  # optional dependency
+    aiohttp = None
+
+from .exchange import Exchange
+from .binance import Binance, PreparedOrder
+from .kucoin import KuCoin
+from .bybit import ByBit
+from .bitfinex import Bitfinex
+from .exceptions import *
+from . import jsonlib
+from .grid import build_grid
+
+
+class AsyncResponse:
+    """Minimal requests.Response replacement, so exchanges _handle_response can be reused."""
+
+    def __init__(self, status_code, content, headers):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return jsonlib.loads(self.content)
+
+
+class AsyncExchange(Exchange):
+    """
+    Base class for async exchanges.
+    Use it as the first base class together with a sync exchange class.
+    """
+
+    def __init__(self, *args, connections_limit=100, **kwargs):
+        if aiohttp is None:
+            raise ExchangeException("aiohttp is required for async exchanges")
+        self._CONNECTIONS_LIMIT = connections_limit
+        self._refresh_task = None  # background refresh of load_exchange_info
+        super().__init__(*args, **kwargs)
+
+    def _init_session(self):
+        # aiohttp session has to be created inside the running event loop
+        self._headers = {}
+        return None
+
+    def _init_proxies(self):
+        pass
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self._CONNECTIONS_LIMIT)
+            self._session = aiohttp.ClientSession(connector=connector, headers=self._headers)
+        return self._session
+
+    def _get_proxy(self):
+        if not self._PROXIES:
+            return None
+        return self._PROXIES.get('https') or self._PROXIES.get('http')
+
+    def update_headers(self, headers):
+        self._headers.update(headers)
+        if self._session is not None:
+            self._session.headers.update(headers)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def load_exchange_info(self, cache, background=True):
+        cached = cache.load(self._NAME, self._get_market())
+        if cached is None:
+            return await self._refresh_exchange_info(cache)
+
+        created, symbols_info = cached
+        self._restore_symbols_info(symbols_info)
+
+        if cache.is_expired(created):
+            if background:
+                # keep a reference, so the task is not garbage collected before it is done
+                self._refresh_task = asyncio.ensure_future(self._refresh_exchange_info(cache))
+            else:
+                await self._refresh_exchange_info(cache)
+
+        return self.symbols_info
+
+    async def _refresh_exchange_info(self, cache):
+        symbols_info = await self.get_exchange_info()
+        cache.save(self._NAME, self._get_market(), symbols_info)
+        return symbols_info
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _request(self, endpoint: str, method=None, signed=False, **kwargs):
+        retryable = self._is_retryable(endpoint, method, kwargs.get('params'))
+        attempt = 0
+        delay = None
+
+        while True:
+            try:
+                response = await self._send_request(endpoint, method, signed, dict(kwargs))
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError):
+                delay = self._get_retry_delay(retryable, endpoint, attempt, delay)
+                if delay is None:
+                    raise
+            else:
+                if not retryable or not self._RETRY_POLICY.is_retryable_status(response.status_code):
+                    return self._handle_response(response)
+                delay = self._get_retry_delay(retryable, endpoint, attempt, delay,
+                                              response.headers.get('Retry-After'))
+                if delay is None:
+                    return self._handle_response(response)
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _call(self, endpoint: str, method=None, signed=False, parse=None, **kwargs):
+        response = await self._request(endpoint=endpoint, method=method, signed=signed, **kwargs)
+        if parse is None:
+            return response
+        return parse(response)
+
+    async def _send_request(self, endpoint, method, signed, kwargs):
+        weight = self._get_request_weight(endpoint, kwargs.get('params'))
+        for rate_limiter in self._get_rate_limiters(endpoint):
+            await rate_limiter.acquire_async(weight)
+
+        method, uri, kwargs = self._prepare_request(endpoint, method, signed, kwargs)
+
+        # aiohttp accepts only string query values
+        params = kwargs.pop('params', None)
+        if params:
+            kwargs['params'] = {key: str(value) for key, value in params.items()}
+        kwargs['timeout'] = aiohttp.ClientTimeout(total=kwargs['timeout'])
+        kwargs.setdefault('proxy', self._get_proxy())
+
+        async with self._get_session().request(method, uri, **kwargs) as response:
+            content = await response.read()
+        response = AsyncResponse(response.status, content, response.headers)
+        self._handle_rate_limit(endpoint, response)
+        return response
+
+    async def get_candles_range(self, symbol, interval, start, end, max_workers=4):
+        windows = self._get_candles_windows(interval, start, end)
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def get_window(window):
+            async with semaphore:
+                return await self.get_candles(symbol, interval, start=window[0], end=window[1],
+                                              limit=self._CANDLES_LIMIT, as_frame=True)
+
+        frames = await asyncio.gather(*(get_window(window) for window in windows))
+        return self._merge_candle_frames(frames, start, end)
+
+    async def _get_paginated_data(self, endpoint, method, signed, params, page_key, position_key):
+        responses = []
+        async for response in self._iter_paginated_data(endpoint, method, signed, params, page_key, position_key,
+                                                         prefetch=False):
+            responses += response
+        return responses
+
+    async def _fetch_pages(self, endpoint, method, signed, params, page_key, pages, max_workers=None):
+        semaphore = asyncio.Semaphore(max_workers or self._PAGES_CONCURRENCY)
+
+        async def request(page):
+            async with semaphore:
+                return await self._request(endpoint, method, signed, params=dict(params, **{page_key: page}))
+
+        return await asyncio.gather(*(request(page) for page in pages))
+
+    async def get_quantizer(self, symbol):
+        if not self.symbols_info:
+            await self.get_exchange_info()
+        return super().get_quantizer(symbol)
+
+    async def build_grid(self, symbol, side, low, high, levels, quantity=None, quote_quantity=None,
+                         geometric=False):
+        prices, quantities = build_grid(await self.get_quantizer(symbol), side, low, high, levels, quantity,
+                                        quote_quantity, geometric)
+        return [{'symbol': symbol, 'side': side, 'quantity': quantity, 'price': price}
+                for price, quantity in zip(prices, quantities)]
+
+    async def create_grid(self, symbol, side, low, high, levels, quantity=None, quote_quantity=None,
+                          geometric=False, max_workers=None):
+        orders = await self.build_grid(symbol, side, low, high, levels, quantity, quote_quantity, geometric)
+        return await self.create_orders(orders, max_workers)
+
+    async def create_orders(self, orders, max_workers=None):
+        orders = list(orders)
+        batches = self._get_create_orders_batches(orders)
+        if batches is None:
+            return await self._map_orders(lambda order: self.create_order(**order), orders, max_workers)
+        return await self._run_batches(batches, len(orders), max_workers)
+
+    async def cancel_orders(self, orders, max_workers=None):
+        orders = list(orders)
+        batches = self._get_cancel_orders_batches(orders)
+        if batches is None:
+            return await self._map_orders(lambda order: self.cancel_order(**order), orders, max_workers)
+        return await self._run_batches(batches, len(orders), max_workers)
+
+    async def _map_orders(self, func, orders, max_workers=None):
+        semaphore = asyncio.Semaphore(max_workers or self._ORDERS_CONCURRENCY)
+
+        async def call(order):
+            async with semaphore:
+                try:
+                    return await func(order)
+                except ExchangeException as e:
+                    return e
+
+        return await asyncio.gather(*(call(order) for order in orders))
+
+    async def _run_batches(self, batches, count, max_workers=None):
+        results = [None] * count
+
+        async def run(batch):
+            indices, endpoint, method, params, parse = batch
+            try:
+                items = parse(await self._request(endpoint, method, True, params=params))
+            except ExchangeException as e:
+                items = [e] * len(indices)
+            for index, item in zip(indices, items):
+                results[index] = item
+
+        await self._map_orders(run, batches, max_workers)
+        return results
+
+    async def _iter_paginated_data(self, endpoint, method, signed, params, page_key, position_key, prefetch=True,
+                                   page_size=None):
+        def request(params):
+            coroutine = self._request(endpoint=endpoint, method=method, signed=signed, params=params)
+            return asyncio.ensure_future(coroutine) if prefetch else coroutine
+
+        pending = request(dict(params))
+        try:
+            while True:
+                response = await pending
+                pending = None
+                if not len(response):
+                    break
+                if page_size and len(response) < page_size:
+                    yield response
+                    break
+                params = dict(params)
+                params[page_key] = response[-1][position_key] + 1
+                if prefetch:
+                    pending = request(params)
+                yield response
+                if not prefetch:
+                    pending = request(params)
+        finally:
+            if pending is not None:
+                if prefetch:
+                    pending.cancel()
+                else:
+                    pending.close()
+
+
+class AsyncPreparedOrder(PreparedOrder):
+
+    __slots__ = ()
+
+    async def send(self, quantity, price=None):
+        exchange = self.exchange
+        for rate_limiter in exchange._get_rate_limiters(self.endpoint):
+            await rate_limiter.acquire_async(self.weight)
+
+        kwargs = dict(self._kwargs)
+        kwargs['timeout'] = aiohttp.ClientTimeout(total=kwargs['timeout'])
+        kwargs.setdefault('proxy', exchange._get_proxy())
+        async with exchange._get_session().post(self._sign(quantity, price), **kwargs) as response:
+            content = await response.read()
+        response = AsyncResponse(response.status, content, response.headers)
+        exchange._handle_rate_limit(self.endpoint, response)
+        return exchange._parse_order(exchange._handle_response(response))
+
+
+class AsyncBinance(AsyncExchange, Binance):
+
+    def prepare_order(self, symbol, side, type='LIMIT', time_in_force=None, stop_price=None):
+        return AsyncPreparedOrder(self, symbol, side, type, time_in_force, stop_price)
+
+    async def get_symbols(self, all=None):
+        if not self.symbols_info:
+            await self.get_exchange_info()
+        return self._filter_symbols(all)
+
+    async def _get_history(self, endpoint, params, page_key, position_key, parse=None):
+        if page_key:
+            response = await self._get_paginated_data(endpoint, 'get', True, params, page_key, position_key)
+            return response if parse is None else parse(response)
+        return await self._call(endpoint, signed=True, parse=parse, params=params)
+
+    async def _iter_history(self, endpoint, params, page_key, position_key):
+        if page_key:
+            async for response in self._iter_paginated_data(endpoint, 'get', True, params, page_key, position_key,
+                                                            page_size=params.get('limit')):
+                yield response
+        else:
+            yield await self._request(endpoint=endpoint, signed=True, params=params)
+
+    async def iter_orders(self, symbol: str, from_timestamp=None, from_order_id=None, parse=True):
+        endpoint = '/api/v3/allOrders'
+        params, page_key, position_key = self._get_history_request('iter_orders', symbol, from_timestamp,
+                                                                   from_order_id)
+
+        async for orders in self._iter_history(endpoint, params, page_key, position_key):
+            for order in orders:
+                yield self._parse_order(order) if parse else order
+
+    async def sync_orders(self, symbol: str, cursors, parse=True):
+        endpoint = '/api/v3/allOrders'
+        key, cursor, params, page_key, position_key = self._get_sync_orders_request(endpoint, symbol, cursors)
+
+        orders = []
+        async for page in self._iter_history(endpoint, params, page_key, position_key):
+            orders += self._sync_orders_page(cursor, page)
+            cursors.set(key, cursor)
+
+        return self._parse_orders(orders) if parse else orders
+
+    async def iter_trades(self, symbol, from_timestamp=None, from_order_id=None, parse=True, from_trade_id=None):
+        endpoint = '/api/v3/myTrades'
+        params, page_key, position_key = self._get_history_request('iter_trades', symbol, from_timestamp,
+                                                                   from_order_id, from_trade_id, trades=True)
+
+        async for trades in self._iter_history(endpoint, params, page_key, position_key):
+            for trade in trades:
+                yield self._parse_trade(trade) if parse else trade
+
+    async def sync_trades(self, symbol, cursors, parse=True):
+        endpoint = '/api/v3/myTrades'
+        key, params, page_key, position_key = self._get_sync_trades_request(endpoint, symbol, cursors)
+
+        trades = []
+        async for page in self._iter_history(endpoint, params, page_key, position_key):
+            trades += page
+            cursors.set(key, page[-1]['id'])
+
+        return self._parse_trades(trades) if parse else trades
+
+
+class AsyncKuCoin(AsyncExchange, KuCoin):
+
+    async def get_orders(self, symbol: str, from_timestamp=None, max_workers=None, **kwargs):
+        endpoint, params = self._get_orders_request(symbol, from_timestamp, **kwargs)
+
+        response = await self._get(endpoint, signed=True, params=params)
+        chunks = await self._fetch_pages(endpoint, 'get', True, params, 'currentPage',
+                                         self._get_next_pages(response), max_workers)
+        return self._parse_orders_pages(response, chunks)
+
+
+class AsyncByBit(AsyncExchange, ByBit):
+    pass
+
+
+class AsyncBitfinex(AsyncExchange, Bitfinex):
+
+    async def get_exchange_info(self):
+        currencies = await self._request(endpoint=self._CURRENCIES_ENDPOINT)
+        response = await self._request(endpoint=self._get_pairs_endpoint())
+        return self._parse_exchange_info(currencies, response)
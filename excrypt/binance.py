@@ -1,8 +1,10 @@
-import datetime as dt
-
 from .exchange import Exchange
 from .exceptions import *
+from . import jsonlib
 from .dataclasses import *
+from .columnar import TickerSnapshot
+from .orderbook import OrderBook
+from .quantizer import Quantizer
 
 
 class Binance(Exchange):
@@ -11,6 +13,7 @@ class Binance(Exchange):
     https://binance-docs.github.io/apidocs/futures/en/
     """
 
+    _NAME = 'binance'
     _FUTURES_API_URL = "https://fapi.binance.com"
     _SPOT_API_URL = "https://api.binance.com"
 
@@ -19,11 +22,57 @@ class Binance(Exchange):
 
     _EXCHANGE_SYMBOL_SEPARATOR = ''
 
+    # https://binance-docs.github.io/apidocs/spot/en/#limits
+    _SPOT_RATE_LIMIT = (6000, 60)
+    _FUTURES_RATE_LIMIT = (2400, 60)
+
+    # weight or (weight with symbol, weight without symbol)
+    _SPOT_ENDPOINT_WEIGHTS = {
+        '/api/v3/exchangeInfo': 20,
+        '/api/v3/account': 20,
+        '/api/v3/allOrders': 20,
+        '/api/v3/myTrades': 20,
+        '/api/v3/order': 4,
+        '/api/v3/openOrders': (6, 80),
+        '/api/v3/ticker/price': (2, 4),
+    }
+    _FUTURES_ENDPOINT_WEIGHTS = {
+        '/fapi/v1/exchangeInfo': 1,
+        '/fapi/v2/account': 5,
+        '/fapi/v1/allOrders': 5,
+        '/fapi/v1/userTrades': 5,
+        '/fapi/v2/positionRisk': 5,
+        '/fapi/v1/batchOrders': 5,
+        '/fapi/v1/openOrders': (1, 40),
+        '/fapi/v2/ticker/price': (1, 2),
+    }
+
+    # depth weight by limit: (maximum limit, weight)
+    _SPOT_DEPTH_WEIGHTS = ((100, 5), (500, 25), (1000, 50), (5000, 250))
+    _FUTURES_DEPTH_WEIGHTS = ((50, 2), (100, 5), (500, 10), (1000, 20))
+
+    _CLIENT_ORDER_ID_KEYS = ('newClientOrderId',)
+
+    # futures batchOrders limits
+    _BATCH_ORDERS_LIMIT = 5
+    _BATCH_CANCEL_LIMIT = 10
+
+    # maximum limit of allOrders and myTrades
+    _HISTORY_LIMIT = 1000
+
+    _OPEN_ORDER_STATUSES = ('NEW', 'PARTIALLY_FILLED', 'PENDING_NEW')
+
     def _initialize(self):
         if self._FUTURES:
             self._API_URL = self._FUTURES_API_URL
+            self._RATE_LIMIT = self._FUTURES_RATE_LIMIT
+            self._ENDPOINT_WEIGHTS = self._FUTURES_ENDPOINT_WEIGHTS
         else:
             self._API_URL = self._SPOT_API_URL
+            self._RATE_LIMIT = self._SPOT_RATE_LIMIT
+            self._ENDPOINT_WEIGHTS = self._SPOT_ENDPOINT_WEIGHTS
+
+        self._set_quote_assets(self._futures_quote_assets if self._FUTURES else self._spot_quote_assets)
 
         if self._API_KEY:
             self.update_headers({'X-MBX-APIKEY': self._API_KEY})
@@ -36,25 +85,35 @@ class Binance(Exchange):
 
         return kwargs
 
+    def _get_request_weight(self, endpoint, params):
+        if endpoint in ('/api/v3/depth', '/fapi/v1/depth'):
+            depth_weights = self._FUTURES_DEPTH_WEIGHTS if self._FUTURES else self._SPOT_DEPTH_WEIGHTS
+            limit = (params or {}).get('limit', 100)
+            return next((weight for max_limit, weight in depth_weights if limit <= max_limit), depth_weights[-1][1])
+        weight = self._ENDPOINT_WEIGHTS.get(endpoint, 1)
+        if isinstance(weight, tuple):
+            weight = weight[0] if params and 'symbol' in params else weight[1]
+        return weight
+
+    def _update_rate_limit(self, endpoint, headers):
+        used_weight = headers.get('X-MBX-USED-WEIGHT-1M')
+        if used_weight and self._RATE_LIMITER:
+            self._RATE_LIMITER.calibrate(int(used_weight))
+
     def _convert_symbol_to_global(self, symbol):
         """
         In case of Bianance symbol does not contain separator.
         So it is required to guess base and quote assets.
-        For this case Binance quote assets will be kept in a variable inside this class
+        Known symbols are taken from the index built by get_exchange_info,
+        otherwise Binance quote assets kept in a variable inside this class are used.
         """
-        symbol_in_global_format = None
-        for symbol_info in self.symbols_info.values():
-            if symbol == symbol_info.original_symbol:
-                symbol_in_global_format = symbol_info.base_asset + self._GLOBAL_SYMBOL_SEPARATOR + symbol_info.quote_asset
-
+        symbol_in_global_format = self._local_symbols.get(symbol)
         if symbol_in_global_format:
             return symbol_in_global_format
 
-        quote_assets = self._futures_quote_assets if self._FUTURES else self._spot_quote_assets
-        for quote_asset in quote_assets:
-            if symbol.endswith(quote_asset):
-                base_asset = symbol.replace(quote_asset, '')
-                symbol_in_global_format = base_asset + self._GLOBAL_SYMBOL_SEPARATOR + quote_asset
+        assets = self._split_symbol(symbol)
+        if assets:
+            symbol_in_global_format = assets[0] + self._GLOBAL_SYMBOL_SEPARATOR + assets[1]
         return symbol_in_global_format
 
     def get_exchange_info(self):
@@ -63,13 +122,14 @@ class Binance(Exchange):
         else:
             endpoint = '/api/v3/exchangeInfo'
 
-        response = self._request(endpoint=endpoint)
+        return self._call(endpoint, parse=self._parse_exchange_info)
 
+    def _parse_exchange_info(self, response):
         # parse symbols info
         for info in response['symbols']:
-            symbol_info = SymbolInfo
+            symbol_info = SymbolInfo()
 
-            symbol_info.response = info
+            symbol_info.response = info if self._KEEP_RESPONSE else None
 
             # symbol and original symbol
             symbol_info.symbol = info['baseAsset'] + self._GLOBAL_SYMBOL_SEPARATOR + info['quoteAsset']
@@ -101,7 +161,10 @@ class Binance(Exchange):
                     symbol_info.min_order_size = float(f['minNotional'])
                     symbol_info.min_order_size_str = f['minNotional']
 
+            symbol_info.quantizer = Quantizer.from_symbol_info(symbol_info)
+
             self.symbols_info[symbol_info.symbol] = symbol_info
+            self._add_symbol(symbol_info.original_symbol, symbol_info.symbol)
 
         # update quote assets
         # so far usefull for Binance only because it's symbols do not contain separator
@@ -112,20 +175,26 @@ class Binance(Exchange):
             self._futures_quote_assets = list(quote_assets)
         else:
             self._spot_quote_assets = list(quote_assets)
+        self._set_quote_assets(quote_assets)
 
         return self.symbols_info
 
+    def _restore_symbols_info(self, symbols_info):
+        super()._restore_symbols_info(symbols_info)
+        self._set_quote_assets({info.quote_asset for info in symbols_info.values()})
+
     def get_balances(self):
         if self._FUTURES:
             endpoint = '/fapi/v2/account'
         else:
             endpoint = '/api/v3/account'
 
-        response = self._get(endpoint, signed=True)
+        return self._call(endpoint, signed=True, parse=self._parse_balances)
 
+    def _parse_balances(self, response):
         if self._FUTURES:
             for item in response['assets']:
-                balance = Balance
+                balance = Balance()
                 balance.asset = item['asset']
                 balance.free = float(item['walletBalance'])
                 balance.free_str = item['walletBalance']
@@ -133,12 +202,12 @@ class Binance(Exchange):
                 balance.locked_str = item['unrealizedProfit']
                 balance.total = balance.free + balance.locked
                 balance.total_str = '{:0.8f}'.format(balance.total)
-                balance.response = item
+                balance.response = item if self._KEEP_RESPONSE else None
 
                 self.balances[balance.asset] = balance
         else:
             for item in response['balances']:
-                balance = Balance
+                balance = Balance()
                 balance.asset = item['asset']
                 balance.free = float(item['free'])
                 balance.free_str = item['free']
@@ -146,7 +215,7 @@ class Binance(Exchange):
                 balance.locked_str = item['locked']
                 balance.total = balance.free + balance.locked
                 balance.total_str = '{:0.8f}'.format(balance.total)
-                balance.response = item
+                balance.response = item if self._KEEP_RESPONSE else None
 
                 self.balances[balance.asset] = balance
 
@@ -160,20 +229,64 @@ class Binance(Exchange):
 
         # [{'symbol': 'ZRXUSDT', 'price': '1.2234', 'time': 1710931501565},
         # {'symbol': 'REEFUSDT', 'price': '0.002789', 'time': 1710931501281},]
-        response = self._request(endpoint=endpoint)
+        return self._call(endpoint, parse=self._parse_tickers)
+
+    def _parse_tickers(self, response):
         for item in response:
-            symbol = self._convert_symbol_to_global(item['symbol'])
-            ticker = Ticker
-            ticker.symbol = symbol
-            ticker.price = float(item['price'])
-            ticker.price_str = item['price']
-            ticker.timestamp = int(item['time'])
-            ticker.date_time = dt.datetime.fromtimestamp(ticker.timestamp / 1000)
-            ticker.response = item
-            self.tickers[symbol] = ticker
+            ticker = self._parse_ticker(item)
+            self.tickers[ticker.symbol] = ticker
 
         return self.tickers
 
+    def _parse_ticker(self, raw_ticker):
+        # numeric and datetime fields are decoded on first access
+        # spot tickers do not contain time
+        ticker = Ticker()
+        ticker.symbol = self._convert_symbol_to_global(raw_ticker['symbol'])
+        ticker.price_str = raw_ticker['price']
+        if 'time' in raw_ticker:
+            ticker.timestamp = int(raw_ticker['time'])
+        ticker.response = raw_ticker if self._KEEP_RESPONSE else None
+        return ticker
+
+    def get_ticker_snapshot(self):
+        if self._FUTURES:
+            endpoint = '/fapi/v2/ticker/price'
+        else:
+            endpoint = '/api/v3/ticker/price'
+
+        return self._call(endpoint, parse=self._parse_ticker_snapshot)
+
+    def get_order_book(self, symbol, limit=100):
+        # https://binance-docs.github.io/apidocs/spot/en/#order-book
+        if self._FUTURES:
+            endpoint = '/fapi/v1/depth'
+        else:
+            endpoint = '/api/v3/depth'
+
+        params = {
+            'symbol': self._convert_symbol_to_local(symbol),
+            'limit': limit,
+        }
+
+        return self._call(endpoint, params=params, parse=lambda response: self._parse_order_book(symbol, response))
+
+    @staticmethod
+    def _parse_order_book(symbol, response):
+        # {"lastUpdateId": 1027024, "bids": [["4.00000000", "431.00000000"]], "asks": [["4.00000200", "12.00000000"]]}
+        book = OrderBook(symbol)
+        book.apply_snapshot(response['bids'], response['asks'], response['lastUpdateId'], response.get('T'))
+        return book
+
+    def _parse_ticker_snapshot(self, response):
+        # spot tickers do not contain time, so request time is used
+        timestamp = self._generate_timestamp()
+        return TickerSnapshot(
+            [self._convert_symbol_to_global(item['symbol']) for item in response],
+            [item['price'] for item in response],
+            [item.get('time', timestamp) for item in response],
+        )
+
     def get_ticker(self, symbol):
         if self._FUTURES:
             endpoint = '/fapi/v2/ticker/price'
@@ -185,31 +298,44 @@ class Binance(Exchange):
             'symbol': symbol,
             }
         # {'symbol': 'YGGUSDT', 'price': '0.7399000', 'time': 1710931387892}
-        response = self._request(endpoint=endpoint, params=params)
+        return self._call(endpoint, params=params, parse=self._update_ticker)
 
-        ticker = Ticker
-        ticker.symbol = self._convert_symbol_to_global(symbol)
-        ticker.price = float(response['price'])
-        ticker.price_str = response['price']
-        ticker.timestamp = int(response['time'])
-        ticker.date_time = dt.datetime.fromtimestamp(ticker.timestamp / 1000)
-        ticker.response = response
+    def _update_ticker(self, response):
+        ticker = self._parse_ticker(response)
 
         # update tickers
         self.tickers[ticker.symbol] = ticker
 
         return ticker
 
-    def create_order(self, symbol, side, quantity, price=None, stop_price=None, type='LIMIT', time_in_force=None):
-        symbol = self._convert_symbol_to_local(symbol)
-        side = side.upper()
-        type = type.upper()
-
+    def create_order(self, symbol, side, quantity, price=None, stop_price=None, type='LIMIT', time_in_force=None,
+                     client_order_id=None):
         if self._FUTURES:
             endpoint = '/fapi/v1/order'
         else:
             endpoint = '/api/v3/order'
 
+        params = self._get_order_params(symbol, side, quantity, price, stop_price, type, time_in_force,
+                                        client_order_id or self._generate_client_order_id())
+        return self._call(endpoint, 'post', True, parse=self._parse_order, params=params)
+
+    def prepare_order(self, symbol, side, type='LIMIT', time_in_force=None, stop_price=None):
+        """
+        Prepares create_order for a symbol and side, so sending an order only fills price and quantity.
+        :return: PreparedOrder
+
+        Example:
+        order = client.prepare_order('BTC/USDT', 'buy')
+        order.send('0.00100', '60000.00')
+        """
+        return PreparedOrder(self, symbol, side, type, time_in_force, stop_price)
+
+    def _get_order_params(self, symbol, side, quantity, price=None, stop_price=None, type='LIMIT', time_in_force=None,
+                          client_order_id=None):
+        symbol = self._convert_symbol_to_local(symbol)
+        side = side.upper()
+        type = type.upper()
+
         if type == 'LIMIT':
             if not time_in_force:
                 time_in_force = self.TIME_IN_FORCE_GTC
@@ -240,68 +366,105 @@ class Binance(Exchange):
         else:
             raise ExchangeException('Unknown order type: %s' % type)
 
-        response = self._request(endpoint=endpoint, params=params, method='post', signed=True)
-        return self._parse_order(response)
+        if client_order_id:
+            params['newClientOrderId'] = client_order_id
+
+        return params
+
+    def _get_create_orders_batches(self, orders):
+        # https://binance-docs.github.io/apidocs/futures/en/#place-multiple-orders-trade
+        # spot has no batch endpoint
+        if not self._FUTURES:
+            return None
+
+        batches = []
+        for batch in self._group_orders(orders, self._BATCH_ORDERS_LIMIT):
+            # batch order values are sent as strings
+            batch_orders = [{key: str(value) for key, value in self._get_order_params(**order).items()}
+                            for _, order in batch]
+            params = {
+                'batchOrders': jsonlib.dumps(batch_orders),
+            }
+            batches.append(([index for index, _ in batch], '/fapi/v1/batchOrders', 'post', params,
+                            self._parse_batch_orders))
+        return batches
+
+    def _get_cancel_orders_batches(self, orders):
+        # https://binance-docs.github.io/apidocs/futures/en/#cancel-multiple-orders-trade
+        if not self._FUTURES:
+            return None
+
+        batches = []
+        for batch in self._group_orders(orders, self._BATCH_CANCEL_LIMIT, key=lambda order: order['symbol']):
+            params = {
+                'symbol': self._convert_symbol_to_local(batch[0][1]['symbol']),
+                'orderIdList': jsonlib.dumps([int(order['order_id']) for _, order in batch]),
+            }
+            batches.append(([index for index, _ in batch], '/fapi/v1/batchOrders', 'delete', params,
+                            self._parse_batch_orders))
+        return batches
+
+    def _parse_batch_orders(self, response):
+        # failed items are errors: [{"code": -2022, "msg": "ReduceOnly Order is rejected."}, {"orderId": ...}]
+        return [ExchangeAPIException(f"{item['code']} {item['msg']}") if 'orderId' not in item
+                else self._parse_order(item) for item in response]
 
     def _parse_order(self, raw_order):
+        # numeric and datetime fields are decoded on first access
         order = Order()
-        order.response = raw_order
+        order.response = raw_order if self._KEEP_RESPONSE else None
         order.symbol = self._convert_symbol_to_global(raw_order['symbol'])
         order.base_asset, order.quote_asset = self.get_symbol_assets(order.symbol)
         order.order_id = str(raw_order['orderId'])
-        order.price = float(raw_order['price'])
         order.price_str = raw_order['price']
-        order.qty = float(raw_order['executedQty'])
         order.qty_str = raw_order['executedQty']
-        order.orig_qty = float(raw_order['origQty'])
         order.orig_qty_str = raw_order['origQty']
         order.status = raw_order['status'].lower()
         order.type = raw_order['type'].lower()
         order.side = raw_order['side'].lower()
         if 'time' in raw_order:
             order.timestamp = int(raw_order['time'])
-            order.datetime = dt.datetime.utcfromtimestamp(order.timestamp // 1000)
         if 'cummulativeQuoteQty' in raw_order:  # в фьючерсах есть cumQuote, может это оно
-            order.quote_qty = float(raw_order['cummulativeQuoteQty'])
             order.quote_qty_str = raw_order['cummulativeQuoteQty']
         else:
             order.quote_qty = round(order.price * order.qty, 8)
             order.quote_qty_str = '{:0.0{}f}'.format(order.quote_qty, 8)
         # partially_filled status
-        if order.qty and order.status == 'canceled':
+        if order.status == 'canceled' and order.qty:
             order.status = 'partially_filled'
         # stop price
         if 'stopPrice' in raw_order:
-            order.stop_price = float(raw_order['stopPrice'])
             order.stop_price_str = raw_order['stopPrice']
         return order
 
-def _parse_trade(self, raw_trade):
-    trade = Trade()
-    trade.response = raw_trade
-    trade.symbol = self._convert_symbol_to_global(raw_trade['symbol'])
-    trade.trade_id = str(raw_trade['id'])
-    trade.order_id = str(raw_trade['orderId'])
-    trade.price = float(raw_trade['price'])
-    trade.price_str = raw_trade['price']
-    trade.qty = float(raw_trade['qty'])
-    trade.qty_str = raw_trade['qty']
-    trade.quote_qty = float(raw_trade['quoteQty'])
-    trade.quote_qty_str = raw_trade['quoteQty']
-    trade.comm = float(raw_trade['commission'])
-    trade.comm_str = raw_trade['commission']
-    trade.comm_asset = raw_trade['commissionAsset']
-    trade.timestamp = int(raw_trade['time'])
-    trade.datetime = datetime.utcfromtimestamp(trade.timestamp // 1000)
-    trade.buyer = raw_trade['isBuyer']
-    trade.maker = raw_trade['isMaker']
-    trade.status = raw_trade.get('status', None)
-    trade.type = raw_trade.get('type', None)
-    trade.side = raw_trade.get('side', None)
-    trade.pnl = raw_trade.get('pnl', None)
-    trade.pnl_str = raw_trade.get('pnl_str', None)
-    trade.position = raw_trade.get('position', None)
-    return trade
+    def _parse_orders(self, response):
+        return [self._parse_order(order) for order in response]
+
+    def _parse_trade(self, raw_trade):
+        # numeric and datetime fields are decoded on first access
+        trade = Trade()
+        trade.response = raw_trade if self._KEEP_RESPONSE else None
+        trade.symbol = self._convert_symbol_to_global(raw_trade['symbol'])
+        trade.trade_id = str(raw_trade['id'])
+        trade.order_id = str(raw_trade['orderId'])
+        trade.price_str = raw_trade['price']
+        trade.qty_str = raw_trade['qty']
+        trade.quote_qty_str = raw_trade['quoteQty']
+        trade.comm_str = raw_trade['commission']
+        trade.comm_asset = raw_trade['commissionAsset']
+        trade.timestamp = int(raw_trade['time'])
+        trade.buyer = raw_trade['isBuyer']
+        trade.maker = raw_trade['isMaker']
+        trade.status = raw_trade.get('status', None)
+        trade.type = raw_trade.get('type', None)
+        trade.side = raw_trade.get('side', None)
+        trade.pnl = raw_trade.get('pnl', None)
+        trade.pnl_str = raw_trade.get('pnl_str', None)
+        trade.position = raw_trade.get('position', None)
+        return trade
+
+    def _parse_trades(self, response):
+        return [self._parse_trade(trade) for trade in response]
 
     def get_position_info(self, symbol):
         if self._FUTURES:
@@ -313,8 +476,8 @@ def _parse_trade(self, raw_trade):
             'symbol': self._convert_symbol_to_local(symbol),
         }
 
-        response = self._request(endpoint=endpoint, signed=True, params=params)
-        return self._parse_position_info(response[0])
+        return self._call(endpoint, signed=True, params=params,
+                          parse=lambda response: self._parse_position_info(response[0]))
 
     def get_positions_info(self):
         if self._FUTURES:
@@ -322,7 +485,9 @@ def _parse_trade(self, raw_trade):
         else:
             raise ExchangeException('get_positions_info is not supported for spot exchange')
 
-        response = self._request(endpoint=endpoint, signed=True)
+        return self._call(endpoint, signed=True, parse=self._parse_positions_info)
+
+    def _parse_positions_info(self, response):
         result = {}
         for item in response:
             result[self._convert_symbol_to_global(item['symbol'])] = self._parse_position_info(item)
@@ -378,8 +543,7 @@ def _parse_trade(self, raw_trade):
             'marginType': margin_type.upper(),
         }
 
-        response = self._request(endpoint=endpoint, signed=True, method='post', params=params)
-        return response
+        return self._call(endpoint, 'post', True, params=params)
 
     def set_leverage(self, symbol, leverage):
         if self._FUTURES:
@@ -392,8 +556,7 @@ def _parse_trade(self, raw_trade):
             'leverage': leverage,
         }
 
-        response = self._request(endpoint=endpoint, signed=True, method='post', params=params)
-        return response
+        return self._call(endpoint, 'post', True, params=params)
 
     def cancel_order(self, symbol=None, order_id=None):
         if not symbol:
@@ -411,8 +574,7 @@ def _parse_trade(self, raw_trade):
         if order_id:
             params['orderId'] = order_id
 
-        response = self._request(endpoint=endpoint, signed=True, method='delete', params=params)
-        return self._parse_order(response)
+        return self._call(endpoint, 'delete', True, parse=self._parse_order, params=params)
 
     def get_order(self, order_id=None, symbol=None, parse=True):
         if not symbol or not order_id:
@@ -428,86 +590,269 @@ def _parse_trade(self, raw_trade):
             'orderId': order_id
         }
 
-        response = self._request(endpoint=endpoint, signed=True, params=params)
-        if parse:
-            return self._parse_order(response)
+        return self._call(endpoint, signed=True, parse=self._parse_order if parse else None, params=params)
+
+    def get_open_orders(self, symbol=None, parse=True):
+        # https://binance-docs.github.io/apidocs/spot/en/#current-open-orders-user_data
+        # orders of all symbols are returned if symbol is not set
+        if self._FUTURES:
+            endpoint = '/fapi/v1/openOrders'
         else:
-            return response
+            endpoint = '/api/v3/openOrders'
 
+        params = {}
+        if symbol:
+            params['symbol'] = self._convert_symbol_to_local(symbol)
 
-    def get_orders(self, symbol: str, from_timestamp=None, from_order_id=None, parse=True):
-        # https://binance-docs.github.io/apidocs/spot/en/#all-orders-user_data
+        return self._call(endpoint, signed=True, parse=self._parse_orders if parse else None, params=params)
 
+    def _get_history_request(self, method_name, symbol, from_timestamp=None, from_order_id=None, from_trade_id=None,
+                             trades=False):
+        """
+        Returns params, pagination key and response position key of an account history request,
+        pagination key is None if a single request should be made.
+        :param trades: myTrades request, it filters trades by orderId, so trades of from_order_id
+                       are paged by trade id
+        """
         if self._FUTURES:
-            raise NotImplementedException('get_orders is not implemented for futures')
-        else:
-            endpoint = '/api/v3/allOrders'
+            raise NotImplementedException(f'{method_name} is not implemented for futures')
 
         params = {
             'symbol': self._convert_symbol_to_local(symbol),
         }
 
-        orders = []
-
-        # go into infinite loop if from_timestamp is specified
         if from_timestamp:
             params['startTime'] = from_timestamp * 1000
-            orders = self._get_paginated_data(endpoint, 'get', True, params, 'startTime', 'time')
+            return params, 'startTime', 'time'
+        elif from_trade_id is not None:
+            params['fromId'] = from_trade_id
+            return params, 'fromId', 'id'
         elif from_order_id:
             params['orderId'] = from_order_id
-            orders = self._get_paginated_data(endpoint, 'get', True, params, 'orderId', 'time')
+            if trades:
+                return params, 'fromId', 'id'
+            return params, 'orderId', 'orderId'
+        return params, None, None
+
+    def _get_history(self, endpoint, params, page_key, position_key, parse=None):
+        # go into infinite loop if page_key is set
+        if page_key:
+            response = self._get_paginated_data(endpoint, 'get', True, params, page_key, position_key)
+            return response if parse is None else parse(response)
         # request single time
-        else:
-            response = self._request(endpoint=endpoint, signed=True, params=params)
-            orders = response
+        return self._call(endpoint, signed=True, parse=parse, params=params)
 
-        if parse:
-            return [self._parse_order(order) for order in orders]
+    def _iter_history(self, endpoint, params, page_key, position_key):
+        if page_key:
+            yield from self._iter_paginated_data(endpoint, 'get', True, params, page_key, position_key,
+                                                 page_size=params.get('limit'))
         else:
-            return orders
+            yield self._request(endpoint=endpoint, signed=True, params=params)
+
+    def get_orders(self, symbol: str, from_timestamp=None, from_order_id=None, parse=True):
+        # https://binance-docs.github.io/apidocs/spot/en/#all-orders-user_data
+        endpoint = '/api/v3/allOrders'
+        params, page_key, position_key = self._get_history_request('get_orders', symbol, from_timestamp,
+                                                                   from_order_id)
+
+        return self._get_history(endpoint, params, page_key, position_key, self._parse_orders if parse else None)
+
+    def iter_orders(self, symbol: str, from_timestamp=None, from_order_id=None, parse=True):
+        """
+        Yields orders like get_orders, but page by page: only the current and the prefetched page
+        are kept in memory and breaking the loop stops requesting further pages.
+
+        Example:
+        for order in client.iter_orders('BTC/USDT', from_timestamp=1700000000):
+            if order.status == 'filled':
+                break
+        """
+        endpoint = '/api/v3/allOrders'
+        params, page_key, position_key = self._get_history_request('iter_orders', symbol, from_timestamp,
+                                                                   from_order_id)
+
+        for orders in self._iter_history(endpoint, params, page_key, position_key):
+            for order in orders:
+                yield self._parse_order(order) if parse else order
+
+    def sync_orders(self, symbol: str, cursors, parse=True):
+        """
+        Returns orders created since the previous sync and orders that changed since they were open
+        on the previous sync, every order state is returned once. The first sync downloads the whole history.
+        The cursor keeps the next order id and states of open orders, orders are requested from the oldest
+        open order, so open orders are checked until they are closed.
+        :param cursors: CursorStore
+        """
+        endpoint = '/api/v3/allOrders'
+        key, cursor, params, page_key, position_key = self._get_sync_orders_request(endpoint, symbol, cursors)
+
+        orders = []
+        for page in self._iter_history(endpoint, params, page_key, position_key):
+            orders += self._sync_orders_page(cursor, page)
+            cursors.set(key, cursor)
+
+        return self._parse_orders(orders) if parse else orders
+
+    def _get_sync_orders_request(self, endpoint, symbol, cursors):
+        """
+        Returns cursor key, cursor copy, params, pagination key and response position key of sync_orders.
+        """
+        key = self._get_cursor_key(symbol, endpoint)
+        cursor = self._get_orders_cursor(cursors, key)
+        params, page_key, position_key = self._get_history_request('sync_orders', symbol,
+                                                                   from_order_id=self._get_sync_orders_from(cursor))
+        params['limit'] = self._HISTORY_LIMIT
+        return key, cursor, params, page_key, position_key
+
+    @staticmethod
+    def _get_orders_cursor(cursors, key):
+        """
+        Returns a copy of sync_orders cursor: {'next': next order id, 'open': {order id: state}}.
+        """
+        cursor = cursors.get(key)
+        if isinstance(cursor, dict):
+            return {'next': cursor['next'], 'open': dict(cursor['open'])}
+        # earlier cursors were the order id to request from
+        return {'next': cursor or 1, 'open': {}}
+
+    @staticmethod
+    def _get_sync_orders_from(cursor):
+        return min([int(order_id) for order_id in cursor['open']] + [cursor['next']])
+
+    def _sync_orders_page(self, cursor, page):
+        """
+        Returns new and changed orders of a sync_orders page and advances the cursor.
+        """
+        orders = []
+        for order in page:
+            order_id = str(order['orderId'])
+            state = f"{order['status']}:{order['executedQty']}"
+            # orders below the next id were returned already, unless they were open and changed since
+            if order['orderId'] >= cursor['next'] or cursor['open'].get(order_id, state) != state:
+                orders.append(order)
+            if order['status'] in self._OPEN_ORDER_STATUSES:
+                cursor['open'][order_id] = state
+            else:
+                cursor['open'].pop(order_id, None)
+            cursor['next'] = max(cursor['next'], order['orderId'] + 1)
+        return orders
 
-    def get_trades(self, symbol, from_timestamp=None, from_order_id=None, parse=True):
+    def get_trades(self, symbol, from_timestamp=None, from_order_id=None, parse=True, from_trade_id=None):
         # https://binance-docs.github.io/apidocs/spot/en/#account-trade-list-user_data
+        endpoint = '/api/v3/myTrades'
+        params, page_key, position_key = self._get_history_request('get_trades', symbol, from_timestamp,
+                                                                   from_order_id, from_trade_id, trades=True)
 
-        if self._FUTURES:
-            raise NotImplementedException('get_trades is not implemented for futures')
-        else:
-            endpoint = '/api/v3/myTrades'
+        return self._get_history(endpoint, params, page_key, position_key, self._parse_trades if parse else None)
 
-        params = {
-            'symbol': self._convert_symbol_to_local(symbol),
-        }
+    def iter_trades(self, symbol, from_timestamp=None, from_order_id=None, parse=True, from_trade_id=None):
+        """
+        Yields trades like get_trades, page by page, see iter_orders.
+        """
+        endpoint = '/api/v3/myTrades'
+        params, page_key, position_key = self._get_history_request('iter_trades', symbol, from_timestamp,
+                                                                   from_order_id, from_trade_id, trades=True)
+
+        for trades in self._iter_history(endpoint, params, page_key, position_key):
+            for trade in trades:
+                yield self._parse_trade(trade) if parse else trade
+
+    def sync_trades(self, symbol, cursors, parse=True):
+        """
+        Returns trades made since the previous sync, the last trade id is kept in cursors.
+        The first sync downloads the whole history, next syncs usually cost a single request.
+        :param cursors: CursorStore
+        """
+        endpoint = '/api/v3/myTrades'
+        key, params, page_key, position_key = self._get_sync_trades_request(endpoint, symbol, cursors)
 
         trades = []
+        for page in self._iter_history(endpoint, params, page_key, position_key):
+            trades += page
+            cursors.set(key, page[-1]['id'])
 
-        # go into infinite loop if from_timestamp is specified
-        if from_timestamp:
-            params['startTime'] = from_timestamp * 1000
-            trades = self._get_paginated_data(endpoint, 'get', True, params, 'startTime', 'time')
-        # same for order_id
-        elif from_order_id:
-            params['orderId'] = from_order_id
-            trades = self._get_paginated_data(endpoint, 'get', True, params, 'orderId', 'time')
-        # request single time
-        else:
-            response = self._request(endpoint=endpoint, signed=True, params=params)
-            trades = response
+        return self._parse_trades(trades) if parse else trades
 
-        if parse:
-            return [self._parse_trade(trade) for trade in trades]
-        else:
-            return orders
+    def _get_sync_trades_request(self, endpoint, symbol, cursors):
+        """
+        Returns cursor key, params, pagination key and response position key of sync_trades.
+        """
+        key = self._get_cursor_key(symbol, endpoint)
+        params, page_key, position_key = self._get_history_request('sync_trades', symbol,
+                                                                   from_trade_id=cursors.get(key, -1) + 1)
+        params['limit'] = self._HISTORY_LIMIT
+        return key, params, page_key, position_key
 
     def get_symbols(self, all=None):
         if not self.symbols_info:
             self.get_exchange_info()
+        return self._filter_symbols(all)
 
+    def _filter_symbols(self, all=None):
         symbols = []
         for symbol in self.symbols_info:
             if all:
                 symbols.append(symbol)
             else:
-                if self.symbols_info[symbol]['status'] == 'TRADING':
+                if self.symbols_info[symbol].status == 'TRADING':
                     symbols.append(symbol)
 
-        return symbols
\ No newline at end of file
+        return symbols
+
+
+class PreparedOrder:
+    """
+    create_order with the symbol, endpoint, static params and their signature state resolved once.
+    send signs only quantity, price and timestamp on top of the prepared query and writes the request
+    with the exchange session, rate limiters and response handling, but without create_order retries.
+    Prices and quantities are sent as given, strings from Quantizer are expected.
+    """
+
+    __slots__ = ('exchange', 'symbol', 'endpoint', 'uri', 'weight', 'has_price', '_prefix', '_hmac',
+                 '_kwargs')
+
+    def __init__(self, exchange, symbol, side, type='LIMIT', time_in_force=None, stop_price=None):
+        if not exchange._API_KEY:
+            raise ExchangeException("Authenticated endpoints require keys")
+
+        self.exchange = exchange
+        self.symbol = symbol
+        self.endpoint = '/fapi/v1/order' if exchange._FUTURES else '/api/v3/order'
+        self.uri = exchange._get_uri(self.endpoint, 'post', True)
+
+        params = exchange._get_order_params(symbol, side, None, None, stop_price, type, time_in_force)
+        self.has_price = 'price' in params
+        params = {key: value for key, value in params.items() if key not in ('quantity', 'price')}
+        self.weight = exchange._get_request_weight(self.endpoint, params)
+        self._prefix = exchange._generate_query_string(params)
+        # HMAC state with the secret and the static query, send only feeds the rest of the query
+        self._hmac = exchange._get_hmac(self._prefix)
+
+        self._kwargs = {'timeout': exchange._REQUESTS_TIMEOUT}
+        if exchange._REQUESTS_PARAMS:
+            self._kwargs.update(exchange._REQUESTS_PARAMS)
+
+    def _sign(self, quantity, price=None):
+        if self.has_price:
+            if price is None:
+                raise ExchangeException('price must be specified')
+            query = f'&quantity={quantity}&price={price}&timestamp={self.exchange._generate_timestamp()}'
+        else:
+            query = f'&quantity={quantity}&timestamp={self.exchange._generate_timestamp()}'
+        m = self._hmac.copy()
+        m.update(query.encode('utf-8'))
+        return f'{self.uri}?{self._prefix}{query}&signature={m.hexdigest()}'
+
+    def send(self, quantity, price=None):
+        """
+        Creates the order, returns Order like create_order.
+        """
+        exchange = self.exchange
+        for rate_limiter in exchange._get_rate_limiters(self.endpoint):
+            rate_limiter.acquire(self.weight)
+        response = exchange._session.post(self._sign(quantity, price), **self._kwargs)
+        exchange._handle_rate_limit(self.endpoint, response)
+        return exchange._parse_order(exchange._handle_response(response))
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.symbol}, {self._prefix})'
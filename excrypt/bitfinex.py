@@ -4,6 +4,8 @@ import hashlib
 import datetime as dt
 from .exchange import Exchange
 from .exceptions import *
+from .columnar import TickerSnapshot, CandleFrame
+from .orderbook import OrderBook
 
 
 class Bitfinex(Exchange):
@@ -11,13 +13,16 @@ class Bitfinex(Exchange):
     https://docs.bitfinex.com/docs/introduction
     """
 
+    _NAME = 'bitfinex'
     _PUBLIC_API_URL = "https://api-pub.bitfinex.com"
     _SIGNED_API_URL = "https://api.bitfinex.com"
 
     INTERVALS = {'1m': '1m', '3m': '3m', '5m': '5m', '15m': '15m', '30m': '30m', '1h': '1h', '2h': '2h', '3h': '3h',
-                 '6h': '6h', '12h': '12h', '1d': '1D', '1w': '1W', '14d': '14D', '1m': '1M'}
+                 '6h': '6h', '12h': '12h', '1d': '1D', '1w': '1W', '14d': '14D', '1M': '1M'}
 
-    _currenсies = ["1INCH", "AAVE", "AAVEF0", "ADA", "ADAF0", "AIOZ", "ALG", "ALGF0", "ALT2612", "AMP", "APE", "APEF0", "APENFT",
+    _CANDLES_LIMIT = 10000
+
+    _currencies = ["1INCH", "AAVE", "AAVEF0", "ADA", "ADAF0", "AIOZ", "ALG", "ALGF0", "ALT2612", "AMP", "APE", "APEF0", "APENFT",
                    "APP","APT","APTF0","ARB","ARBETH","ARBF0","ATH","ATO","ATOF0","AUSDT","AUSTRALIA200IXF0","AVAX",
                    "AVAXC","AVAXF0","AXS","AXSF0","AZERO","B2M","BAL","BAND","BAT","BCH","BCHN","BEST","BFX","BG1",
                    "BG2","BGB","BLAST","BLASTETH","BLUR","BMN","BNBF0","BOBA","BONK","BORG","BOSON","BTC","BTCDOMF0",
@@ -46,11 +51,14 @@ class Bitfinex(Exchange):
                    "ZEC", "ZECF0", "ZETA", "ZIL", "ZKETH", "ZKX", "ZKXETH", "ZRO", "ZRX"]
     _quote_assets = set(['BTC', 'CNHT', 'ETH', 'EUR', 'EUT', 'GBP', 'JPY', 'MIM', 'MXNT', 'TESTUSD', 'TESTUSDT', 'TRY',
                          'USD', 'UST', 'XAUT'])
-    _local_symbols = {}
-    _global_symbols = {}
 
     _EXCHANGE_SYMBOL_SEPARATOR = ''
 
+    _CLIENT_ORDER_ID_KEYS = ('cid',)
+
+    def _initialize(self):
+        self._set_quote_assets(self._quote_assets, self._currencies)
+
     def _get_uri(self, endpoint, method, signed):
         if signed:
             return self._SIGNED_API_URL + endpoint
@@ -58,20 +66,11 @@ class Bitfinex(Exchange):
             return self._PUBLIC_API_URL + endpoint
 
     def _add_symbol_and_assets(self, local_symbol, global_symbol, quote_asset=None):
-        if local_symbol not in self._local_symbols:
-            self._local_symbols[local_symbol] = global_symbol
-        if global_symbol not in self._global_symbols:
-            self._global_symbols[global_symbol] = local_symbol
-        if quote_asset:
+        if local_symbol not in self._local_symbols and global_symbol not in self._global_symbols:
+            self._add_symbol(local_symbol, global_symbol)
+        if quote_asset and quote_asset not in self._quote_assets:
             self._quote_assets.add(quote_asset)
-
-    def _convert_symbol_to_local(self, symbol):
-        if symbol in self._global_symbols:
-            return self._global_symbols[symbol]
-        else:
-            # this is not correctly right
-            # exchange_info should be called before this method
-            return symbol.replace(self._GLOBAL_SYMBOL_SEPARATOR, '')
+            self._set_quote_assets(self._quote_assets, self._currencies)
 
     def _convert_symbol_to_global(self, symbol):
         """
@@ -90,37 +89,32 @@ class Bitfinex(Exchange):
             self._add_symbol_and_assets(symbol, symbol_in_global_format, assets[1])
         # check if symbol is in format 'BTCUSD'
         else:
-            # check if symbol ends with any of the quote assets
-            for quote_asset in self._quote_assets:
-                if symbol.endswith(quote_asset):
-                    base_asset = symbol.replace(quote_asset, '')
-                    symbol_in_global_format = base_asset + self._GLOBAL_SYMBOL_SEPARATOR + quote_asset
-                    # add info about symbol and quote asset
-                    self._add_symbol_and_assets(symbol, symbol_in_global_format)
-            # finally check if symbol ends with any of the currencies
-            if not symbol_in_global_format:
-                for currency in self._currensies:
-                    if symbol.endswith(currency):
-                        base_asset = symbol.replace(currency, '')
-                        symbol_in_global_format = base_asset + self._GLOBAL_SYMBOL_SEPARATOR + currency
-                        # add info about symbol and quote asset
-                        self._add_symbol_and_assets(symbol, symbol_in_global_format, currency)
+            # the longest quote asset wins, then the longest currency
+            assets = self._split_symbol(symbol)
+            if assets:
+                symbol_in_global_format = assets[0] + self._GLOBAL_SYMBOL_SEPARATOR + assets[1]
+                # add info about symbol and quote asset
+                self._add_symbol_and_assets(symbol, symbol_in_global_format, assets[1])
 
         return symbol_in_global_format
 
+    # https://docs.bitfinex.com/reference/rest-public-conf
+    _CURRENCIES_ENDPOINT = '/v2/conf/pub:list:currency'
+
     def get_exchange_info(self):
-        # https://docs.bitfinex.com/reference/rest-public-conf
         # get all currencies
-        endpoint = '/v2/conf/pub:list:currency'
-        response = self._request(endpoint=endpoint)
-        self._currensies = response[0]
+        currencies = self._request(endpoint=self._CURRENCIES_ENDPOINT)
+        response = self._request(endpoint=self._get_pairs_endpoint())
+        return self._parse_exchange_info(currencies, response)
 
+    def _get_pairs_endpoint(self):
         if self._FUTURES:
-            endpoint = '/v2/conf/pub:info:pair:futures'
-        else:
-            endpoint = '/v2/conf/pub:info:pair'
+            return '/v2/conf/pub:info:pair:futures'
+        return '/v2/conf/pub:info:pair'
 
-        response = self._request(endpoint=endpoint)
+    def _parse_exchange_info(self, currencies, response):
+        self._currencies = currencies[0]
+        self._set_quote_assets(self._quote_assets, self._currencies)
 
         # parse symbols info
         for info in response[0]:
@@ -162,7 +156,8 @@ class Bitfinex(Exchange):
             'volume': candle[5],
         }
 
-    def get_candles(self, symbol: str, interval: str, start: int=None, end: int=None, limit: int=None):
+    def get_candles(self, symbol: str, interval: str, start: int=None, end: int=None, limit: int=None,
+                    as_frame=False):
         # https://docs.bitfinex.com/reference/rest-public-candles
         local_symbol = self._convert_symbol_to_local(symbol)
         local_interval = self.interval_to_local(interval)
@@ -180,7 +175,12 @@ class Bitfinex(Exchange):
         if limit:
             params['limit'] = limit
 
-        response = self._request(endpoint=endpoint, params=params)
+        return self._call(endpoint, params=params, parse=lambda response: self._parse_candles(response, as_frame))
+
+    def _parse_candles(self, response, as_frame=False):
+        if as_frame:
+            # [MTS, OPEN, CLOSE, HIGH, LOW, VOLUME]
+            return CandleFrame.from_rows(response, columns=(0, 1, 3, 4, 2, 5))
         return [self._parse_candle(item) for item in response]
 
     def get_tickers(self):
@@ -194,15 +194,65 @@ class Bitfinex(Exchange):
         # ['fTESTXTZ', 0.0001, 0, 0, 0, 0.0001, 30, 9999364381.501104, 0, 0, 0.0001, 291.51188548, 0.0001, 0.0001, None, None, 0],
         # ['fALG', 0.0007450328767123288, 0, 0, 0, 0.0004, 60, 706584.39111124, -0.000284, -0.4152, 0.0004, 63332.8148604, 0.000684, 0.000684, None, None, 78689.2729467],]
         # Trading pairs starts from 't', funding pairs starts from 'f'
-        response = self._request(endpoint=endpoint, params=params)
+        return self._call(endpoint, params=params, parse=self._parse_tickers)
+
+    def _parse_tickers(self, response):
         result = {}
         for item in response:
             # check if item is trading pair
             if item[0].startswith('t'):
-                symbol = self._convert_symbol_to_global(item[0].strip('t'))
+                symbol = self._convert_symbol_to_global(item[0][1:])
                 result[symbol] = {
                     'price': float(item[7]),
                     'price_str': str(item[7]),
                 }
 
         return result
+
+    def get_ticker_snapshot(self):
+        endpoint = "/v2/tickers"
+        params = {
+            'symbols': 'ALL',
+            }
+
+        return self._call(endpoint, params=params, parse=self._parse_ticker_snapshot)
+
+    def get_order_book(self, symbol, limit=100):
+        # https://docs.bitfinex.com/reference/rest-public-book
+        # limit is 1, 25 or 100
+        endpoint = f'/v2/book/t{self._convert_symbol_to_local(symbol)}/P0'
+        params = {
+            'len': limit,
+            }
+
+        return self._call(endpoint, params=params, parse=lambda response: self._parse_order_book(symbol, response))
+
+    @classmethod
+    def _parse_order_book(cls, symbol, response):
+        book = OrderBook(symbol)
+        bids, asks = cls._split_book_levels(response)
+        book.apply_snapshot(bids, asks)
+        return book
+
+    @staticmethod
+    def _split_book_levels(levels):
+        """
+        Converts [PRICE, COUNT, AMOUNT] levels to bids and asks [price, quantity] levels.
+        Positive amount is a bid, negative amount is an ask, zero count removes the level.
+        """
+        bids = []
+        asks = []
+        for price, count, amount in levels:
+            quantity = abs(amount) if count else 0
+            (bids if amount > 0 else asks).append((price, quantity))
+        return bids, asks
+
+    def _parse_ticker_snapshot(self, response):
+        # tickers do not contain time, so request time is used
+        # trading pairs only, funding pairs starts from 'f'
+        items = [item for item in response if item[0].startswith('t')]
+        return TickerSnapshot(
+            [self._convert_symbol_to_global(item[0][1:]) for item in items],
+            [item[7] if item[7] is not None else 'nan' for item in items],
+            self._generate_timestamp(),
+        )
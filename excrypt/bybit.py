@@ -1,8 +1,9 @@
-import json
-import hmac
-import hashlib
 from .exchange import Exchange
 from .exceptions import *
+from . import jsonlib
+from .ratelimit import RateLimiter
+from .columnar import TickerSnapshot, CandleFrame
+from .orderbook import OrderBook
 
 
 class ByBit(Exchange):
@@ -10,15 +11,33 @@ class ByBit(Exchange):
     https://bybit-exchange.github.io/docs/v5/intro
     """
 
+    _NAME = 'bybit'
     _API_URL = "https://api.bybit.com"
     _CATEGORY = 'spot'
 
     _RECV_WINDOW = '5000'
 
+    INTERVALS = {'1m': '1', '3m': '3', '5m': '5', '15m': '15', '30m': '30', '1h': '60', '2h': '120', '4h': '240',
+                 '6h': '360', '12h': '720', '1d': 'D', '1w': 'W'}
+
+    _CANDLES_LIMIT = 1000
+
+    # https://bybit-exchange.github.io/docs/v5/rate-limit
+    # IP limit, endpoints limits are learned from response headers
+    _RATE_LIMIT = (600, 5)
+
+    _CLIENT_ORDER_ID_KEYS = ('orderLinkId',)
+
+    # orders per create-batch and cancel-batch request, spot accepts up to 10
+    _BATCH_ORDERS_LIMIT = 10
+    _IDEMPOTENT_ENDPOINTS = ('/v5/order/cancel', '/v5/order/cancel-all')
+
     def _initialize(self):
         if self._FUTURES:
             self._CATEGORY = 'linear'
 
+        self._endpoint_rate_limiters = {}
+
         # self.update_headers({'X-BAPI-RECV-WINDOW': '5000'})
 
     def _handle_request_kwargs(self, kwargs, method, timestamp, endpoint, signed):
@@ -34,28 +53,37 @@ class ByBit(Exchange):
             kwargs['headers'].update(headers)
 
         if method != 'get':
-            kwargs['data'] = json.dumps(kwargs['params'])
+            kwargs['data'] = jsonlib.dumps(kwargs['params'])
             del kwargs['params']
 
         return kwargs
 
+    def _get_rate_limiters(self, endpoint):
+        rate_limiters = super()._get_rate_limiters(endpoint)
+        if endpoint in self._endpoint_rate_limiters:
+            rate_limiters = rate_limiters + [self._endpoint_rate_limiters[endpoint]]
+        return rate_limiters
+
+    def _update_rate_limit(self, endpoint, headers):
+        # per second limit of the endpoint and requests left
+        limit = headers.get('X-Bapi-Limit')
+        remaining = headers.get('X-Bapi-Limit-Status')
+        if not limit or remaining is None or not self._RATE_LIMITER:
+            return
+        limit, remaining = int(limit), int(remaining)
+        if endpoint not in self._endpoint_rate_limiters:
+            self._endpoint_rate_limiters[endpoint] = RateLimiter(limit, 1)
+        self._endpoint_rate_limiters[endpoint].calibrate(limit - remaining, limit)
+
     def _generate_signature(self, method, timestamp, path, params):
         timestamp = str(timestamp)
         if method == 'get':
-            params_string = '&'.join([f'{key}={value}' for key, value in params.items()])
+            params_string = self._generate_query_string(params)
         else:
-            params_string = json.dumps(params)
+            params_string = jsonlib.dumps(params)
         signature_string = timestamp + self._API_KEY + self._RECV_WINDOW + params_string
         return self._generate_hmac(signature_string)
 
-    def _generate_hmac(self, signature_string):
-        m = hmac.new(
-            bytes(self._API_SECRET.encode('utf-8')),
-            signature_string.encode('utf-8'),
-            hashlib.sha256
-            )
-        return m.hexdigest()
-
     def _generate_request_headers(self, signed, params_string, method, timestamp):
         headers = {
             'X-BAPI-API-KEY': self._API_KEY,
@@ -72,30 +100,45 @@ class ByBit(Exchange):
 
     def _session_post(self, url, params, headers):
         return self._session.post(url,
-                                  data=json.dumps(params),
+                                  data=jsonlib.dumps(params),
                                   headers=headers,
                                   proxies=self._PROXIES,
                                   timeout=self._REQUESTS_TIMEOUT)
 
-    def get_candles(self, symbol: str, interval: str, start: int = None, end: int = None, limit=200):
+    def interval_to_local(self, interval):
+        # local intervals are accepted as well
+        if interval in self.INTERVALS.values():
+            return interval
+        return super().interval_to_local(interval)
+
+    def get_candles(self, symbol: str, interval: str, start: int = None, end: int = None, limit=200, as_frame=False):
+        # https://bybit-exchange.github.io/docs/v5/market/kline
         endpoint = '/v5/market/kline'
         params = {
             'category': self._CATEGORY,
             'symbol': symbol,
-            'interval': interval,
+            'interval': self.interval_to_local(interval),
             'limit': limit
             }
+        # timestamps in seconds or milliseconds, ByBit expects milliseconds
         if start:
-            params['start'] = start
+            params['start'] = self._parse_timestamp(start)
         if end:
-            params['end'] = end
+            params['end'] = self._parse_timestamp(end)
 
-        return self._request(endpoint=endpoint, params=params)
+        return self._call(endpoint, params=params, parse=lambda response: self._parse_candles(response, as_frame))
+
+    @staticmethod
+    def _parse_candles(response, as_frame=False):
+        if as_frame:
+            # [startTime, open, high, low, close, volume, turnover], newest first
+            return CandleFrame.from_rows(response['result']['list'][::-1])
+        return response
 
     def get_server_time(self):
         endpoint = '/v5/market/time'
 
-        return self._request(endpoint=endpoint)
+        return self._call(endpoint)
 
     def get_tickers(self, **kwargs):
         endpoint = "/v5/market/tickers"
@@ -105,7 +148,44 @@ class ByBit(Exchange):
         if 'symbol' in kwargs:
             params['symbol'] = kwargs['symbol']
 
-        return self._request(endpoint=endpoint, params=params)
+        return self._call(endpoint, params=params)
+
+    def get_ticker_snapshot(self):
+        # https://bybit-exchange.github.io/docs/v5/market/tickers
+        endpoint = "/v5/market/tickers"
+        params = {
+            'category': self._CATEGORY,
+            }
+
+        return self._call(endpoint, params=params, parse=self._parse_ticker_snapshot)
+
+    def get_order_book(self, symbol, limit=100):
+        # https://bybit-exchange.github.io/docs/v5/market/orderbook
+        endpoint = '/v5/market/orderbook'
+        params = {
+            'category': self._CATEGORY,
+            'symbol': symbol,
+            'limit': limit,
+            }
+
+        return self._call(endpoint, params=params, parse=lambda response: self._parse_order_book(symbol, response))
+
+    @staticmethod
+    def _parse_order_book(symbol, response):
+        # {"result": {"s": "BTCUSDT", "b": [["65485.47", "47.081829"]], "a": [...], "ts": 1716863719031,
+        #  "u": 230704, "seq": 1432604333}}
+        result = response['result']
+        book = OrderBook(symbol)
+        book.apply_snapshot(result['b'], result['a'], result['u'], result['ts'])
+        return book
+
+    def _parse_ticker_snapshot(self, response):
+        items = response['result']['list']
+        return TickerSnapshot(
+            [self._convert_symbol_to_global(item['symbol']) for item in items],
+            [item['lastPrice'] or 'nan' for item in items],
+            response['time'],
+        )
 
     def get_balances(self):
         """Get wallet balance,
@@ -134,9 +214,7 @@ class ByBit(Exchange):
             'accountType': account_type
             }
 
-        response = self._request(endpoint=endpoint, params=params, signed=True)
-
-        return response
+        return self._call(endpoint, signed=True, params=params)
 
     def get_open_orders(self, symbol: str):
         # https://bybit-exchange.github.io/docs/v5/order/open-order
@@ -146,5 +224,115 @@ class ByBit(Exchange):
             'symbol': symbol
             }
 
-        response = self._request(endpoint=endpoint, params=params, signed=True)
+        return self._call(endpoint, signed=True, params=params)
+
+    def create_order(self, symbol, side, quantity, price=None, stop_price=None, type='LIMIT', time_in_force=None,
+                     client_order_id=None):
+        # https://bybit-exchange.github.io/docs/v5/order/create-order
+        endpoint = '/v5/order/create'
+        params = self._get_order_params(symbol, side, quantity, price, stop_price, type, time_in_force,
+                                        client_order_id or self._generate_client_order_id())
+
+        return self._call(endpoint, 'post', True, params=params,
+                          parse=lambda response: self._parse_order_response(response, symbol, side, type, price,
+                                                                            quantity))
+
+    def cancel_order(self, symbol=None, order_id=None):
+        # https://bybit-exchange.github.io/docs/v5/order/cancel-order
+        if not symbol or not order_id:
+            raise ExchangeException('symbol and order_id must be specified to cancel order')
+
+        endpoint = '/v5/order/cancel'
+        params = {
+            'category': self._CATEGORY,
+            'symbol': symbol,
+            'orderId': order_id,
+            }
+
+        return self._call(endpoint, 'post', True, params=params,
+                          parse=lambda response: self._parse_order_response(response, symbol, '', '',
+                                                                            status='canceled'))
+
+    def _parse_order_response(self, response, symbol, side, type, price=None, quantity=None, status='new'):
+        # order endpoints return only the order id
+        response = self._check_response(response)
+        return self._make_order(symbol, response['result']['orderId'], side, type, price, quantity, status, response)
+
+    def _get_order_params(self, symbol, side, quantity, price=None, stop_price=None, type='LIMIT', time_in_force=None,
+                          client_order_id=None):
+        type = type.upper()
+        params = {
+            'category': self._CATEGORY,
+            'symbol': symbol,
+            'side': side.capitalize(),
+            'qty': str(quantity),
+            }
+
+        if type == 'LIMIT':
+            params['orderType'] = 'Limit'
+            params['price'] = str(price)
+            params['timeInForce'] = time_in_force or self.TIME_IN_FORCE_GTC
+        elif type == 'MARKET':
+            params['orderType'] = 'Market'
+        elif type in ['STOP_MARKET', 'TAKE_PROFIT_MARKET']:
+            params['orderType'] = 'Market'
+            params['triggerPrice'] = str(stop_price)
+        else:
+            raise ExchangeException('Unknown order type: %s' % type)
+
+        if client_order_id:
+            params['orderLinkId'] = client_order_id
+
+        return params
+
+    @staticmethod
+    def _check_response(response):
+        if response.get('retCode'):
+            raise ExchangeAPIException(f"{response['retCode']} {response.get('retMsg')}")
         return response
+
+    def _get_create_orders_batches(self, orders):
+        # https://bybit-exchange.github.io/docs/v5/order/batch-place
+        batches = []
+        for batch in self._group_orders(orders, self._BATCH_ORDERS_LIMIT):
+            requests = []
+            for _, order in batch:
+                order_params = self._get_order_params(**order)
+                del order_params['category']
+                requests.append(order_params)
+            params = {
+                'category': self._CATEGORY,
+                'request': requests,
+                }
+            batch_orders = [order for _, order in batch]
+            batches.append(([index for index, _ in batch], '/v5/order/create-batch', 'post', params,
+                            lambda response, batch_orders=batch_orders: self._parse_batch_orders(response, batch_orders)))
+        return batches
+
+    def _get_cancel_orders_batches(self, orders):
+        # https://bybit-exchange.github.io/docs/v5/order/batch-cancel
+        batches = []
+        for batch in self._group_orders(orders, self._BATCH_ORDERS_LIMIT):
+            params = {
+                'category': self._CATEGORY,
+                'request': [{'symbol': order['symbol'], 'orderId': order['order_id']} for _, order in batch],
+                }
+            batch_orders = [dict(order, side='', type='', status='canceled') for _, order in batch]
+            batches.append(([index for index, _ in batch], '/v5/order/cancel-batch', 'post', params,
+                            lambda response, batch_orders=batch_orders: self._parse_batch_orders(response, batch_orders)))
+        return batches
+
+    def _parse_batch_orders(self, response, orders):
+        # results and errors are aligned with requests:
+        # {"result": {"list": [{"symbol": "BTCUSDT", "orderId": "1666800494330512128", ...}]},
+        #  "retExtInfo": {"list": [{"code": 0, "msg": "OK"}]}}
+        self._check_response(response)
+        results = []
+        for order, item, info in zip(orders, response['result']['list'], response['retExtInfo']['list']):
+            if info['code']:
+                results.append(ExchangeAPIException(f"{info['code']} {info['msg']}"))
+            else:
+                results.append(self._make_order(order['symbol'], item['orderId'], order['side'],
+                                                order.get('type', 'LIMIT'), order.get('price'), order.get('quantity'),
+                                                order.get('status', 'new'), item))
+        return results
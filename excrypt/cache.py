@@ -0,0 +1,81 @@
+import gzip
+import json
+import os
+import tempfile
+import time
+from dataclasses import is_dataclass
+
+from .dataclasses import SymbolInfo
+
+
+class ExchangeInfoCache:
+    """
+    On-disk cache of parsed exchange info, one gzipped JSON file per exchange and market.
+    Raw exchange responses are not stored to keep files compact, quantizers are compiled again on restore.
+
+    :param path: cache directory, ~/.cache/excrypt by default
+    :param ttl: seconds after which cached exchange info is refreshed
+
+    Example:
+    cache = ExchangeInfoCache(ttl=3600)
+    client = Binance()
+    client.load_exchange_info(cache)
+    """
+
+    _SKIPPED_KEYS = ('response', 'quantizer')
+
+    def __init__(self, path=None, ttl=3600):
+        self.path = path or os.path.join(os.path.expanduser('~'), '.cache', 'excrypt')
+        self.ttl = ttl
+
+    def _get_file_path(self, exchange_name, market):
+        return os.path.join(self.path, f'{exchange_name}_{market}_exchange_info.json.gz')
+
+    def load(self, exchange_name, market):
+        """
+        Returns (created timestamp, symbols info) or None if there is no readable cache.
+        """
+        try:
+            with gzip.open(self._get_file_path(exchange_name, market), 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # stale or schema-mismatched files are a miss, exchange info is requested again
+        try:
+            if data['type'] == 'SymbolInfo':
+                symbols_info = {symbol: SymbolInfo(**info) for symbol, info in data['symbols'].items()}
+            else:
+                symbols_info = data['symbols']
+            return data['created'], symbols_info
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def save(self, exchange_name, market, symbols_info):
+        symbols = {}
+        record_type = 'dict'
+        for symbol, info in symbols_info.items():
+            if is_dataclass(info):
+                record_type = 'SymbolInfo'
+                info = {key: getattr(info, key) for key in info.__dataclass_fields__}
+            symbols[symbol] = {key: value for key, value in info.items() if key not in self._SKIPPED_KEYS}
+
+        data = {
+            'created': time.time(),
+            'type': record_type,
+            'symbols': symbols,
+        }
+
+        # write to a temporary file first, so readers never see a partial file
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, self._get_file_path(exchange_name, market))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def is_expired(self, created):
+        return time.time() - created > self.ttl
@@ -15,21 +15,26 @@ class Client:
                  futures=False,
                  proxies=None,
                  requests_params=None,
-                 requests_timeout=10):
+                 requests_timeout=10,
+                 connection_pool=None):
 
         if exchange_name == 'binance':
             self._exchange = self.binance(api_key=api_key, api_secret=api_secret, proxies=proxies, futures=futures,
-                                          requests_params=requests_params, requests_timeout=requests_timeout)
+                                          requests_params=requests_params, requests_timeout=requests_timeout,
+                                          connection_pool=connection_pool)
         elif exchange_name == 'kucoin':
             self._exchange = self.kucoin(api_key=api_key, api_secret=api_secret, api_password=api_password,
                                          futures=futures, proxies=proxies,
-                                         requests_params=requests_params, requests_timeout=requests_timeout)
+                                         requests_params=requests_params, requests_timeout=requests_timeout,
+                                         connection_pool=connection_pool)
         elif exchange_name == 'bybit':
             self._exchange = self.bybit(api_key=api_key, api_secret=api_secret, proxies=proxies, futures=futures,
-                                        requests_params=requests_params, requests_timeout=requests_timeout)
+                                        requests_params=requests_params, requests_timeout=requests_timeout,
+                                        connection_pool=connection_pool)
         elif exchange_name == 'bitfinex':
             self._exchange = self.bitfinex(api_key=api_key, api_secret=api_secret, proxies=proxies, futures=futures,
-                                           requests_params=requests_params, requests_timeout=requests_timeout)
+                                           requests_params=requests_params, requests_timeout=requests_timeout,
+                                           connection_pool=connection_pool)
         else:
             raise ExchangeException(f"Unknown exchange name {exchange_name}")
 
@@ -0,0 +1,157 @@
+"""Columnar results backed by NumPy arrays.
+
+Requires numpy: pip install excrypt[numpy]
+"""
+import datetime as dt
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+from .exceptions import *
+
+
+def _require_numpy():
+    if np is None:
+        raise ExchangeException("numpy is required for columnar results")
+
+
+class TickerSnapshot:
+    """
+    Prices of all symbols at once.
+
+    Attributes:
+        symbols (np.ndarray): global symbols
+        price (np.ndarray): float64 last prices, NaN if unknown
+        timestamp (np.ndarray): int64 millisecond timestamps
+        index (dict): symbol -> row
+
+    Example:
+    snapshot = client.get_ticker_snapshot()
+    snapshot.price[snapshot.index['BTC/USDT']]
+    snapshot.symbols[snapshot.price > 100]
+    """
+
+    __slots__ = ('symbols', 'price', 'timestamp', 'index')
+
+    def __init__(self, symbols, price, timestamp):
+        _require_numpy()
+        self.symbols = np.asarray(symbols, dtype=object)
+        # numpy parses numeric strings, so raw exchange values can be passed as is
+        self.price = np.asarray(price, dtype=np.float64)
+        timestamp = np.asarray(timestamp, dtype=np.int64)
+        if timestamp.ndim == 0:
+            timestamp = np.full(len(self.symbols), timestamp, dtype=np.int64)
+        self.timestamp = timestamp
+        self.index = {symbol: row for row, symbol in enumerate(symbols)}
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self.index
+
+    def get_price(self, symbol):
+        return float(self.price[self.index[symbol]])
+
+    def __repr__(self):
+        return f'{type(self).__name__}({len(self)} symbols)'
+
+
+class CandleFrame:
+    """
+    Candles as NumPy columns: int64 timestamps in seconds and float64 OHLCV.
+
+    Slicing returns a frame of views on the same arrays (no copy), indexing with an int
+    returns a single candle dict in get_candles format.
+
+    Example:
+    frame = client.get_candles('BTC/USDT', '1h', as_frame=True)
+    frame.close[-24:].mean()
+    last_day = frame[-24:]
+    """
+
+    COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+    __slots__ = COLUMNS
+
+    def __init__(self, timestamp, open, high, low, close, volume):
+        _require_numpy()
+        self.timestamp = np.asarray(timestamp, dtype=np.int64)
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = np.asarray(volume, dtype=np.float64)
+
+    @classmethod
+    def empty(cls):
+        _require_numpy()
+        return cls(*(np.empty(0) for _ in cls.COLUMNS))
+
+    @classmethod
+    def from_rows(cls, rows, columns=(0, 1, 2, 3, 4, 5), milliseconds=True):
+        """
+        Builds frame from raw exchange rows in a single conversion.
+        :param rows: list of rows, numbers or numeric strings
+        :param columns: positions of timestamp, open, high, low, close and volume in a row
+        :param milliseconds: row timestamps are in milliseconds
+        """
+        _require_numpy()
+        if not len(rows):
+            return cls.empty()
+        # transposed copy keeps every column contiguous
+        data = np.asarray(rows, dtype=np.float64).T.copy()
+        timestamp = data[columns[0]].astype(np.int64)
+        if milliseconds:
+            timestamp //= 1000
+        return cls(timestamp, *(data[column] for column in columns[1:]))
+
+    @classmethod
+    def concat(cls, frames):
+        """
+        Concatenates frames, every column is allocated once.
+        """
+        _require_numpy()
+        frames = [frame for frame in frames if len(frame)]
+        if not frames:
+            return cls.empty()
+        return cls(*(np.concatenate([getattr(frame, column) for frame in frames]) for column in cls.COLUMNS))
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return self._get_candle(key)
+        return type(self)(*(getattr(self, column)[key] for column in self.COLUMNS))
+
+    def _get_candle(self, row):
+        timestamp = int(self.timestamp[row])
+        date_time = dt.datetime.fromtimestamp(timestamp, dt.timezone.utc).replace(tzinfo=None)
+        return {
+            'date': date_time.date(),
+            'date_time': date_time,
+            'timestamp': timestamp,
+            'open': float(self.open[row]),
+            'high': float(self.high[row]),
+            'low': float(self.low[row]),
+            'close': float(self.close[row]),
+            'volume': float(self.volume[row]),
+        }
+
+    def between(self, start=None, end=None):
+        """
+        Returns frame of candles with start <= timestamp <= end, timestamps in seconds.
+        Frame timestamps should be sorted. Result is a view, not a copy.
+        """
+        left = 0 if start is None else np.searchsorted(self.timestamp, start, side='left')
+        right = len(self) if end is None else np.searchsorted(self.timestamp, end, side='right')
+        return self[left:right]
+
+    def to_dicts(self):
+        return [self._get_candle(row) for row in range(len(self))]
+
+    def __repr__(self):
+        return f'{type(self).__name__}({len(self)} candles)'
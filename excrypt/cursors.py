@@ -0,0 +1,60 @@
+import json
+import os
+import tempfile
+import threading
+
+
+class CursorStore:
+    """
+    Persistent cursors of incremental history sync, a single JSON file.
+    Every update is written at once, so an interrupted sync continues from the last saved page.
+
+    Keys are built by exchanges from exchange name, market, account, symbol and endpoint,
+    account is a hash of the API key, keys themselves are never stored.
+
+    :param path: cursors file, ~/.cache/excrypt/cursors.json by default
+
+    Example:
+    cursors = CursorStore()
+    client = Binance(API_KEY, API_SECRET)
+    new_trades = client.sync_trades('BTC/USDT', cursors)
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(os.path.expanduser('~'), '.cache', 'excrypt', 'cursors.json')
+        self._lock = threading.Lock()
+        self._cursors = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._cursors.get(key, default)
+
+    def set(self, key, value):
+        with self._lock:
+            self._cursors[key] = value
+            self._save()
+
+    def delete(self, key):
+        with self._lock:
+            if self._cursors.pop(key, None) is not None:
+                self._save()
+
+    def _save(self):
+        # write to a temporary file first, so readers never see a partial file
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._cursors, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
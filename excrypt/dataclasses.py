@@ -1,8 +1,68 @@
-from datetime import datetime
-from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from dataclasses import dataclass, field, fields
 
+# Records are slotted to keep long histories compact.
+# Raw exchange responses are kept in the response field unless the exchange is created with keep_response=False.
+#
+# Numeric and datetime fields of tickers, orders and trades are decoded lazily:
+# parsers keep raw strings (price_str, qty_str, ...) and timestamps, values are decoded on first access
+# and cached. Assigning a value (order.price = 1.5 or Order(price=1.5)) overrides decoding.
+#
+# Lazy fields are regular dataclass fields in their usual positions, so comparisons, repr, asdict, replace,
+# copies and pickles see decoded values.
 
-@dataclass
+_UNDECODED = object()  # lazy field is not decoded yet
+
+
+def _timestamp_to_datetime(timestamp):
+    """Converts millisecond timestamp to naive UTC datetime."""
+    return datetime.fromtimestamp(timestamp // 1000, timezone.utc).replace(tzinfo=None)
+
+
+def _lazy(raw_name, decode=float):
+    """
+    Field decoded from the raw field on first access.
+    """
+    return field(default=_UNDECODED, metadata={'lazy': (raw_name, decode)})
+
+
+class _Lazy:
+    """
+    Descriptor of a lazy field wrapping its slot, decodes the raw field while the slot holds _UNDECODED.
+    """
+
+    __slots__ = ('slot', 'raw_name', 'decode')
+
+    def __init__(self, slot, raw_name, decode):
+        self.slot = slot
+        self.raw_name = raw_name
+        self.decode = decode
+
+    def __get__(self, record, owner=None):
+        if record is None:
+            return self
+        value = self.slot.__get__(record, owner)
+        if value is _UNDECODED:
+            raw = getattr(record, self.raw_name)
+            value = None if raw is None else self.decode(raw)
+            self.slot.__set__(record, value)
+        return value
+
+    def __set__(self, record, value):
+        self.slot.__set__(record, value)
+
+
+def _lazy_record(cls):
+    """
+    Replaces slots of lazy fields of a slotted dataclass with decoding descriptors.
+    """
+    for record_field in fields(cls):
+        if 'lazy' in record_field.metadata:
+            setattr(cls, record_field.name, _Lazy(vars(cls)[record_field.name], *record_field.metadata['lazy']))
+    return cls
+
+
+@dataclass(slots=True)
 class SymbolInfo:
     symbol: str = None
     original_symbol: str = None
@@ -20,9 +80,11 @@ class SymbolInfo:
     min_order_size_str: str = None
     status: str = None
     response: dict = None
-    
+    # Quantizer compiled from filters by get_exchange_info, not cached
+    quantizer: object = field(default=None, repr=False, compare=False)
 
-@dataclass
+
+@dataclass(slots=True)
 class Balance:
     asset: str = None
     free: float = None
@@ -34,52 +96,57 @@ class Balance:
     timestamp: int = None
     datetime: datetime = None
     response: dict = None
-    
 
-@dataclass
+
+@_lazy_record
+@dataclass(slots=True)
 class Ticker:
     symbol: str = None
-    price: float = None
+    price: float = _lazy('price_str')
     price_str: str = None
     timestamp: int = None
-    datetime: datetime = None
+    datetime: datetime = _lazy('timestamp', _timestamp_to_datetime)
     response: dict = None
 
 
-@dataclass
+@_lazy_record
+@dataclass(slots=True)
 class Order:
     symbol: str = None
     order_id: str = None
-    price: float = None
+    price: float = _lazy('price_str')
     price_str: str = None
-    stop_price: float = None
+    stop_price: float = _lazy('stop_price_str')
     stop_price_str: str = None
-    qty: float = None
+    qty: float = _lazy('qty_str')
     qty_str: str = None
-    orig_qty: float = None
+    orig_qty: float = _lazy('orig_qty_str')
     orig_qty_str: str = None
-    quote_qty: float = None
+    quote_qty: float = _lazy('quote_qty_str')
     quote_qty_str: str = None
     status: str = None
     type: str = None
     side: str = None
     timestamp: int = None
-    datetime: datetime = None
+    datetime: datetime = _lazy('timestamp', _timestamp_to_datetime)
     response: dict = None
+    base_asset: str = None
+    quote_asset: str = None
 
 
-@dataclass
+@_lazy_record
+@dataclass(slots=True)
 class Trade:
     symbol: str = None
     order_id: str = None
     trade_id: str = None
-    price: float = None
+    price: float = _lazy('price_str')
     price_str: str = None
-    qty: float = None
+    qty: float = _lazy('qty_str')
     qty_str: str = None
-    quote_qty: float = None
+    quote_qty: float = _lazy('quote_qty_str')
     quote_qty_str: str = None
-    comm: float = None
+    comm: float = _lazy('comm_str')
     comm_str: str = None
     comm_asset: str = None
     pnl: float = None
@@ -91,5 +158,5 @@ class Trade:
     buyer: bool = None
     maker: bool = None
     timestamp: int = None
-    datetime: datetime = None
+    datetime: datetime = _lazy('timestamp', _timestamp_to_datetime)
     response: dict = None
@@ -1,9 +1,19 @@
 import requests
 import time
-import math
 import hmac
 import hashlib
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from .exceptions import *
+from . import jsonlib
+from .dataclasses import Order
+from .symbols import SuffixMatcher
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy
+from .columnar import CandleFrame, np
+from .quantizer import Quantizer, _to_decimal
+from .grid import build_grid
 
 
 class Exchange:
@@ -15,8 +25,31 @@ class Exchange:
     _GLOBAL_SYMBOL_SEPARATOR = '/'  # global (common) symbol separator
     _EXCHANGE_SYMBOL_SEPARATOR = '/'  # exchange symbol separator
 
+    _NAME = ''  # exchange name as accepted by Client
     _API_URL = ''
 
+    # request weight limit (weight, interval in seconds) applied to all endpoints, None if unknown
+    _RATE_LIMIT = None
+    # request weights of endpoints, other endpoints weight 1
+    _ENDPOINT_WEIGHTS = {}
+
+    # maximum candles returned by a single get_candles request, None if get_candles is not implemented
+    _CANDLES_LIMIT = None
+
+    # concurrent requests of _fetch_pages
+    _PAGES_CONCURRENCY = 4
+
+    # concurrent requests of create_orders and cancel_orders
+    _ORDERS_CONCURRENCY = 8
+
+    _hmac_template = None  # HMAC keyed with _hmac_secret
+    _hmac_secret = None
+
+    # request params holding client order id, orders with it may be retried safely
+    _CLIENT_ORDER_ID_KEYS = ()
+    # non GET/DELETE endpoints which are safe to retry, e.g. cancels sent with POST
+    _IDEMPOTENT_ENDPOINTS = ()
+
     # intervals should be set correctly for each exchange
     INTERVALS = {'1m': '1m', '3m': '3m', '5m': '5m', '15m': '15m', '30m': '30m', '1h': '1h', '2h': '2h', '4h': '4h',
                  '6h': '6h', '8h': '8h', '12h': '12h', '1d': '1d', '1w': '1w'}
@@ -57,7 +90,13 @@ class Exchange:
                  proxies=None,
                  futures=False,
                  requests_params=None,
-                 requests_timeout=10):
+                 requests_timeout=10,
+                 connection_pool=None,
+                 rate_limit=True,
+                 rate_limiter=None,
+                 retry=True,
+                 retry_policy=None,
+                 keep_response=True):
 
         self._API_KEY = api_key
         self._API_SECRET = api_secret
@@ -67,14 +106,57 @@ class Exchange:
         self._SPOT = False if futures else True
         self._REQUESTS_PARAMS = requests_params
         self._REQUESTS_TIMEOUT = requests_timeout
+        self._CONNECTION_POOL = connection_pool
+        self._KEEP_RESPONSE = keep_response  # keep raw responses in parsed records
+        self.symbols_info = {}
+        self.balances = {}
+        self.tickers = {}
+        self._local_symbols = {}  # local symbol -> global symbol index
+        self._global_symbols = {}  # global symbol -> local symbol index
+        self._quote_asset_matchers = []  # used to split symbols without separator
         self._session = self._init_session()
         self._init_proxies()
         self._initialize()
+        self._RATE_LIMITER = rate_limiter or (self._init_rate_limiter() if rate_limit else None)
+        self._RETRY_POLICY = retry_policy or (RetryPolicy() if retry else None)
+
+    def _add_symbol(self, local_symbol, global_symbol):
+        """
+        Adds symbol pair to the local <-> global symbols index.
+        Exchanges should call it from get_exchange_info for every known symbol,
+        so symbol conversions are simple dict lookups.
+        """
+        self._local_symbols[local_symbol] = global_symbol
+        self._global_symbols[global_symbol] = local_symbol
+
+    def _set_quote_assets(self, *quote_assets):
+        """
+        Sets quote assets used to split symbols without separator.
+        Several assets lists can be passed, they are checked in the given order.
+        """
+        self._quote_asset_matchers = [SuffixMatcher(assets) for assets in quote_assets]
+
+    def _split_symbol(self, symbol):
+        """
+        Splits symbol without separator into base and quote assets by the longest known quote asset.
+        Returns None if no quote asset matches.
+        """
+        for matcher in self._quote_asset_matchers:
+            assets = matcher.split(symbol)
+            if assets:
+                return assets
+        return None
 
     def _convert_symbol_to_local(self, symbol):
+        local_symbol = self._global_symbols.get(symbol)
+        if local_symbol is not None:
+            return local_symbol
         return symbol.replace(self._GLOBAL_SYMBOL_SEPARATOR, self._EXCHANGE_SYMBOL_SEPARATOR)
 
     def _convert_symbol_to_global(self, symbol):
+        global_symbol = self._local_symbols.get(symbol)
+        if global_symbol is not None:
+            return global_symbol
         return symbol.replace(self._EXCHANGE_SYMBOL_SEPARATOR, self._GLOBAL_SYMBOL_SEPARATOR)
 
     def _send_symbol(self, symbol):
@@ -116,6 +198,8 @@ class Exchange:
 
     def _init_session(self):
         session = requests.session()
+        if self._CONNECTION_POOL:
+            self._CONNECTION_POOL.mount(session)
         return session
 
     def _init_proxies(self):
@@ -133,7 +217,105 @@ class Exchange:
         return self._API_URL + endpoint
 
     def _request(self, endpoint: str, method=None, signed=False, **kwargs):
+        retryable = self._is_retryable(endpoint, method, kwargs.get('params'))
+        attempt = 0
+        delay = None
+
+        while True:
+            try:
+                response = self._send_request(endpoint, method, signed, dict(kwargs))
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+                delay = self._get_retry_delay(retryable, endpoint, attempt, delay)
+                if delay is None:
+                    raise
+            else:
+                if not retryable or not self._RETRY_POLICY.is_retryable_status(response.status_code):
+                    return self._handle_response(response)
+                delay = self._get_retry_delay(retryable, endpoint, attempt, delay,
+                                              response.headers.get('Retry-After'))
+                if delay is None:
+                    return self._handle_response(response)
+
+            time.sleep(delay)
+            attempt += 1
+
+    def _send_request(self, endpoint, method, signed, kwargs):
+        weight = self._get_request_weight(endpoint, kwargs.get('params'))
+        for rate_limiter in self._get_rate_limiters(endpoint):
+            rate_limiter.acquire(weight)
+
+        # request is signed again on every attempt, so timestamp is fresh
+        method, uri, kwargs = self._prepare_request(endpoint, method, signed, kwargs)
+        response = getattr(self._session, method)(uri, **kwargs)
+        self._handle_rate_limit(endpoint, response)
+        return response
+
+    def _is_retryable(self, endpoint, method, params):
+        """
+        Checks if request is idempotent and may be retried.
+        GET and DELETE requests are safe, orders creation is retried only with client order id.
+        """
+        if not self._RETRY_POLICY:
+            return False
+        if method is None or method.lower() in ('get', 'delete'):
+            return True
+        if endpoint in self._IDEMPOTENT_ENDPOINTS:
+            return True
+        return bool(params) and any(params.get(key) for key in self._CLIENT_ORDER_ID_KEYS)
+
+    def _get_retry_delay(self, retryable, endpoint, attempt, previous_delay, retry_after=None):
+        if not retryable:
+            return None
+        return self._RETRY_POLICY.get_delay(endpoint, attempt, previous_delay, retry_after)
+
+    def get_retry_stats(self):
+        """
+        Returns retries count and cumulative backoff time in seconds per endpoint.
+        """
+        if not self._RETRY_POLICY:
+            return {}
+        return self._RETRY_POLICY.get_stats()
+
+    def _init_rate_limiter(self):
+        if self._RATE_LIMIT:
+            return RateLimiter(*self._RATE_LIMIT)
+        return None
+
+    def _get_rate_limiters(self, endpoint):
+        """
+        Returns rate limiters the endpoint request should pass.
+        """
+        if self._RATE_LIMITER:
+            return [self._RATE_LIMITER]
+        return []
+
+    def _get_request_weight(self, endpoint, params):
+        return self._ENDPOINT_WEIGHTS.get(endpoint, 1)
 
+    def _handle_rate_limit(self, endpoint, response):
+        """
+        Updates rate limiters after response.
+        Requests are paused on 429 (too many requests) and 418 (IP banned) responses.
+        """
+        if response.status_code in (418, 429):
+            retry_after = response.headers.get('Retry-After')
+            seconds = float(retry_after) if retry_after else None
+            for rate_limiter in self._get_rate_limiters(endpoint):
+                rate_limiter.pause(seconds if seconds is not None else rate_limiter.interval)
+        else:
+            self._update_rate_limit(endpoint, response.headers)
+
+    def _update_rate_limit(self, endpoint, headers):
+        """
+        Calibrates rate limiters from response headers, should be implemented by exchanges reporting used limits.
+        """
+        pass
+
+    def _prepare_request(self, endpoint, method, signed, kwargs):
+        """
+        Prepares request method, uri and signed requests kwargs.
+        Shared by sync and async transports.
+        """
         if signed and not self._API_KEY:
             raise ExchangeException("Authenticated endpoints require keys")
 
@@ -149,8 +331,9 @@ class Exchange:
         if self._REQUESTS_PARAMS:
             kwargs.update(self._REQUESTS_PARAMS)
 
-        kwargs['params'] = kwargs.get('params', {})
-        kwargs['headers'] = kwargs.get('headers', {})
+        # copy params and headers, so signing does not modify caller dicts
+        kwargs['params'] = dict(kwargs.get('params', {}))
+        kwargs['headers'] = dict(kwargs.get('headers', {}))
 
         # timestamp
         timestamp = self._generate_timestamp()
@@ -159,8 +342,7 @@ class Exchange:
 
         uri = self._get_uri(endpoint, method, signed)
 
-        response = getattr(self._session, method)(uri, **kwargs)
-        return self._handle_response(response)
+        return method, uri, kwargs
 
     def _handle_request_kwargs(self, kwargs, method, timestamp, endpoint, signed):
         return kwargs
@@ -177,6 +359,17 @@ class Exchange:
     def _delete(self, endpoint: str, signed=False, **kwargs):
         return self._request(endpoint, 'delete', signed, **kwargs)
 
+    def _call(self, endpoint: str, method=None, signed=False, parse=None, **kwargs):
+        """
+        Makes a request and returns the response processed by parse, the raw response if parse is None.
+        Endpoints made of a single request return _call, so async exchanges share them:
+        AsyncExchange._call awaits the request and the endpoint returns a coroutine.
+        """
+        response = self._request(endpoint=endpoint, method=method, signed=signed, **kwargs)
+        if parse is None:
+            return response
+        return parse(response)
+
     @staticmethod
     def _handle_response(response: requests.Response):
 
@@ -184,17 +377,21 @@ class Exchange:
             raise ExchangeAPIException(f"Status code {response.status_code}. {response.text}")
 
         try:
-            return response.json()
+            return jsonlib.loads(response.content)
         except ValueError:
             raise ExchangeRequestException(f"Invalid Response: {response.text}")
 
+    def _get_hmac(self, signature_string):
+        # the secret is hashed into the key state once, every signature copies the keyed state
+        if self._hmac_secret is not self._API_SECRET:
+            self._hmac_template = hmac.new(self._API_SECRET.encode('utf-8'), digestmod=hashlib.sha256)
+            self._hmac_secret = self._API_SECRET
+        m = self._hmac_template.copy()
+        m.update(signature_string.encode('utf-8'))
+        return m
+
     def _generate_hmac(self, signature_string) -> str:
-        m = hmac.new(
-            self._API_SECRET.encode('utf-8'),
-            signature_string.encode('utf-8'),
-            hashlib.sha256
-            )
-        return m.hexdigest()
+        return self._get_hmac(signature_string).hexdigest()
 
     def _generate_query_string(self, params: dict) -> str:
         return '&'.join([f'{key}={value}' for key, value in params.items()])
@@ -211,7 +408,8 @@ class Exchange:
         Repeatedly makes requests to an endpoint until an empty response is received.
 
         This method is useful for paginated API endpoints where data is retrieved in chunks.
-        It accumulates all responses in a list and returns it.
+        It accumulates all responses in a list and returns it, see _iter_paginated_data to process pages
+        as they arrive.
 
         Parameters:
         - endpoint (str): The API endpoint to send requests to.
@@ -225,15 +423,83 @@ class Exchange:
         - list: A list of all accumulated responses.
         """
         responses = []
-        while True:
-            response = self._request(endpoint=endpoint, signed=True, params=params)
-            if not len(response):
-                break
+        for response in self._iter_paginated_data(endpoint, method, signed, params, page_key, position_key,
+                                                   prefetch=False):
             responses += response
-            position = response[-1][position_key] + 1
-            params[page_key] = position
         return responses
 
+    def _iter_paginated_data(self, endpoint, method, signed, params, page_key, position_key, prefetch=True,
+                             page_size=None):
+        """
+        Yields responses of a paginated endpoint page by page until an empty response is received
+        or a response shorter than page_size, which saves the last empty request.
+
+        With prefetch the next page is requested in a background thread while the caller processes
+        the current one. Closing the generator (e.g. break in a for loop) stops pagination,
+        at most one prefetched page is wasted.
+
+        Parameters are the same as in _get_paginated_data, params are not modified.
+        """
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+
+        def request(params):
+            if executor:
+                return executor.submit(self._request, endpoint=endpoint, method=method, signed=signed, params=params)
+            return self._request(endpoint=endpoint, method=method, signed=signed, params=params)
+
+        try:
+            pending = request(dict(params))
+            while True:
+                response = pending.result() if executor else pending
+                if not len(response):
+                    break
+                if page_size and len(response) < page_size:
+                    pending = None
+                    yield response
+                    break
+                next_params = dict(params)
+                next_params[page_key] = response[-1][position_key] + 1
+                if executor:
+                    pending = request(next_params)
+                yield response
+                if not executor:
+                    pending = request(next_params)
+                params = next_params
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def _fetch_pages(self, endpoint, method, signed, params, page_key, pages, max_workers=None):
+        """
+        Requests pages of an endpoint whose total page count is known up front, e.g. from the first response.
+        Pages are requested concurrently, every request still waits for the rate limiter.
+
+        Parameters:
+        - params (dict): The parameters to include in every request, params are not modified.
+        - page_key (str): The key in the request parameters holding page number.
+        - pages (iterable): Page numbers to request.
+        - max_workers (int): Concurrent requests, _PAGES_CONCURRENCY by default.
+
+        Returns:
+        - list: Responses in pages order.
+        """
+        pages = list(pages)
+        if not pages:
+            return []
+
+        def request(page):
+            return self._request(endpoint, method, signed, params=dict(params, **{page_key: page}))
+
+        with ThreadPoolExecutor(max_workers=min(max_workers or self._PAGES_CONCURRENCY, len(pages))) as executor:
+            return list(executor.map(request, pages))
+
+    def _get_cursor_key(self, symbol, endpoint):
+        """
+        Returns CursorStore key of an account history endpoint, account is identified by API key hash.
+        """
+        account = hashlib.sha256(self._API_KEY.encode()).hexdigest()[:16] if self._API_KEY else ''
+        return f'{self._NAME}:{self._get_market()}:{account}:{symbol}:{endpoint}'
+
     def update_headers(self, headers):
         self._session.headers.update(headers)
 
@@ -243,12 +509,33 @@ class Exchange:
 
     @staticmethod
     def get_precision(value):
-        return -int(math.log10(float(value))) if value else 0
+        """
+        Returns decimals of a tick size: '0.01' is 2, '0.25' is 2, '10' is -1.
+        """
+        if not value or not float(value):
+            return 0
+        return -_to_decimal(value).normalize().as_tuple().exponent
 
     @staticmethod
     def truncate_value(value, precision):
-        factor = 10 ** precision
-        return math.trunc(value * factor) / factor
+        # truncated on the decimal value, so 0.29 is not truncated to 0.28
+        units = int(_to_decimal(value).scaleb(precision))
+        return units / 10 ** precision if precision >= 0 else float(units * 10 ** -precision)
+
+    def get_quantizer(self, symbol):
+        """
+        Returns Quantizer of a symbol compiled by get_exchange_info.
+        """
+        if not self.symbols_info:
+            self.get_exchange_info()
+        info = self.symbols_info.get(symbol)
+        if info is None:
+            raise ExchangeException(f"Unknown symbol {symbol}")
+        if isinstance(info, dict):
+            raise NotImplementedException
+        if info.quantizer is None:
+            info.quantizer = Quantizer.from_symbol_info(info)
+        return info.quantizer
 
     def interval_to_local(self, interval):
         """
@@ -269,12 +556,59 @@ class Exchange:
         :return:
         """
         minutes_in_interval = {'1m': 1, '3m': 3, '5m': 5, '15m': 15, '30m': 30, '1h': 60, '2h': 60*2, '4h': 60*4,
-                               '6h': 60*6, '8h': 60*8, '12h': 60*12, '1d': 60*24, '1w': 60*24*7}
+                               '3h': 60*3, '6h': 60*6, '8h': 60*8, '12h': 60*12, '1d': 60*24, '1w': 60*24*7,
+                               '14d': 60*24*14}
         if interval in minutes_in_interval:
             return minutes_in_interval[interval]
         else:
             raise ExchangeException(f"Unknown interval {interval}")
 
+    def _get_market(self):
+        return 'futures' if self._FUTURES else 'spot'
+
+    def load_exchange_info(self, cache, background=True):
+        """
+        Loads symbols info from ExchangeInfoCache without requesting the exchange.
+        Expired cache is refreshed in a background thread (or right away if background is False),
+        missing cache is requested and saved.
+
+        Returns:
+        - dict: symbols info like get_exchange_info
+        """
+        cached = cache.load(self._NAME, self._get_market())
+        if cached is None:
+            return self._refresh_exchange_info(cache)
+
+        created, symbols_info = cached
+        self._restore_symbols_info(symbols_info)
+
+        if cache.is_expired(created):
+            if background:
+                thread = threading.Thread(target=self._refresh_exchange_info, args=(cache,), daemon=True)
+                thread.start()
+            else:
+                self._refresh_exchange_info(cache)
+
+        return self.symbols_info
+
+    def _refresh_exchange_info(self, cache):
+        symbols_info = self.get_exchange_info()
+        cache.save(self._NAME, self._get_market(), symbols_info)
+        return symbols_info
+
+    def _restore_symbols_info(self, symbols_info):
+        """
+        Restores symbols info and symbols index from cached symbols info.
+        """
+        for symbol, info in symbols_info.items():
+            if isinstance(info, dict):
+                original_symbol = info['original_symbol']
+            else:
+                original_symbol = info.original_symbol
+                info.quantizer = Quantizer.from_symbol_info(info)
+            self.symbols_info[symbol] = info
+            self._add_symbol(original_symbol, symbol)
+
     def get_exchange_info(self, **kwargs):
         """
         'BTC/USDT': {
@@ -308,6 +642,27 @@ class Exchange:
         """
         raise NotImplementedException
 
+    def get_ticker_snapshot(self):
+        """
+        Retrieves prices of all symbols as a columnar TickerSnapshot, requires numpy.
+        Unlike get_tickers no object is created per symbol.
+
+        Example:
+        snapshot = get_ticker_snapshot()
+        snapshot.price[snapshot.index['BTC/USDT']]
+        100000.0
+        """
+        raise NotImplementedException
+
+    def get_order_book(self, symbol, limit=100):
+        """
+        Retrieves order book snapshot.
+
+        Returns:
+        - OrderBook: bids and asks levels, update_id is the exchange update id or sequence of the snapshot
+        """
+        raise NotImplementedException
+
     def get_ticker(self, symbol):
         """
         Retrieves symbol ticker information.
@@ -364,10 +719,139 @@ class Exchange:
     def cancel_order(self, symbol=None, order_id=None):
         raise NotImplementedException
 
-    def create_order(self, symbol, side, quantity, price=None, stop_price=None, type='LIMIT', time_in_force=None):
+    def create_order(self, symbol, side, quantity, price=None, stop_price=None, type='LIMIT', time_in_force=None,
+                     client_order_id=None):
         raise NotImplementedException
 
-    def get_candles(self, symbol, interval, start=None, end=None, limit=None):
+    def build_grid(self, symbol, side, low, high, levels, quantity=None, quote_quantity=None, geometric=False):
+        """
+        Builds limit orders of a grid with symbol tick and step sizes, see grid.build_grid.
+        :return: list of create_order arguments dicts, lowest price first
+
+        Example:
+        orders = build_grid('BTC/USDT', 'buy', 50000, 60000, 200, quote_quantity=10)
+        results = create_orders(orders)
+        """
+        prices, quantities = build_grid(self.get_quantizer(symbol), side, low, high, levels, quantity,
+                                        quote_quantity, geometric)
+        return [{'symbol': symbol, 'side': side, 'quantity': quantity, 'price': price}
+                for price, quantity in zip(prices, quantities)]
+
+    def create_grid(self, symbol, side, low, high, levels, quantity=None, quote_quantity=None, geometric=False,
+                    max_workers=None):
+        """
+        Builds grid orders and creates them with create_orders.
+        """
+        orders = self.build_grid(symbol, side, low, high, levels, quantity, quote_quantity, geometric)
+        return self.create_orders(orders, max_workers)
+
+    @staticmethod
+    def _generate_client_order_id():
+        """
+        Returns a unique client order id, orders created with it are safe to retry.
+        """
+        return uuid.uuid4().hex
+
+    def create_orders(self, orders, max_workers=None):
+        """
+        Creates several orders with exchange batch endpoints where they exist,
+        otherwise with concurrent create_order requests.
+        :param orders: list of create_order arguments dicts
+        :param max_workers: concurrent requests, _ORDERS_CONCURRENCY by default
+        :return: list of Order or ExchangeException for every order, in orders order
+
+        Example:
+        results = create_orders([
+            {'symbol': 'BTC/USDT', 'side': 'buy', 'quantity': 0.01, 'price': 60000},
+            {'symbol': 'BTC/USDT', 'side': 'buy', 'quantity': 0.01, 'price': 59000},
+        ])
+        failed = [result for result in results if isinstance(result, ExchangeException)]
+        """
+        orders = list(orders)
+        batches = self._get_create_orders_batches(orders)
+        if batches is None:
+            return self._map_orders(lambda order: self.create_order(**order), orders, max_workers)
+        return self._run_batches(batches, len(orders), max_workers)
+
+    def cancel_orders(self, orders, max_workers=None):
+        """
+        Cancels several orders, see create_orders.
+        :param orders: list of cancel_order arguments dicts, e.g. {'symbol': 'BTC/USDT', 'order_id': '123'}
+        :return: list of Order or ExchangeException for every order, in orders order
+        """
+        orders = list(orders)
+        batches = self._get_cancel_orders_batches(orders)
+        if batches is None:
+            return self._map_orders(lambda order: self.cancel_order(**order), orders, max_workers)
+        return self._run_batches(batches, len(orders), max_workers)
+
+    def _get_create_orders_batches(self, orders):
+        """
+        Returns batch requests of create_orders or None if the exchange has no batch endpoint.
+        Batch request is (orders indices, endpoint, method, params, parse) where parse converts response
+        to a list of Order or ExchangeException aligned with indices.
+        """
+        return None
+
+    def _get_cancel_orders_batches(self, orders):
+        return None
+
+    @staticmethod
+    def _group_orders(orders, batch_size, key=None):
+        """
+        Splits orders to batches of (index, order) pairs, orders with different keys are not batched together.
+        """
+        groups = {}
+        for index, order in enumerate(orders):
+            groups.setdefault(key(order) if key else None, []).append((index, order))
+        return [group[i:i + batch_size] for group in groups.values() for i in range(0, len(group), batch_size)]
+
+    def _map_orders(self, func, orders, max_workers=None):
+        def call(order):
+            try:
+                return func(order)
+            except ExchangeException as e:
+                return e
+
+        if not orders:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_workers or self._ORDERS_CONCURRENCY, len(orders))) as executor:
+            return list(executor.map(call, orders))
+
+    def _run_batches(self, batches, count, max_workers=None):
+        results = [None] * count
+
+        def run(batch):
+            indices, endpoint, method, params, parse = batch
+            try:
+                items = parse(self._request(endpoint, method, True, params=params))
+            except ExchangeException as e:
+                items = [e] * len(indices)
+            for index, item in zip(indices, items):
+                results[index] = item
+
+        self._map_orders(run, batches, max_workers)
+        return results
+
+    def _make_order(self, symbol, order_id, side, type, price=None, quantity=None, status='new', response=None):
+        """
+        Builds Order from request params for exchanges which return only order id.
+        """
+        order = Order()
+        order.symbol = symbol
+        if self._GLOBAL_SYMBOL_SEPARATOR in symbol:
+            order.base_asset, order.quote_asset = self.get_symbol_assets(symbol)
+        order.order_id = str(order_id)
+        order.side = side.lower()
+        order.type = type.lower()
+        order.price_str = None if price is None else str(price)
+        order.orig_qty_str = None if quantity is None else str(quantity)
+        order.qty_str = '0'
+        order.status = status
+        order.response = response if self._KEEP_RESPONSE else None
+        return order
+
+    def get_candles(self, symbol, interval, start=None, end=None, limit=None, as_frame=False):
         """
         Retrieves candles for a symbol.
         :param symbol:
@@ -375,6 +859,7 @@ class Exchange:
         :param start: timestamp in seconds
         :param end: timestamp in seconds
         :param limit:
+        :param as_frame: return CandleFrame with NumPy columns instead of raw response or list of candles
         :return:
 
         candle format:
@@ -392,6 +877,45 @@ class Exchange:
         """
         raise NotImplementedException
 
+    def get_candles_range(self, symbol, interval, start, end, max_workers=4):
+        """
+        Retrieves all candles between start and end, requires numpy.
+        The range is split into windows of one get_candles page, windows are requested concurrently
+        within rate limits and merged into one ordered CandleFrame without duplicates.
+        :param symbol:
+        :param interval: interval in global format, e.g. '1m'
+        :param start: timestamp in seconds
+        :param end: timestamp in seconds
+        :param max_workers: concurrent requests
+        :return: CandleFrame
+        """
+        windows = self._get_candles_windows(interval, start, end)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            frames = list(executor.map(
+                lambda window: self.get_candles(symbol, interval, start=window[0], end=window[1],
+                                                limit=self._CANDLES_LIMIT, as_frame=True),
+                windows))
+        return self._merge_candle_frames(frames, start, end)
+
+    def _get_candles_windows(self, interval, start, end):
+        """
+        Splits range into (start, end) windows of one get_candles page, timestamps in seconds.
+        """
+        if not self._CANDLES_LIMIT:
+            raise NotImplementedException
+        step = self.interval_to_minutes(interval) * 60
+        window = step * self._CANDLES_LIMIT
+        # align start to candles open time
+        start -= start % step
+        return [(window_start, min(window_start + window - step, end)) for window_start in range(start, end + 1, window)]
+
+    @staticmethod
+    def _merge_candle_frames(frames, start, end):
+        frame = CandleFrame.concat(frames)
+        # pages may overlap on boundaries
+        _, rows = np.unique(frame.timestamp, return_index=True)
+        return frame[rows].between(start, end)
+
     def get_position_info(self, symbol):
         raise NotImplementedException
 
@@ -0,0 +1,50 @@
+"""Grid (ladder) orders built in one vectorized pass.
+
+Requires numpy: pip install excrypt[numpy]
+"""
+from .columnar import np, _require_numpy
+from .exceptions import *
+from .quantizer import Quantizer
+
+
+def build_grid(quantizer, side, low, high, levels, quantity=None, quote_quantity=None, geometric=False):
+    """
+    Returns (prices, quantities) strings of grid levels ready for create_order.
+    Buy prices are rounded down and sell prices up, so levels never cross the range for a better price,
+    levels rounded to the same tick are merged and levels below min quantity or min notional are dropped.
+
+    :param quantizer: Quantizer of the symbol
+    :param side: 'buy' or 'sell', in any case like create_order sides
+    :param low: lowest price of the range
+    :param high: highest price of the range
+    :param levels: number of levels, prices include low and high
+    :param quantity: base quantity of every level, a number or an array of levels size
+    :param quote_quantity: quote quantity of every level instead of quantity, a number or an array
+    :param geometric: space prices by equal ratios instead of equal steps
+    """
+    _require_numpy()
+    side = side.lower()
+    if side not in ('buy', 'sell'):
+        raise ExchangeException(f"Unknown side {side}")
+    if (quantity is None) == (quote_quantity is None):
+        raise ExchangeException('Either quantity or quote_quantity must be specified')
+    if not 0 < low <= high:
+        raise ExchangeException(f"Wrong price range {low} - {high}")
+
+    prices = np.geomspace(low, high, levels) if geometric else np.linspace(low, high, levels)
+    rounding = Quantizer.ROUND_DOWN if side == 'buy' else Quantizer.ROUND_UP
+    price_units = quantizer.price.to_units_array(prices, rounding)
+    # levels rounded to the same tick are merged to the first of them
+    price_units, first = np.unique(price_units, return_index=True)
+    positive = price_units > 0
+    price_units, first = price_units[positive], first[positive]
+
+    if quantity is not None:
+        quantities = np.broadcast_to(np.asarray(quantity, dtype=np.float64), prices.shape)[first]
+    else:
+        quote = np.broadcast_to(np.asarray(quote_quantity, dtype=np.float64), prices.shape)[first]
+        quantities = quote / quantizer.price.to_float(price_units)
+    quantity_units = quantizer.quantity.to_units_array(quantities, Quantizer.ROUND_DOWN)
+
+    valid = quantizer._check_units(price_units, quantity_units)
+    return quantizer.price.to_str(price_units[valid]), quantizer.quantity.to_str(quantity_units[valid])
@@ -0,0 +1,61 @@
+"""JSON backend of exchange responses, request bodies and streams.
+
+orjson is used when installed: pip install excrypt[orjson]
+Call sites use jsonlib.loads and jsonlib.dumps, so set_backend applies everywhere at once.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+from .exceptions import *
+
+
+def _json_dumps(data):
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+
+def _orjson_dumps(data):
+    return orjson.dumps(data).decode('utf-8')
+
+
+# name -> (loads, dumps), loads accepts bytes and str, dumps returns compact str
+_BACKENDS = {
+    'json': (json.loads, _json_dumps),
+}
+if orjson is not None:
+    _BACKENDS['orjson'] = (orjson.loads, _orjson_dumps)
+
+backend = None
+loads = None
+dumps = None
+
+
+def set_backend(name=None, custom_loads=None, custom_dumps=None):
+    """
+    Selects JSON backend: 'orjson', 'json' or the fastest installed one by default.
+    custom_loads and custom_dumps replace functions of the selected backend,
+    loads must accept bytes and raise ValueError on invalid documents.
+
+    Example:
+    from excrypt import jsonlib
+    jsonlib.set_backend('json')
+    """
+    global backend, loads, dumps
+
+    if name is None:
+        name = 'orjson' if orjson is not None else 'json'
+    if name not in _BACKENDS:
+        raise ExchangeException(f"JSON backend {name} is not installed")
+
+    backend = name
+    loads, dumps = _BACKENDS[name]
+    if custom_loads is not None:
+        loads = custom_loads
+    if custom_dumps is not None:
+        dumps = custom_dumps
+
+
+set_backend()
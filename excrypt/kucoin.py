@@ -1,9 +1,10 @@
 import base64
-import hashlib
-import hmac
-import json
 from .exceptions import *
+from . import jsonlib
 from .exchange import Exchange
+from .ratelimit import RateLimiter
+from .columnar import TickerSnapshot
+from .orderbook import OrderBook
 
 
 class KuCoin(Exchange):
@@ -17,9 +18,33 @@ class KuCoin(Exchange):
         INTERVALS (dict): A dictionary mapping interval strings to their corresponding KuCoin interval strings.
     """
 
+    _NAME = 'kucoin'
     _API_URL = 'https://openapi-v2.kucoin.com'
     _EXCHANGE_SYMBOL_SEPARATOR = '-'
 
+    # https://www.kucoin.com/docs/basic-info/request-rate-limit/rest-api
+    # spot pool limit, every resource pool has its own quota reported in response headers
+    _RATE_LIMIT = (4000, 30)
+    # pools other than spot: (limit, interval) and endpoint prefixes
+    _RATE_LIMIT_POOLS = {
+        'public': ((2000, 30), ('/api/v1/market/', '/api/v1/symbols', '/api/v2/symbols', '/api/v1/currencies',
+                                '/api/v3/currencies', '/api/v1/prices', '/api/v1/timestamp', '/api/v1/status',
+                                '/api/v1/bullet-public')),
+        'management': ((2000, 30), ('/api/v1/accounts', '/api/v2/accounts', '/api/v1/sub', '/api/v2/sub',
+                                    '/api/v1/deposit', '/api/v1/withdrawals', '/api/v2/user-info')),
+    }
+    _ENDPOINT_WEIGHTS = {
+        '/api/v1/accounts': 5,
+        '/api/v1/orders': 2,
+    }
+
+    _CLIENT_ORDER_ID_KEYS = ('clientOid',)
+
+    # orders per multi-order request, all of them must have the same symbol
+    _BATCH_ORDERS_LIMIT = 5
+
+    _passphrase = None  # ((secret, password), passphrase signature)
+
     INTERVALS = {'1m': '1min', '3m': '3min', '5m': '5min', '15m': '15min', '30m': '30min', '1h': '1hour', '2h': '2hour',
                  '4h': '4hour', '6h': '6hour', '8h': '8hour', '12h': '12hour', '1d': '1day', '1w': '1week'}
 
@@ -37,19 +62,48 @@ class KuCoin(Exchange):
 
         signature_string = timestamp+method.upper()+endpoint+data_json
 
-        signature = bytes(base64.b64encode(
-            hmac.new(self._API_SECRET.encode('utf-8'),
-                     signature_string.encode('utf-8'),
-                     hashlib.sha256).digest()))
+        signature = base64.b64encode(self._get_hmac(signature_string).digest())
         return signature
 
+    def _initialize(self):
+        # pool -> RateLimiter, the spot pool is paced by _RATE_LIMITER
+        self._pool_rate_limiters = {}
+
+    @classmethod
+    def _get_rate_limit_pool(cls, endpoint):
+        for pool, (_, prefixes) in cls._RATE_LIMIT_POOLS.items():
+            if endpoint.startswith(prefixes):
+                return pool
+        return 'spot'
+
+    def _get_rate_limiters(self, endpoint):
+        if not self._RATE_LIMITER:
+            return []
+        pool = self._get_rate_limit_pool(endpoint)
+        if pool == 'spot':
+            return [self._RATE_LIMITER]
+        if pool not in self._pool_rate_limiters:
+            self._pool_rate_limiters[pool] = RateLimiter(*self._RATE_LIMIT_POOLS[pool][0])
+        return [self._pool_rate_limiters[pool]]
+
+    def _update_rate_limit(self, endpoint, headers):
+        # quota of the endpoint resource pool and requests left
+        limit = headers.get('gw-ratelimit-limit')
+        remaining = headers.get('gw-ratelimit-remaining')
+        if not limit or remaining is None:
+            return
+        limit = int(limit)
+        for rate_limiter in self._get_rate_limiters(endpoint):
+            rate_limiter.calibrate(limit - int(remaining), limit)
+
     def _generate_passphrase(self):
-        passphrase = bytes(base64.b64encode(
-            hmac.new(self._API_SECRET.encode('utf-8'),
-                     self._API_PASSWORD.encode('utf-8'),
-                     hashlib.sha256).digest()))
+        # passphrase signature is constant, it is computed once for the secret and password
+        keys = (self._API_SECRET, self._API_PASSWORD)
+        if self._passphrase is None or self._passphrase[0] != keys:
+            passphrase = base64.b64encode(self._get_hmac(self._API_PASSWORD).digest())
+            self._passphrase = (keys, passphrase)
 
-        return passphrase
+        return self._passphrase[1]
 
     def _handle_request_kwargs(self, kwargs, method, timestamp, endpoint, signed):
         if signed:
@@ -65,7 +119,8 @@ class KuCoin(Exchange):
                 }
             kwargs['headers'].update(headers)
 
-        if method != 'get':
+        # bodyless requests are signed without data
+        if method != 'get' and kwargs['params']:
             kwargs['data'] = self._json_dumps(kwargs['params'])
             del kwargs['params']
 
@@ -73,7 +128,7 @@ class KuCoin(Exchange):
 
     @staticmethod
     def _json_dumps(data):
-        return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+        return jsonlib.dumps(data)
 
     @staticmethod
     def _handle_response(raw_response):
@@ -85,7 +140,7 @@ class KuCoin(Exchange):
         if not str(raw_response.status_code).startswith('2'):
             raise ExchangeAPIException(raw_response)
         try:
-            response = raw_response.json()
+            response = jsonlib.loads(raw_response.content)
 
             if 'code' in response and response['code'] != "200000":
                 raise ExchangeAPIException(raw_response)
@@ -101,11 +156,43 @@ class KuCoin(Exchange):
         except ValueError:
             raise ExchangeRequestException(f"Invalid Response: {raw_response.text}")
 
+    def get_ticker_snapshot(self):
+        # https://www.kucoin.com/docs/rest/spot-trading/market-data/get-all-tickers
+        endpoint = '/api/v1/market/allTickers'
+
+        return self._call(endpoint, parse=self._parse_ticker_snapshot)
+
+    def _parse_ticker_snapshot(self, response):
+        items = response['ticker']
+        return TickerSnapshot(
+            [self._convert_symbol_to_global(item['symbol']) for item in items],
+            [item['last'] or 'nan' for item in items],
+            response['time'],
+        )
+
+    def get_order_book(self, symbol, limit=100):
+        # https://www.kucoin.com/docs/rest/spot-trading/market-data/get-part-order-book-aggregated-
+        # public partial books have 20 or 100 levels, the full book requires keys
+        endpoint = '/api/v1/market/orderbook/level2_20' if limit <= 20 else '/api/v1/market/orderbook/level2_100'
+        params = {
+            'symbol': self._convert_symbol_to_local(symbol),
+            }
+
+        return self._call(endpoint, params=params, parse=lambda response: self._parse_order_book(symbol, response))
+
+    @staticmethod
+    def _parse_order_book(symbol, response):
+        # {"sequence": "3262786978", "time": 1550653727731, "bids": [["6500.12", "0.45054140"]], "asks": [...]}
+        book = OrderBook(symbol)
+        book.apply_snapshot(response['bids'], response['asks'], int(response['sequence']), response['time'])
+        return book
+
     def get_balances(self):
         endpoint = '/api/v1/accounts'
 
-        response = self._get(endpoint, signed=True)
+        return self._call(endpoint, signed=True, parse=self._parse_balances)
 
+    def _parse_balances(self, response):
         for item in response:
             if item['type'] == 'trade':
                 self.balances[item['currency']] = {
@@ -116,8 +203,20 @@ class KuCoin(Exchange):
 
         return self.balances
 
-    def get_orders(self, symbol: str, from_timestamp=None, **kwargs):
+    def get_orders(self, symbol: str, from_timestamp=None, max_workers=None, **kwargs):
+        """
+        :param max_workers: concurrent page requests, _PAGES_CONCURRENCY by default
+        """
+        endpoint, params = self._get_orders_request(symbol, from_timestamp, **kwargs)
+
+        response = self._get(endpoint, signed=True, params=params)
+
+        # total pages are known after the first response, so the rest can be requested concurrently
+        chunks = self._fetch_pages(endpoint, 'get', True, params, 'currentPage', self._get_next_pages(response),
+                                   max_workers)
+        return self._parse_orders_pages(response, chunks)
 
+    def _get_orders_request(self, symbol: str, from_timestamp=None, **kwargs):
         symbol = self._convert_symbol_to_local(symbol)
 
         params = {
@@ -139,22 +238,101 @@ class KuCoin(Exchange):
             from_timestamp = self._parse_timestamp(from_timestamp)
             params['startAt'] = from_timestamp
 
-        response = self._get(endpoint, signed=True, params=params)
+        return endpoint, params
 
-        items = []
-        if len(response['items']):
-            items = response['items']
+    @staticmethod
+    def _get_next_pages(response):
+        return range(2, response['totalPage']+1)
 
-        if response['totalPage'] > 1:
-            for i in range(2, response['totalPage']+1):
-                params['currentPage'] = i
-                response_chunk = self._get(endpoint, signed=True, params=params)
-                if len(response_chunk['items']):
-                    items.extend(response_chunk['items'])
+    def _parse_orders_pages(self, response, chunks):
+        items = list(response['items'])
+        for response_chunk in chunks:
+            items.extend(response_chunk['items'])
+        return self._parse_orders(items)
 
+    def _parse_orders(self, items):
         items.reverse()
         return [self._parse_order(item) for item in items]
 
+    def create_order(self, symbol, side, quantity, price=None, stop_price=None, type='LIMIT', time_in_force=None,
+                     client_order_id=None):
+        # https://www.kucoin.com/docs/rest/spot-trading/orders/place-order
+        endpoint = '/api/v1/orders'
+        params = self._get_order_params(symbol, side, quantity, price, stop_price, type, time_in_force,
+                                        client_order_id)
+
+        return self._call(endpoint, 'post', True, params=params,
+                          parse=lambda response: self._make_order(symbol, response['orderId'], side, type, price,
+                                                                  quantity, response=response))
+
+    def cancel_order(self, symbol=None, order_id=None):
+        # https://www.kucoin.com/docs/rest/spot-trading/orders/cancel-order-by-orderid
+        if not order_id:
+            raise ExchangeException('order_id must be specified to cancel order')
+
+        endpoint = f'/api/v1/orders/{order_id}'
+
+        return self._call(endpoint, 'delete', True,
+                          parse=lambda response: self._make_order(symbol or '', order_id, '', '', status='canceled',
+                                                                  response=response))
+
+    def _get_order_params(self, symbol, side, quantity, price=None, stop_price=None, type='LIMIT', time_in_force=None,
+                          client_order_id=None):
+        if stop_price is not None:
+            raise ExchangeException('Stop orders are not supported')
+
+        type = type.upper()
+        params = {
+            'clientOid': client_order_id or self._generate_client_order_id(),
+            'symbol': self._convert_symbol_to_local(symbol),
+            'side': side.lower(),
+            'size': str(quantity),
+            }
+
+        if type == 'LIMIT':
+            params['type'] = 'limit'
+            params['price'] = str(price)
+            params['timeInForce'] = time_in_force or self.TIME_IN_FORCE_GTC
+        elif type == 'MARKET':
+            params['type'] = 'market'
+        else:
+            raise ExchangeException('Unknown order type: %s' % type)
+
+        return params
+
+    def _get_create_orders_batches(self, orders):
+        # https://www.kucoin.com/docs/rest/spot-trading/orders/place-multiple-orders
+        # multi-order endpoint accepts limit orders only
+        if not all(order.get('type', 'LIMIT').upper() == 'LIMIT' for order in orders):
+            return None
+
+        batches = []
+        for batch in self._group_orders(orders, self._BATCH_ORDERS_LIMIT, key=lambda order: order['symbol']):
+            order_list = []
+            for _, order in batch:
+                order_params = self._get_order_params(**order)
+                del order_params['symbol']
+                order_list.append(order_params)
+            params = {
+                'symbol': self._convert_symbol_to_local(batch[0][1]['symbol']),
+                'orderList': order_list,
+                }
+            batch_orders = [order for _, order in batch]
+            batches.append(([index for index, _ in batch], '/api/v1/orders/multi', 'post', params,
+                            lambda response, batch_orders=batch_orders: self._parse_batch_orders(response, batch_orders)))
+        return batches
+
+    def _parse_batch_orders(self, response, orders):
+        # {"data": [{"symbol": "KCS-USDT", "id": "5c52e11203aa677f33e491", "status": "success", "failMsg": null, ...}]}
+        results = []
+        for order, item in zip(orders, response['data']):
+            if item['status'] != 'success':
+                results.append(ExchangeAPIException(item.get('failMsg') or item['status']))
+            else:
+                results.append(self._make_order(order['symbol'], item['id'], order['side'], 'LIMIT',
+                                                order.get('price'), order['quantity'], response=item))
+        return results
+
     def get_open_orders(self, symbol: str):
         return self.get_orders(symbol, status='active')
 
@@ -0,0 +1,232 @@
+"""Local L2 order book.
+
+Depth and VWAP queries require numpy: pip install excrypt[numpy]
+O(log n) level updates require sortedcontainers: pip install excrypt[orderbook]
+"""
+from bisect import bisect_left
+
+try:
+    from sortedcontainers import SortedDict
+except ImportError:  # optional dependency
+    SortedDict = None
+
+from .columnar import np, _require_numpy
+from .exceptions import *
+
+
+class _BisectBookSide:
+    """
+    Price levels of one side: sorted keys for order and a dict for quantities.
+    Keys are prices for asks and negative prices for bids, so the best level is always keys[0].
+
+    Adding and removing a level is a bisect search plus list.insert/del, an O(n) memmove of pointers.
+    It is used only without sortedcontainers: up to a few thousand levels the memmove is cheaper than
+    a SortedDict update, but it grows to tens of microseconds on deeper books (tools/benchmark.py order_book).
+    """
+
+    __slots__ = ('_sign', 'keys', 'levels')
+
+    def __init__(self, descending):
+        self._sign = -1 if descending else 1
+        self.keys = []
+        self.levels = {}
+
+    def clear(self):
+        self.keys = []
+        self.levels = {}
+
+    def update(self, price, quantity):
+        key = self._sign * price
+        if quantity:
+            if key not in self.levels:
+                self.keys.insert(bisect_left(self.keys, key), key)
+            self.levels[key] = quantity
+        elif self.levels.pop(key, None) is not None:
+            del self.keys[bisect_left(self.keys, key)]
+
+    def best(self):
+        if not self.keys:
+            return None
+        key = self.keys[0]
+        return self._sign * key, self.levels[key]
+
+    def get_quantity(self, price):
+        return self.levels.get(self._sign * price, 0.0)
+
+    def to_arrays(self, levels=None):
+        keys = self.keys if levels is None else self.keys[:levels]
+        prices = np.fromiter(keys, dtype=np.float64, count=len(keys))
+        quantities = np.fromiter((self.levels[key] for key in keys), dtype=np.float64, count=len(keys))
+        return prices * self._sign, quantities
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class _SortedBookSide:
+    """
+    Price levels of one side in a SortedDict, adding and removing a level is O(log n).
+    Keys are prices for asks and negative prices for bids, so the best level is always the first one.
+    The best level is cached: SortedDict.peekitem(0) is O(log n), so it's called only when the best level is removed.
+    """
+
+    __slots__ = ('_sign', 'levels', '_best')
+
+    def __init__(self, descending):
+        self._sign = -1 if descending else 1
+        self.clear()
+
+    def clear(self):
+        self.levels = SortedDict()
+        # (key, quantity) of the first level or None
+        self._best = None
+
+    def update(self, price, quantity):
+        key = self._sign * price
+        best = self._best
+        if quantity:
+            self.levels[key] = quantity
+            if best is None or key <= best[0]:
+                self._best = key, quantity
+        elif self.levels.pop(key, None) is not None and key == best[0]:
+            self._best = self.levels.peekitem(0) if self.levels else None
+
+    def best(self):
+        if self._best is None:
+            return None
+        key, quantity = self._best
+        return self._sign * key, quantity
+
+    def get_quantity(self, price):
+        return self.levels.get(self._sign * price, 0.0)
+
+    def to_arrays(self, levels=None):
+        count = len(self.levels) if levels is None else min(levels, len(self.levels))
+        prices = np.fromiter(self.levels.keys()[:count], dtype=np.float64, count=count)
+        quantities = np.fromiter(self.levels.values()[:count], dtype=np.float64, count=count)
+        return prices * self._sign, quantities
+
+    def __len__(self):
+        return len(self.levels)
+
+
+_BookSide = _SortedBookSide if SortedDict is not None else _BisectBookSide
+
+
+class OrderBook:
+    """
+    L2 order book: price levels sorted in SortedDict, or in bisect-sorted lists without sortedcontainers.
+    Level updates are O(log n) with SortedDict, best bid and ask are O(1).
+    Prices and quantities may be numbers or numeric strings, a zero quantity removes the level.
+
+    :param symbol: global symbol
+    :param update_id: exchange update id or sequence of the last applied update
+
+    Example:
+    book = client.get_order_book('BTC/USDT', limit=1000)
+    book.best_bid, book.best_ask
+    book.get_vwap('buy', 2.5)
+    """
+
+    __slots__ = ('symbol', 'update_id', 'timestamp', 'bids', 'asks')
+
+    def __init__(self, symbol=None, update_id=None):
+        self.symbol = symbol
+        self.update_id = update_id
+        self.timestamp = None
+        self.bids = _BookSide(descending=True)
+        self.asks = _BookSide(descending=False)
+
+    def apply_snapshot(self, bids, asks, update_id=None, timestamp=None):
+        """
+        Replaces all levels with [price, quantity, ...] levels of a snapshot.
+        """
+        self.bids.clear()
+        self.asks.clear()
+        self.update(bids, asks, update_id, timestamp)
+
+    def update(self, bids, asks, update_id=None, timestamp=None):
+        """
+        Applies [price, quantity, ...] level updates, quantities are absolute.
+        """
+        for level in bids:
+            self.bids.update(float(level[0]), float(level[1]))
+        for level in asks:
+            self.asks.update(float(level[0]), float(level[1]))
+        if update_id is not None:
+            self.update_id = update_id
+        if timestamp is not None:
+            self.timestamp = timestamp
+
+    @property
+    def best_bid(self):
+        """(price, quantity) or None"""
+        return self.bids.best()
+
+    @property
+    def best_ask(self):
+        """(price, quantity) or None"""
+        return self.asks.best()
+
+    @property
+    def spread(self):
+        if not self.bids or not self.asks:
+            return None
+        return self.asks.best()[0] - self.bids.best()[0]
+
+    @property
+    def mid_price(self):
+        if not self.bids or not self.asks:
+            return None
+        return (self.asks.best()[0] + self.bids.best()[0]) / 2
+
+    def _get_side(self, side):
+        """
+        Returns levels consumed by an order side: asks for buy orders, bids for sell orders.
+        """
+        if side == 'buy':
+            return self.asks
+        if side == 'sell':
+            return self.bids
+        raise ExchangeException(f"Unknown side {side}")
+
+    def get_levels(self, book_side, levels=None):
+        """
+        Returns prices and quantities arrays of 'bids' or 'asks', best level first.
+        """
+        _require_numpy()
+        if book_side not in ('bids', 'asks'):
+            raise ExchangeException(f"Unknown book side {book_side}")
+        return getattr(self, book_side).to_arrays(levels)
+
+    def get_depth(self, side, price):
+        """
+        Returns quantity available for an order side up to price (inclusive).
+        """
+        _require_numpy()
+        book_side = self._get_side(side)
+        prices, quantities = book_side.to_arrays()
+        if side == 'buy':
+            return float(quantities[prices <= price].sum())
+        return float(quantities[prices >= price].sum())
+
+    def get_vwap(self, side, quantity):
+        """
+        Returns volume-weighted average price of a market order of quantity.
+        Raises ExchangeException if the book is not deep enough.
+        """
+        if quantity <= 0:
+            raise ExchangeException(f"Quantity must be positive, got {quantity}")
+        _require_numpy()
+        prices, quantities = self._get_side(side).to_arrays()
+        filled = np.cumsum(quantities)
+        last = int(np.searchsorted(filled, quantity, side='left'))
+        if last >= len(filled):
+            raise ExchangeException(f"Order book depth {filled[-1] if len(filled) else 0} is less than {quantity}")
+        # the last level is taken partially
+        taken = quantities[:last + 1].copy()
+        taken[-1] -= filled[last] - quantity
+        return float(np.dot(prices[:last + 1], taken) / quantity)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.symbol}, {len(self.bids)} bids, {len(self.asks)} asks)'
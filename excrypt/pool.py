@@ -0,0 +1,99 @@
+import threading
+
+from requests.adapters import HTTPAdapter
+
+
+class _SharedAdapter(HTTPAdapter):
+    """
+    Adapter mounted on every session of a ConnectionPool.
+    session.close() closes mounted adapters, so closing is ignored here and done by ConnectionPool.close.
+    """
+
+    def close(self):
+        pass
+
+    def _close(self):
+        super().close()
+
+
+class ConnectionPool:
+    """
+    HTTP connection pools shared between exchange instances.
+
+    urllib3 keeps a separate pool for every host, so all exchanges mounted on the same
+    ConnectionPool reuse open connections (and TLS sessions) to the same API host.
+    Each exchange keeps its own requests session, so headers and proxies are not shared.
+
+    :param pool_size: connections kept open for reuse per host
+    :param max_connections: maximum connections per host, requests wait for a free connection
+        when the limit is reached. By default extra connections are opened and discarded after use.
+    :param keep_alive: keep connections open between requests
+    :param hosts: number of hosts pools kept at the same time
+
+    Pools are owned by the ConnectionPool: closing a session of one exchange does not close connections
+    of the others, call ConnectionPool.close once all exchanges are done.
+
+    Example:
+    pool = ConnectionPool(pool_size=20)
+    accounts = [Binance(key, secret, connection_pool=pool) for key, secret in keys]
+    pool.get_stats()
+    pool.close()
+    """
+
+    def __init__(self, pool_size=10, max_connections=None, keep_alive=True, hosts=10):
+        self._keep_alive = keep_alive
+        self._adapter = _SharedAdapter(pool_connections=hosts,
+                                       pool_maxsize=max_connections or pool_size,
+                                       pool_block=bool(max_connections))
+        self._lock = threading.Lock()
+        self._sessions = 0
+
+    def mount(self, session):
+        """
+        Mounts shared pools to the requests session.
+        """
+        session.mount('https://', self._adapter)
+        session.mount('http://', self._adapter)
+        if not self._keep_alive:
+            session.headers['Connection'] = 'close'
+        with self._lock:
+            self._sessions += 1
+        return session
+
+    def _get_host_pools(self):
+        managers = [self._adapter.poolmanager] + list(self._adapter.proxy_manager.values())
+        for manager in managers:
+            for key in list(manager.pools.keys()):
+                pool = manager.pools.get(key)
+                if pool is not None:
+                    yield pool
+
+    def get_stats(self):
+        """
+        Returns pools hit/miss statistics per host.
+        A hit is a request sent over an already open connection, a miss opened a new connection.
+
+        Example:
+        get_stats()
+        {
+            'api.binance.com': {'requests': 120, 'hits': 115, 'misses': 5},
+        }
+        """
+        stats = {}
+        for pool in self._get_host_pools():
+            host_stats = stats.setdefault(pool.host, {'requests': 0, 'hits': 0, 'misses': 0})
+            host_stats['requests'] += pool.num_requests
+            host_stats['misses'] += pool.num_connections
+            host_stats['hits'] += max(pool.num_requests - pool.num_connections, 0)
+        return stats
+
+    @property
+    def sessions(self):
+        """Number of sessions sharing the pools."""
+        return self._sessions
+
+    def close(self):
+        """
+        Closes connections of all sessions mounted on the pool.
+        """
+        self._adapter._close()
@@ -0,0 +1,224 @@
+"""Price and quantity rounding by symbol filters on exact integer arithmetic.
+
+Arrays of prices and quantities require numpy: pip install excrypt[numpy]
+"""
+from decimal import Decimal, ROUND_CEILING, ROUND_HALF_EVEN
+
+from .columnar import np, _require_numpy
+from .exceptions import *
+
+
+# decimals kept below the tick when values are read, they hold binary float noise (0.29 is 0.28999999999999998)
+_GUARD_DIGITS = 6
+
+# significant decimal digits float64 holds exactly
+_FLOAT_DIGITS = 15
+
+# precision of a tick size which is unknown or zero
+_DEFAULT_PRECISION = 8
+
+
+def _to_decimal(value):
+    # floats are read from their shortest repr, so 0.29 is read as 0.29 and not as its binary value
+    if isinstance(value, (str, int, Decimal)):
+        return Decimal(value)
+    return Decimal(repr(float(value)))
+
+
+def _get_scale(value):
+    """
+    Returns (precision, units) of a tick size: 0.01 is (2, 1), 0.25 is (2, 25), 10 is (0, 10).
+    """
+    if not value or not _to_decimal(value):
+        return _DEFAULT_PRECISION, 1
+    value = _to_decimal(value).normalize()
+    precision = max(-value.as_tuple().exponent, 0)
+    return precision, int(value.scaleb(precision))
+
+
+def _to_units(value, precision, rounding=ROUND_CEILING):
+    """Converts a limit (min quantity, min notional) to integer units of precision."""
+    return int(_to_decimal(value).scaleb(precision).to_integral_value(rounding))
+
+
+def _format_units(units, precision):
+    if precision <= 0:
+        return str(units)
+    digits = str(abs(units)).rjust(precision + 1, '0')
+    sign = '-' if units < 0 else ''
+    return f'{sign}{digits[:-precision]}.{digits[-precision:]}'
+
+
+class _Grid:
+    """
+    Rounding to multiples of a tick size. Values are integers of units of 10 ** -precision,
+    ticks are integers of tick_units units.
+    """
+
+    __slots__ = ('precision', 'tick_units', '_divisor')
+
+    def __init__(self, tick_size):
+        self.precision, self.tick_units = _get_scale(tick_size)
+        self._divisor = self.tick_units * 10 ** _GUARD_DIGITS
+
+    def to_units(self, value, rounding):
+        fine = int(_to_decimal(value).scaleb(self.precision + _GUARD_DIGITS).to_integral_value(ROUND_HALF_EVEN))
+        if rounding == Quantizer.ROUND_DOWN:
+            ticks = fine // self._divisor
+        elif rounding == Quantizer.ROUND_UP:
+            ticks = -(-fine // self._divisor)
+        elif rounding == Quantizer.ROUND_NEAREST:
+            ticks = (fine + self._divisor // 2) // self._divisor
+        else:
+            raise ExchangeException(f"Unknown rounding {rounding}")
+        return ticks * self.tick_units
+
+    def to_units_array(self, values, rounding):
+        _require_numpy()
+        values = np.asarray(values, dtype=np.float64)
+        # float64 holds 15 significant digits: guard digits are limited to the digits left after
+        # integer digits and precision, so binary noise of large values is not read as units
+        digits = np.floor(np.log10(np.maximum(np.abs(values), 1.0))) + 1
+        guard = np.clip(_FLOAT_DIGITS - digits - self.precision, 0, _GUARD_DIGITS).astype(np.int64)
+        scale = 10 ** (self.precision + guard)
+        whole = np.trunc(values)
+        if not np.all(np.abs(whole) * scale < 2 ** 62):
+            raise ExchangeException(f"Values are too large for precision {self.precision}")
+        # integer parts are scaled as integers, so only fractional parts are rounded
+        fine = whole.astype(np.int64) * scale + np.rint((values - whole) * scale).astype(np.int64)
+        divisor = self.tick_units * 10 ** guard
+        if rounding == Quantizer.ROUND_DOWN:
+            ticks = fine // divisor
+        elif rounding == Quantizer.ROUND_UP:
+            ticks = -(-fine // divisor)
+        elif rounding == Quantizer.ROUND_NEAREST:
+            ticks = (fine + divisor // 2) // divisor
+        else:
+            raise ExchangeException(f"Unknown rounding {rounding}")
+        units = ticks * self.tick_units
+        # with fewer guard digits, values are read as scalars are only if fine units are their shortest decimal,
+        # the rest are rounded one by one from their repr
+        inexact = (guard == 0) | ((guard < _GUARD_DIGITS) & (fine / scale != values))
+        if inexact.any():
+            units[inexact] = [self.to_units(value, rounding) for value in values[inexact].tolist()]
+        return units
+
+    def to_float(self, units):
+        # int and float64 divisions are correctly rounded, so 29 / 100 is exactly the float 0.29
+        return units / 10 ** self.precision
+
+    def to_str(self, units):
+        if isinstance(units, int):
+            return _format_units(units, self.precision)
+        return [_format_units(value, self.precision) for value in units.tolist()]
+
+
+class Quantizer:
+    """
+    Rounds prices and quantities to symbol tick and step sizes and checks order limits.
+    Values are rounded on integers, so results are the same for 0.29, '0.29' and np.float64(0.29)
+    and strings are ready to be sent to exchange.
+
+    Scalars return scalars, lists and NumPy arrays return arrays (lists of strings for strings).
+
+    :param tick_size: price tick size, string as returned by exchange is preferred
+    :param step_size: quantity step size
+    :param min_quantity: minimum order quantity
+    :param min_notional: minimum order price * quantity
+
+    Example:
+    quantizer = client.get_quantizer('BTC/USDT')
+    price, quantity = quantizer.prepare_order(60000.123, 0.0012345)  # ('60000.12', '0.00123')
+    quantizer.round_price(prices, Quantizer.ROUND_UP)
+    """
+
+    ROUND_DOWN = 'down'
+    ROUND_UP = 'up'
+    ROUND_NEAREST = 'nearest'
+
+    __slots__ = ('price', 'quantity', 'min_quantity_units', 'min_notional_units')
+
+    def __init__(self, tick_size, step_size, min_quantity=None, min_notional=None):
+        self.price = _Grid(tick_size)
+        self.quantity = _Grid(step_size)
+        self.min_quantity_units = _to_units(min_quantity or 0, self.quantity.precision)
+        self.min_notional_units = _to_units(min_notional or 0, self.price.precision + self.quantity.precision)
+
+    @classmethod
+    def from_symbol_info(cls, info):
+        return cls(info.price_tick_size_str or info.price_tick_size,
+                   info.quantity_step_size_str or info.quantity_step_size,
+                   info.min_quantity_str or info.min_quantity,
+                   info.min_order_size_str or info.min_order_size)
+
+    @property
+    def price_precision(self):
+        return self.price.precision
+
+    @property
+    def quantity_precision(self):
+        return self.quantity.precision
+
+    @staticmethod
+    def _is_array(value):
+        return not isinstance(value, (str, int, float, Decimal)) and not (np is not None and np.isscalar(value))
+
+    @staticmethod
+    def _round(grid, value, rounding):
+        if Quantizer._is_array(value):
+            return grid.to_units_array(value, rounding)
+        return grid.to_units(value, rounding)
+
+    def round_price(self, price, rounding=ROUND_NEAREST):
+        return self.price.to_float(self._round(self.price, price, rounding))
+
+    def round_quantity(self, quantity, rounding=ROUND_DOWN):
+        return self.quantity.to_float(self._round(self.quantity, quantity, rounding))
+
+    def price_to_str(self, price, rounding=ROUND_NEAREST):
+        return self.price.to_str(self._round(self.price, price, rounding))
+
+    def quantity_to_str(self, quantity, rounding=ROUND_DOWN):
+        return self.quantity.to_str(self._round(self.quantity, quantity, rounding))
+
+    def _check_units(self, price_units, quantity_units):
+        if isinstance(price_units, int) and isinstance(quantity_units, int):
+            return (price_units > 0 and quantity_units > 0 and quantity_units >= self.min_quantity_units
+                    and price_units * quantity_units >= self.min_notional_units)
+        price_units = np.asarray(price_units, dtype=np.int64)
+        quantity_units = np.asarray(quantity_units, dtype=np.int64)
+        # products are compared as Python integers only when int64 may overflow,
+        # maxima are multiplied as Python integers, so the check itself does not overflow
+        max_product = int(np.abs(price_units).max(initial=0)) * int(np.abs(quantity_units).max(initial=0))
+        if max_product > np.iinfo(np.int64).max:
+            prices, quantities = np.broadcast_arrays(price_units, quantity_units)
+            notional = np.array([p * q >= self.min_notional_units
+                                 for p, q in zip(prices.ravel().tolist(), quantities.ravel().tolist())],
+                                dtype=bool).reshape(prices.shape)
+        else:
+            notional = price_units * quantity_units >= self.min_notional_units
+        return ((price_units > 0) & (quantity_units > 0) & (quantity_units >= self.min_quantity_units)
+                & notional.astype(bool))
+
+    def validate(self, price, quantity, price_rounding=ROUND_NEAREST, quantity_rounding=ROUND_DOWN):
+        """
+        Returns whether orders pass positive price, min quantity and min notional after rounding.
+        Returns a boolean array for arrays.
+        """
+        return self._check_units(self._round(self.price, price, price_rounding),
+                                 self._round(self.quantity, quantity, quantity_rounding))
+
+    def prepare_order(self, price, quantity, price_rounding=ROUND_NEAREST, quantity_rounding=ROUND_DOWN):
+        """
+        Returns (price_str, quantity_str) of a valid order.
+        Raises ExchangeException if the rounded order does not pass symbol limits.
+        """
+        price_units = self.price.to_units(price, price_rounding)
+        quantity_units = self.quantity.to_units(quantity, quantity_rounding)
+        if not self._check_units(price_units, quantity_units):
+            raise ExchangeException(f"Order price {price} quantity {quantity} does not pass symbol limits")
+        return self.price.to_str(price_units), self.quantity.to_str(quantity_units)
+
+    def __repr__(self):
+        return (f'{type(self).__name__}(tick_size={_format_units(self.price.tick_units, self.price.precision)}, '
+                f'step_size={_format_units(self.quantity.tick_units, self.quantity.precision)})')
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket of request weight.
+
+    The bucket holds up to `limit * safety` weight and refills continuously over `interval` seconds,
+    so callers are paced just below the exchange limit instead of being throttled by it.
+    Exchanges calibrate the bucket with the used weight reported in response headers.
+    The same RateLimiter can be shared by exchange instances sending requests from one IP.
+
+    :param limit: weight allowed per interval
+    :param interval: interval in seconds
+    :param safety: share of the limit which may be used
+    """
+
+    def __init__(self, limit, interval=60, safety=0.95):
+        self.interval = interval
+        self.safety = safety
+        self._lock = threading.Lock()
+        self._set_limit(limit)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0
+
+    def _set_limit(self, limit):
+        self.limit = limit
+        self._capacity = limit * self.safety
+        self._rate = self._capacity / self.interval
+
+    def _refill(self, now):
+        if now > self._updated:
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+
+    def _take(self, weight):
+        """
+        Takes weight from the bucket if possible.
+        Returns 0 on success, otherwise seconds to wait before the next try.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._refill(now)
+            # a request heavier than the whole bucket waits for the full bucket
+            weight = min(weight, self._capacity)
+            if self._tokens >= weight:
+                self._tokens -= weight
+                return 0
+            return (weight - self._tokens) / self._rate
+
+    def acquire(self, weight=1):
+        """
+        Blocks until the request weight is available.
+        Returns seconds spent waiting.
+        """
+        waited = 0
+        while True:
+            wait = self._take(weight)
+            if not wait:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, weight=1):
+        """
+        Async version of acquire, waits without blocking the event loop.
+        """
+        waited = 0
+        while True:
+            wait = self._take(weight)
+            if not wait:
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def calibrate(self, used, limit=None):
+        """
+        Syncs the bucket with the weight used in the current interval reported by the exchange.
+        :param used: weight used
+        :param limit: limit reported by the exchange, if any
+        """
+        with self._lock:
+            if limit and limit != self.limit:
+                self._set_limit(limit)
+            self._refill(time.monotonic())
+            self._tokens = self._capacity - used
+
+    def pause(self, seconds):
+        """
+        Stops all requests for the given seconds, e.g. after 429 response with Retry-After header.
+        """
+        with self._lock:
+            self._tokens = 0
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            # the bucket starts refilling after the pause
+            self._updated = self._paused_until
+
+    @property
+    def available(self):
+        """Weight available right now."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
@@ -0,0 +1,81 @@
+import random
+import threading
+
+
+class RetryPolicy:
+    """
+    Retries of transient failures: timeouts, connection errors and 5xx/429 responses.
+
+    Only idempotent requests are retried, exchanges decide which requests are idempotent
+    (GET/DELETE requests, cancels, orders with client order id).
+    Delays use decorrelated jitter: random between base_delay and three times the previous delay,
+    capped with max_delay. Retry-After header is honored when it asks to wait longer.
+
+    :param max_retries: retries of a request after the first attempt
+    :param base_delay: first delay in seconds
+    :param max_delay: maximum delay in seconds
+    :param budgets: retries per endpoint overriding max_retries, e.g. {'/api/v3/exchangeInfo': 5}
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, max_retries=3, base_delay=0.2, max_delay=10, budgets=None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budgets = budgets or {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def is_retryable_status(self, status_code):
+        return status_code in self.RETRY_STATUSES
+
+    def get_budget(self, endpoint):
+        return self.budgets.get(endpoint, self.max_retries)
+
+    def get_delay(self, endpoint, attempt, previous_delay=None, retry_after=None):
+        """
+        Returns seconds to wait before the next attempt or None if retries budget is spent.
+        :param attempt: number of retries already made
+        :param previous_delay: previous delay
+        :param retry_after: Retry-After header value
+        """
+        if attempt >= self.get_budget(endpoint):
+            return None
+
+        delay = min(self.max_delay, random.uniform(self.base_delay, (previous_delay or self.base_delay) * 3))
+        retry_after = self._parse_retry_after(retry_after)
+        if retry_after and retry_after > delay:
+            delay = retry_after
+
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {'retries': 0, 'backoff': 0.0})
+            stats['retries'] += 1
+            stats['backoff'] += delay
+
+        return delay
+
+    @staticmethod
+    def _parse_retry_after(retry_after):
+        # only delay in seconds is supported, HTTP date is ignored
+        try:
+            return float(retry_after)
+        except (TypeError, ValueError):
+            return None
+
+    def get_stats(self):
+        """
+        Returns retries count and cumulative backoff time in seconds per endpoint.
+
+        Example:
+        get_stats()
+        {
+            '/api/v3/exchangeInfo': {'retries': 2, 'backoff': 0.83},
+        }
+        """
+        with self._lock:
+            return {endpoint: dict(stats) for endpoint, stats in self._stats.items()}
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {}
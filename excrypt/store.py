@@ -0,0 +1,153 @@
+"""Local candle history, requires numpy: pip install excrypt[numpy]
+"""
+import os
+import tempfile
+import threading
+import time
+
+from .columnar import CandleFrame, np, _require_numpy
+
+
+class CandleStore:
+    """
+    On-disk candle history, one file of fixed-width binary rows per exchange, market, symbol and interval.
+    Rows are sorted by timestamp and read with mmap, so range queries don't touch the network
+    and don't load the whole file.
+
+    Row: int64 timestamp in seconds, float64 open, high, low, close and volume, little endian.
+
+    :param path: store directory, ~/.cache/excrypt/candles by default
+
+    Example:
+    store = CandleStore()
+    client = Binance()
+    store.sync(client, 'BTC/USDT', '1h', start=1500000000)
+    frame = store.read(client, 'BTC/USDT', '1h', start=1600000000)
+    frame.close.mean()
+    """
+
+    DTYPE = [('timestamp', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+             ('volume', '<f8')]
+
+    def __init__(self, path=None):
+        _require_numpy()
+        self.path = path or os.path.join(os.path.expanduser('~'), '.cache', 'excrypt', 'candles')
+        self._dtype = np.dtype(self.DTYPE)
+        self._lock = threading.Lock()
+
+    def _get_file_path(self, exchange, symbol, interval):
+        symbol = symbol.replace('/', '-').replace(':', '-')
+        return os.path.join(self.path, f'{exchange._NAME}_{exchange._get_market()}_{symbol}_{interval}.candles')
+
+    def _load(self, file_path):
+        """
+        Returns memory-mapped rows, rows of an interrupted append are ignored.
+        """
+        try:
+            count = os.path.getsize(file_path) // self._dtype.itemsize
+        except OSError:
+            count = 0
+        if not count:
+            return np.empty(0, dtype=self._dtype)
+        return np.memmap(file_path, dtype=self._dtype, mode='r', shape=(count,))
+
+    @staticmethod
+    def _to_frame(rows):
+        # fields of structured rows are views, no copy is made
+        return CandleFrame(*(rows[column] for column in CandleFrame.COLUMNS))
+
+    def _to_rows(self, frame):
+        rows = np.empty(len(frame), dtype=self._dtype)
+        for column in CandleFrame.COLUMNS:
+            rows[column] = getattr(frame, column)
+        return rows
+
+    def read(self, exchange, symbol, interval, start=None, end=None):
+        """
+        Returns stored candles with start <= timestamp <= end, timestamps in seconds.
+        :return: CandleFrame of views on the memory-mapped file
+        """
+        rows = self._load(self._get_file_path(exchange, symbol, interval))
+        return self._to_frame(rows).between(start, end)
+
+    def get_last_timestamp(self, exchange, symbol, interval):
+        rows = self._load(self._get_file_path(exchange, symbol, interval))
+        return int(rows['timestamp'][-1]) if len(rows) else None
+
+    def sync(self, exchange, symbol, interval, start=None, end=None, max_workers=4):
+        """
+        Downloads candles newer than the last stored one, only closed candles are stored.
+        :param start: timestamp in seconds to start from when nothing is stored yet
+        :param end: timestamp in seconds, now by default
+        :return: number of stored candles
+        """
+        step = exchange.interval_to_minutes(interval) * 60
+        end = self._get_closed_end(step, end)
+
+        with self._lock:
+            file_path = self._get_file_path(exchange, symbol, interval)
+            last_timestamp = self.get_last_timestamp(exchange, symbol, interval)
+            if last_timestamp is not None:
+                start = last_timestamp + step
+            elif start is None:
+                raise ValueError('start is required for the first sync')
+            if start > end:
+                return 0
+
+            frame = exchange.get_candles_range(symbol, interval, start, end, max_workers=max_workers)
+            if not len(frame):
+                return 0
+            os.makedirs(self.path, exist_ok=True)
+            with open(file_path, 'ab') as f:
+                # drop rows of an interrupted append before appending
+                f.truncate(len(self._load(file_path)) * self._dtype.itemsize)
+                f.write(self._to_rows(frame).tobytes())
+            return len(frame)
+
+    @staticmethod
+    def _get_closed_end(step, end=None):
+        # open time of the last closed candle
+        now = int(time.time())
+        end = min(end or now, now - step)
+        return end - end % step
+
+    def find_gaps(self, exchange, symbol, interval):
+        """
+        Returns (start, end) ranges of missing candles between stored ones, timestamps in seconds.
+        Exchanges may have no candles for periods without trades, such gaps stay after repair.
+        """
+        step = exchange.interval_to_minutes(interval) * 60
+        timestamp = self._load(self._get_file_path(exchange, symbol, interval))['timestamp']
+        if len(timestamp) < 2:
+            return []
+        rows = np.flatnonzero(np.diff(timestamp) > step)
+        return [(int(timestamp[row]) + step, int(timestamp[row + 1]) - step) for row in rows]
+
+    def repair(self, exchange, symbol, interval, max_workers=4):
+        """
+        Requests missing candles of every gap and rewrites the file with them.
+        :return: number of added candles
+        """
+        with self._lock:
+            gaps = self.find_gaps(exchange, symbol, interval)
+            frames = [exchange.get_candles_range(symbol, interval, start, end, max_workers=max_workers)
+                      for start, end in gaps]
+            frame = CandleFrame.concat(frames)
+            if not len(frame):
+                return 0
+
+            file_path = self._get_file_path(exchange, symbol, interval)
+            rows = np.concatenate([self._load(file_path), self._to_rows(frame)])
+            _, unique = np.unique(rows['timestamp'], return_index=True)
+            rows = rows[unique]
+
+            # write to a temporary file first, so readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(rows.tobytes())
+                os.replace(tmp_path, file_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            return len(frame)
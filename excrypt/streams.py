@@ -0,0 +1,1107 @@
+"""WebSocket market data streams.
+
+Streams subscribe to public ticker and candle channels and normalize messages
+into the same shapes the REST parsers produce: Ticker records and candle dicts.
+Connection is restored automatically, subscriptions are sent again after reconnect.
+
+Requires aiohttp: pip install excrypt[async]
+
+    async with BinanceStream() as stream:
+        await stream.subscribe_tickers('BTC/USDT', 'ETH/USDT')
+        await stream.subscribe_candles('1m', 'BTC/USDT')
+        async for channel, symbol, data in stream:
+            print(channel, symbol, data)
+
+Events are (channel, symbol, data) tuples:
+- ('ticker', 'BTC/USDT', Ticker)
+- ('candle', 'BTC/USDT', {'date', 'date_time', 'timestamp', 'open', 'high', 'low', 'close', 'volume',
+  'interval', 'closed'}), closed is None if the exchange does not tell whether the candle is closed.
+- ('book', 'BTC/USDT', OrderBook) after every applied update, the same OrderBook object is updated in place
+  and is also available in stream.order_books.
+
+Order books are synchronized from a snapshot (REST or the first stream message) and diffs.
+Diffs received before the snapshot are buffered, update ids are checked and the book is
+synchronized again on a gap; book events are not sent while the book is out of sync.
+"""
+import asyncio
+import datetime as dt
+import inspect
+import time
+import uuid
+
+try:
+    import aiohttp
+except ImportError:  # optional dependency
+    aiohttp = None
+
+from .binance import Binance
+from .bybit import ByBit
+from .kucoin import KuCoin
+from .bitfinex import Bitfinex
+from .aio import AsyncExchange
+from .dataclasses import Ticker, Order, Balance
+from .orderbook import OrderBook
+from .exceptions import *
+from . import jsonlib
+
+
+def _make_candle(timestamp, open, high, low, close, volume, interval, closed):
+    """
+    Builds candle dict in get_candles format, timestamp in seconds.
+    """
+    timestamp = int(timestamp)
+    date_time = dt.datetime.fromtimestamp(timestamp, dt.timezone.utc).replace(tzinfo=None)
+    return {
+        'date': date_time.date(),
+        'date_time': date_time,
+        'timestamp': timestamp,
+        'open': float(open),
+        'high': float(high),
+        'low': float(low),
+        'close': float(close),
+        'volume': float(volume),
+        'interval': interval,
+        'closed': closed,
+    }
+
+
+class _BookSync:
+    """
+    Synchronization state of an order book.
+    """
+
+    __slots__ = ('local_symbol', 'book', 'synced', 'continuous', 'buffer', 'task')
+
+    def __init__(self, local_symbol, book):
+        self.local_symbol = local_symbol
+        self.book = book
+        self.reset()
+
+    def reset(self):
+        self.synced = False
+        # a diff was applied after the snapshot
+        self.continuous = False
+        self.buffer = []
+        if getattr(self, 'task', None) is not None:
+            self.task.cancel()
+        self.task = None
+
+
+class MarketStream:
+    """
+    Base class of exchange market streams.
+
+    :param exchange: exchange instance used for symbols and intervals conversion, created if not set.
+                     Load exchange info first for exchanges whose symbols can't be converted by separator.
+    :param futures: futures market streams
+    :param url: WebSocket url overriding exchange url, e.g. local stand-in for tests
+    :param session: aiohttp.ClientSession, created if not set
+    :param heartbeat: seconds between WebSocket pings, connection is restored if pong is not received
+    :param reconnect_delay: first delay before reconnect in seconds, doubled on every failed attempt
+    :param max_reconnect_delay: maximum delay before reconnect in seconds
+    """
+
+    _EXCHANGE_CLASS = None
+    _URL = None
+    _FUTURES_URL = None
+
+    # seconds between application level pings, None if the exchange doesn't need them
+    _PING_INTERVAL = None
+
+    # levels of order book REST snapshot
+    _BOOK_SNAPSHOT_LIMIT = 100
+
+    def __init__(self, exchange=None, futures=False, url=None, session=None, heartbeat=30, reconnect_delay=1,
+                 max_reconnect_delay=60):
+        if aiohttp is None:
+            raise ExchangeException("aiohttp is required for streams")
+
+        self.exchange = exchange or self._EXCHANGE_CLASS(futures=futures)
+        self._FUTURES = self.exchange._FUTURES
+        self._url = url
+        self._session = session
+        self._own_session = session is None
+        self.heartbeat = heartbeat
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self._ws = None
+        self._closed = False
+        self._message_id = 0
+        self._next_ping = None
+        self._ping_interval = self._PING_INTERVAL
+        # (channel, local symbol, local interval)
+        self._subscriptions = set()
+        self._global_intervals = {local: interval for interval, local in self.exchange.INTERVALS.items()}
+
+        # global symbol -> OrderBook
+        self.order_books = {}
+        # local symbol -> _BookSync
+        self._book_syncs = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        self._closed = True
+        for book_sync in self._book_syncs.values():
+            book_sync.reset()
+        await self._disconnect()
+        if self._own_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def subscribe_tickers(self, *symbols):
+        await self._subscribe({('ticker', self.exchange._convert_symbol_to_local(symbol), None)
+                               for symbol in symbols})
+
+    async def unsubscribe_tickers(self, *symbols):
+        await self._unsubscribe({('ticker', self.exchange._convert_symbol_to_local(symbol), None)
+                                 for symbol in symbols})
+
+    async def subscribe_candles(self, interval, *symbols):
+        local_interval = self.exchange.interval_to_local(interval)
+        await self._subscribe({('candle', self.exchange._convert_symbol_to_local(symbol), local_interval)
+                               for symbol in symbols})
+
+    async def unsubscribe_candles(self, interval, *symbols):
+        local_interval = self.exchange.interval_to_local(interval)
+        await self._unsubscribe({('candle', self.exchange._convert_symbol_to_local(symbol), local_interval)
+                                 for symbol in symbols})
+
+    async def subscribe_order_book(self, *symbols):
+        for symbol in symbols:
+            self._get_book_sync(self.exchange._convert_symbol_to_local(symbol))
+        await self._subscribe({('book', self.exchange._convert_symbol_to_local(symbol), None) for symbol in symbols})
+
+    async def unsubscribe_order_book(self, *symbols):
+        await self._unsubscribe({('book', self.exchange._convert_symbol_to_local(symbol), None) for symbol in symbols})
+        for symbol in symbols:
+            book_sync = self._book_syncs.pop(self.exchange._convert_symbol_to_local(symbol), None)
+            if book_sync is not None:
+                book_sync.reset()
+                self.order_books.pop(book_sync.book.symbol, None)
+
+    async def _subscribe(self, subscriptions):
+        subscriptions -= self._subscriptions
+        self._subscriptions |= subscriptions
+        if self._ws is not None and subscriptions:
+            await self._send(self._get_subscribe_messages(subscriptions))
+
+    async def _unsubscribe(self, subscriptions):
+        subscriptions &= self._subscriptions
+        self._subscriptions -= subscriptions
+        if self._ws is not None and subscriptions:
+            await self._send(self._get_unsubscribe_messages(subscriptions))
+
+    async def _send(self, messages):
+        for message in messages:
+            await self._ws.send_str(jsonlib.dumps(message))
+
+    @staticmethod
+    async def _call_exchange(method, *args, **kwargs):
+        """
+        Calls REST method of a sync exchange in a thread or awaits method of an async exchange.
+        """
+        # shared endpoints of async exchanges are plain methods returning coroutines
+        if isinstance(getattr(method, '__self__', None), AsyncExchange):
+            result = method(*args, **kwargs)
+        else:
+            result = await asyncio.to_thread(method, *args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    def _get_message_id(self):
+        self._message_id += 1
+        return self._message_id
+
+    async def _get_url(self):
+        return self._FUTURES_URL if self._FUTURES else self._URL
+
+    async def _connect(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        url = self._url or await self._get_url()
+        self._ws = await self._session.ws_connect(url, heartbeat=self.heartbeat)
+        self._on_connect()
+        if self._ping_interval:
+            self._next_ping = asyncio.get_running_loop().time() + self._ping_interval
+        if self._subscriptions:
+            await self._send(self._get_subscribe_messages(self._subscriptions))
+        await self._on_connected()
+
+    async def _on_connected(self):
+        pass
+
+    def _on_connect(self):
+        # updates may be lost while disconnected
+        for book_sync in self._book_syncs.values():
+            book_sync.reset()
+
+    async def _disconnect(self):
+        if self._ws is not None:
+            ws, self._ws = self._ws, None
+            await ws.close()
+
+    async def __aiter__(self):
+        delay = self.reconnect_delay
+        while not self._closed:
+            try:
+                if self._ws is None:
+                    await self._connect()
+                    delay = self.reconnect_delay
+                message = await self._receive()
+            except (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError):
+                if self._closed:
+                    break
+                await self._disconnect()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+
+            if message is not None:
+                for event in self._parse_message(message):
+                    yield event
+
+    async def _receive(self):
+        """
+        Returns decoded message or None if there is nothing to parse.
+        Sends application level ping when it is due.
+        """
+        timeout = None
+        if self._ping_interval:
+            now = asyncio.get_running_loop().time()
+            if now >= self._next_ping:
+                await self._send([self._get_ping_message()])
+                self._next_ping = now + self._ping_interval
+            timeout = self._next_ping - now
+        try:
+            msg = await self._ws.receive(timeout=timeout)
+        except asyncio.TimeoutError:
+            if not self._ping_interval:
+                raise
+            # ping is sent on the next call
+            return None
+
+        if msg.type == aiohttp.WSMsgType.TEXT:
+            return jsonlib.loads(msg.data)
+        if msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING, aiohttp.WSMsgType.CLOSED,
+                        aiohttp.WSMsgType.ERROR):
+            raise ConnectionError(f'WebSocket closed: {msg.type.name}')
+        return None
+
+    def _get_ping_message(self):
+        raise NotImplementedException
+
+    def _get_subscribe_messages(self, subscriptions):
+        raise NotImplementedException
+
+    def _get_unsubscribe_messages(self, subscriptions):
+        raise NotImplementedException
+
+    def _parse_message(self, message):
+        """
+        Returns list of (channel, symbol, data) events of a message.
+        """
+        raise NotImplementedException
+
+    def _get_book_sync(self, local_symbol):
+        book_sync = self._book_syncs.get(local_symbol)
+        if book_sync is None:
+            book = OrderBook(self.exchange._convert_symbol_to_global(local_symbol))
+            book_sync = self._book_syncs[local_symbol] = _BookSync(local_symbol, book)
+            self.order_books[book.symbol] = book
+        return book_sync
+
+    def _on_book_snapshot(self, local_symbol, bids, asks, update_id=None, timestamp=None):
+        """
+        Applies order book snapshot received from the stream.
+        """
+        book_sync = self._get_book_sync(local_symbol)
+        book_sync.reset()
+        book_sync.book.apply_snapshot(bids, asks, update_id, timestamp)
+        book_sync.synced = True
+        return [('book', book_sync.book.symbol, book_sync.book)]
+
+    def _on_book_diff(self, local_symbol, first_id, last_id, bids, asks, timestamp=None, previous_id=None):
+        """
+        Applies order book diff or buffers it until the REST snapshot is loaded.
+        :param first_id: first update id of the diff, None if the exchange has no update ids
+        :param last_id: last update id of the diff
+        :param previous_id: last update id of the previous diff, if the exchange sends it
+        """
+        book_sync = self._get_book_sync(local_symbol)
+        diff = (first_id, last_id, previous_id, bids, asks, timestamp)
+        if not book_sync.synced:
+            # otherwise diffs are dropped until the stream sends the snapshot
+            if self._has_book_snapshot():
+                book_sync.buffer.append(diff)
+                if book_sync.task is None:
+                    book_sync.task = asyncio.ensure_future(self._sync_book(book_sync))
+            return []
+
+        applied = self._apply_book_diff(book_sync, diff)
+        if applied is None:
+            self._resync_book(book_sync)
+            return []
+        if applied:
+            return [('book', book_sync.book.symbol, book_sync.book)]
+        return []
+
+    def _apply_book_diff(self, book_sync, diff):
+        """
+        Returns True if the diff is applied, False if it is older than the book and None on a gap.
+        """
+        first_id, last_id, previous_id, bids, asks, timestamp = diff
+        book = book_sync.book
+        if first_id is not None and book.update_id is not None:
+            if last_id <= book.update_id:
+                return False
+            if book_sync.continuous and previous_id is not None:
+                if previous_id != book.update_id:
+                    return None
+            elif first_id > book.update_id + 1:
+                return None
+            bids = self._filter_book_levels(bids, book.update_id)
+            asks = self._filter_book_levels(asks, book.update_id)
+        book.update(bids, asks, last_id, timestamp)
+        book_sync.continuous = True
+        return True
+
+    @staticmethod
+    def _filter_book_levels(levels, update_id):
+        return levels
+
+    def _has_book_snapshot(self):
+        """
+        True if order books are synchronized from the REST snapshot, otherwise the stream sends it.
+        """
+        return True
+
+    def _resync_book(self, book_sync):
+        book_sync.reset()
+        if self._has_book_snapshot():
+            # the snapshot is requested with the next diff
+            return
+        if self._ws is not None:
+            subscription = {('book', book_sync.local_symbol, None)}
+            asyncio.ensure_future(self._send(self._get_unsubscribe_messages(subscription) +
+                                             self._get_subscribe_messages(subscription)))
+
+    async def _get_book_snapshot(self, local_symbol):
+        symbol = self.exchange._convert_symbol_to_global(local_symbol)
+        return await self._call_exchange(self.exchange.get_order_book, symbol, self._BOOK_SNAPSHOT_LIMIT)
+
+    async def _sync_book(self, book_sync):
+        """
+        Loads the REST snapshot and applies buffered diffs newer than the snapshot.
+        The snapshot is requested again if it is older than the first buffered diff.
+        """
+        delay = self.reconnect_delay
+        while True:
+            try:
+                snapshot = await self._get_book_snapshot(book_sync.local_symbol)
+            except (ExchangeException, OSError):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+
+            book = book_sync.book
+            book.bids, book.asks = snapshot.bids, snapshot.asks
+            book.update_id, book.timestamp = snapshot.update_id, snapshot.timestamp
+            book_sync.continuous = False
+
+            buffer = book_sync.buffer
+            for i, diff in enumerate(buffer):
+                if self._apply_book_diff(book_sync, diff) is None:
+                    # keep diffs after the gap for the next snapshot
+                    book_sync.buffer = buffer[i:]
+                    break
+            else:
+                book_sync.buffer = []
+                book_sync.synced = True
+                book_sync.task = None
+                return
+            await asyncio.sleep(delay)
+
+    def _make_ticker(self, local_symbol, price, timestamp, message):
+        ticker = Ticker()
+        ticker.symbol = self.exchange._convert_symbol_to_global(local_symbol)
+        ticker.price_str = str(price)
+        ticker.timestamp = int(timestamp) if timestamp is not None else None
+        ticker.response = message if self.exchange._KEEP_RESPONSE else None
+        return 'ticker', ticker.symbol, ticker
+
+
+class BinanceStream(MarketStream):
+    # https://binance-docs.github.io/apidocs/spot/en/#websocket-market-streams
+
+    _EXCHANGE_CLASS = Binance
+    _URL = 'wss://stream.binance.com:9443/ws'
+    _FUTURES_URL = 'wss://fstream.binance.com/ws'
+    _BOOK_SNAPSHOT_LIMIT = 1000
+
+    @staticmethod
+    def _get_stream_name(subscription):
+        channel, symbol, interval = subscription
+        if channel == 'ticker':
+            return f'{symbol.lower()}@miniTicker'
+        if channel == 'book':
+            return f'{symbol.lower()}@depth@100ms'
+        return f'{symbol.lower()}@kline_{interval}'
+
+    def _get_subscribe_messages(self, subscriptions):
+        return [{'method': 'SUBSCRIBE', 'params': sorted(map(self._get_stream_name, subscriptions)),
+                 'id': self._get_message_id()}]
+
+    def _get_unsubscribe_messages(self, subscriptions):
+        return [{'method': 'UNSUBSCRIBE', 'params': sorted(map(self._get_stream_name, subscriptions)),
+                 'id': self._get_message_id()}]
+
+    def _parse_message(self, message):
+        # {"e": "24hrMiniTicker", "E": 1672515782136, "s": "BNBBTC", "c": "0.0025", ...}
+        # {"e": "kline", "E": 1672515782136, "s": "BNBBTC", "k": {"t": 1672515780000, "i": "1m", "o": "0.0010",
+        #  "c": "0.0020", "h": "0.0025", "l": "0.0015", "v": "1000", "x": false, ...}}
+        event = message.get('e') if isinstance(message, dict) else None
+        if event == '24hrMiniTicker':
+            return [self._make_ticker(message['s'], message['c'], message['E'], message)]
+        if event == 'kline':
+            kline = message['k']
+            candle = _make_candle(kline['t'] // 1000, kline['o'], kline['h'], kline['l'], kline['c'], kline['v'],
+                                  self._global_intervals.get(kline['i'], kline['i']), kline['x'])
+            return [('candle', self.exchange._convert_symbol_to_global(message['s']), candle)]
+        if event == 'depthUpdate':
+            # {"e": "depthUpdate", "E": 1672515782136, "s": "BNBBTC", "U": 157, "u": 160, "b": [["0.0024", "10"]],
+            #  "a": [["0.0026", "100"]]}, futures diffs contain the previous diff last update id in "pu"
+            return self._on_book_diff(message['s'], message['U'], message['u'], message['b'], message['a'],
+                                      message['E'], message.get('pu'))
+        # subscription results
+        return []
+
+
+class ByBitStream(MarketStream):
+    # https://bybit-exchange.github.io/docs/v5/ws/connect
+
+    _EXCHANGE_CLASS = ByBit
+    _URL = 'wss://stream.bybit.com/v5/public/spot'
+    _FUTURES_URL = 'wss://stream.bybit.com/v5/public/linear'
+    _PING_INTERVAL = 20
+
+    # spot accepts up to 10 topics per request
+    _TOPICS_PER_MESSAGE = 10
+
+    _BOOK_DEPTH = 50
+
+    @classmethod
+    def _get_topic(cls, subscription):
+        channel, symbol, interval = subscription
+        if channel == 'ticker':
+            return f'tickers.{symbol}'
+        if channel == 'book':
+            return f'orderbook.{cls._BOOK_DEPTH}.{symbol}'
+        return f'kline.{interval}.{symbol}'
+
+    def _has_book_snapshot(self):
+        return False
+
+    def _get_messages(self, operation, subscriptions):
+        topics = sorted(map(self._get_topic, subscriptions))
+        return [{'op': operation, 'args': topics[i:i + self._TOPICS_PER_MESSAGE]}
+                for i in range(0, len(topics), self._TOPICS_PER_MESSAGE)]
+
+    def _get_subscribe_messages(self, subscriptions):
+        return self._get_messages('subscribe', subscriptions)
+
+    def _get_unsubscribe_messages(self, subscriptions):
+        return self._get_messages('unsubscribe', subscriptions)
+
+    def _get_ping_message(self):
+        return {'op': 'ping'}
+
+    def _parse_message(self, message):
+        # {"topic": "tickers.BTCUSDT", "ts": 1673853746003, "type": "snapshot",
+        #  "data": {"symbol": "BTCUSDT", "lastPrice": "21109.77", ...}}
+        # {"topic": "kline.5.BTCUSDT", "ts": 1672324988882, "type": "snapshot",
+        #  "data": [{"start": 1672324800000, "interval": "5", "open": "16649.5", "close": "16677",
+        #            "high": "16677", "low": "16608", "volume": "2.081", "confirm": false, ...}]}
+        topic = message.get('topic', '')
+        if topic.startswith('tickers.'):
+            data = message['data']
+            # linear deltas contain changed fields only
+            if 'lastPrice' not in data:
+                return []
+            return [self._make_ticker(data['symbol'], data['lastPrice'], message['ts'], message)]
+        if topic.startswith('kline.'):
+            symbol = self.exchange._convert_symbol_to_global(topic.split('.', 2)[2])
+            return [('candle', symbol, _make_candle(kline['start'] // 1000, kline['open'], kline['high'], kline['low'],
+                                                    kline['close'], kline['volume'],
+                                                    self._global_intervals.get(kline['interval'], kline['interval']),
+                                                    kline['confirm']))
+                    for kline in message['data']]
+        if topic.startswith('orderbook.'):
+            # {"topic": "orderbook.50.BTCUSDT", "type": "snapshot", "ts": 1672304484978,
+            #  "data": {"s": "BTCUSDT", "b": [["16493.50", "0.006"]], "a": [["16611.00", "0.029"]], "u": 18521288,
+            #           "seq": 7961638724}}
+            # update ids of deltas are consecutive, u=1 snapshot is sent after service restart
+            data = message['data']
+            if message['type'] == 'snapshot':
+                return self._on_book_snapshot(data['s'], data['b'], data['a'], data['u'], message['ts'])
+            return self._on_book_diff(data['s'], data['u'], data['u'], data['b'], data['a'], message['ts'])
+        # pong and subscription results
+        return []
+
+
+class KuCoinStream(MarketStream):
+    # https://www.kucoin.com/docs/websocket/basic-info/apply-connect-token/public-token-no-authentication-required-
+
+    _EXCHANGE_CLASS = KuCoin
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self._FUTURES:
+            raise NotImplementedException('KuCoin futures streams are not implemented')
+
+    async def _get_url(self):
+        # the token is valid for 24 hours, so it's requested on every connect
+        response = await self._call_exchange(self.exchange._post, '/api/v1/bullet-public')
+        server = response['instanceServers'][0]
+        self._ping_interval = server['pingInterval'] / 1000
+        return f"{server['endpoint']}?token={response['token']}&connectId={uuid.uuid4().hex}"
+
+    def _get_messages(self, operation, subscriptions):
+        # topics accept up to 100 symbols separated by comma
+        messages = []
+        for channel, interval in {(channel, interval) for channel, _, interval in subscriptions}:
+            if channel in ('ticker', 'book'):
+                topics = [symbol for subscription_channel, symbol, _ in subscriptions if subscription_channel == channel]
+                prefix = '/market/ticker:' if channel == 'ticker' else '/market/level2:'
+            else:
+                topics = [f'{symbol}_{interval}' for subscription_channel, symbol, subscription_interval in subscriptions
+                          if subscription_channel == channel and subscription_interval == interval]
+                prefix = '/market/candles:'
+            topics.sort()
+            for i in range(0, len(topics), 100):
+                messages.append({'id': self._get_message_id(), 'type': operation,
+                                 'topic': prefix + ','.join(topics[i:i + 100]), 'response': True})
+        return messages
+
+    def _get_subscribe_messages(self, subscriptions):
+        return self._get_messages('subscribe', subscriptions)
+
+    def _get_unsubscribe_messages(self, subscriptions):
+        return self._get_messages('unsubscribe', subscriptions)
+
+    def _get_ping_message(self):
+        return {'id': self._get_message_id(), 'type': 'ping'}
+
+    def _parse_message(self, message):
+        # {"type": "message", "topic": "/market/ticker:BTC-USDT", "subject": "trade.ticker",
+        #  "data": {"price": "67523", "time": 1729843222921, ...}}
+        # {"type": "message", "topic": "/market/candles:BTC-USDT_1hour", "subject": "trade.candles.update",
+        #  "data": {"symbol": "BTC-USDT", "candles": ["1589968800", "9786.9", "9740.8", "9806.1", "9732",
+        #           "27.45649579", "268280.09830877"], "time": 1589970010253893337}}
+        if message.get('type') != 'message':
+            # welcome, ack and pong
+            return []
+        topic = message['topic']
+        data = message['data']
+        if topic.startswith('/market/ticker:'):
+            return [self._make_ticker(topic.split(':', 1)[1], data['price'], data['time'], message)]
+        if topic.startswith('/market/candles:'):
+            symbol, interval = topic.split(':', 1)[1].rsplit('_', 1)
+            # [start, open, close, high, low, volume, turnover]
+            candle = data['candles']
+            return [('candle', self.exchange._convert_symbol_to_global(symbol),
+                     _make_candle(candle[0], candle[1], candle[3], candle[4], candle[2], candle[5],
+                                  self._global_intervals.get(interval, interval), None))]
+        if topic.startswith('/market/level2:'):
+            # {"type": "message", "topic": "/market/level2:BTC-USDT", "subject": "trade.l2update",
+            #  "data": {"changes": {"asks": [["18906", "0.00331", "14103845"]], "bids": []},
+            #           "sequenceEnd": 14103845, "sequenceStart": 14103844, "symbol": "BTC-USDT",
+            #           "time": 1663747970273}}
+            changes = data['changes']
+            return self._on_book_diff(data['symbol'], data['sequenceStart'], data['sequenceEnd'], changes['bids'],
+                                      changes['asks'], data['time'])
+        return []
+
+    @staticmethod
+    def _filter_book_levels(levels, update_id):
+        # every change has its own sequence, changes included in the snapshot are skipped
+        return [level for level in levels if int(level[2]) > update_id]
+
+
+class BitfinexStream(MarketStream):
+    # https://docs.bitfinex.com/docs/ws-public
+
+    _EXCHANGE_CLASS = Bitfinex
+    _URL = 'wss://api-pub.bitfinex.com/ws/2'
+
+    _BOOK_DEPTH = '100'
+
+    def _on_connect(self):
+        super()._on_connect()
+        # channel ids are given by the server on every connect
+        self._channels = {}
+
+    def _has_book_snapshot(self):
+        return False
+
+    @classmethod
+    def _get_subscribe_message(cls, subscription):
+        channel, symbol, interval = subscription
+        if channel == 'ticker':
+            return {'event': 'subscribe', 'channel': 'ticker', 'symbol': f't{symbol}'}
+        if channel == 'book':
+            return {'event': 'subscribe', 'channel': 'book', 'symbol': f't{symbol}', 'prec': 'P0',
+                    'len': cls._BOOK_DEPTH}
+        return {'event': 'subscribe', 'channel': 'candles', 'key': f'trade:{interval}:t{symbol}'}
+
+    def _get_subscribe_messages(self, subscriptions):
+        return [self._get_subscribe_message(subscription) for subscription in sorted(subscriptions)]
+
+    def _get_unsubscribe_messages(self, subscriptions):
+        return [{'event': 'unsubscribe', 'chanId': channel_id}
+                for channel_id, subscription in self._channels.items() if subscription in subscriptions]
+
+    def _parse_message(self, message):
+        # {"event": "subscribed", "channel": "ticker", "chanId": 224555, "symbol": "tBTCUSD", "pair": "BTCUSD"}
+        # {"event": "subscribed", "channel": "candles", "chanId": 343351, "key": "trade:1m:tBTCUSD"}
+        # [224555, [BID, BID_SIZE, ASK, ASK_SIZE, DAILY_CHANGE, DAILY_CHANGE_RELATIVE, LAST_PRICE, VOLUME, HIGH, LOW]]
+        # [343351, [[MTS, OPEN, CLOSE, HIGH, LOW, VOLUME], ...]] snapshot, newest first
+        # [343351, [MTS, OPEN, CLOSE, HIGH, LOW, VOLUME]] update
+        # [343351, "hb"] heartbeat
+        # [17082, [[PRICE, COUNT, AMOUNT], ...]] book snapshot, [17082, [PRICE, COUNT, AMOUNT]] book update,
+        # there are no update ids, the book is sent again after subscribe
+        if isinstance(message, dict):
+            if message.get('event') == 'subscribed':
+                if message['channel'] in ('ticker', 'book'):
+                    subscription = (message['channel'], message['symbol'][1:], None)
+                else:
+                    _, interval, symbol = message['key'].split(':', 2)
+                    subscription = ('candle', symbol[1:], interval)
+                self._channels[message['chanId']] = subscription
+            elif message.get('event') == 'unsubscribed':
+                self._channels.pop(message['chanId'], None)
+            return []
+
+        subscription = self._channels.get(message[0])
+        data = message[1]
+        if subscription is None or data == 'hb':
+            return []
+
+        channel, local_symbol, interval = subscription
+        if channel == 'ticker':
+            return [self._make_ticker(local_symbol, data[6], None, message)]
+        if channel == 'book':
+            if data and isinstance(data[0], list):
+                return self._on_book_snapshot(local_symbol, *self.exchange._split_book_levels(data))
+            return self._on_book_diff(local_symbol, None, None, *self.exchange._split_book_levels([data]))
+
+        symbol = self.exchange._convert_symbol_to_global(local_symbol)
+        interval = self._global_intervals.get(interval, interval)
+        rows = reversed(data) if data and isinstance(data[0], list) else [data]
+        return [('candle', symbol, _make_candle(row[0] // 1000, row[1], row[3], row[4], row[2], row[5], interval, None))
+                for row in rows]
+
+
+class UserStream(MarketStream):
+    """
+    Base class of private account streams.
+
+    Order and balance updates are applied to the orders and balances caches, so open orders and balances
+    can be read locally instead of polling REST. Caches are reconciled with REST after every (re)connect,
+    as updates may be lost while disconnected.
+
+    Events:
+    - ('order', 'BTC/USDT', Order)
+    - ('balance', 'BTC', Balance)
+
+    Example:
+    async with BinanceUserStream(Binance(API_KEY, API_SECRET)) as stream:
+        async for channel, key, data in stream:
+            open_orders = stream.get_open_orders('BTC/USDT')
+    """
+
+    _OPEN_STATUSES = ('new', 'partially_filled')
+
+    def __init__(self, exchange, **kwargs):
+        if not exchange._API_KEY:
+            raise ExchangeException("User streams require keys")
+        super().__init__(exchange, **kwargs)
+
+        # order id -> Order
+        self.orders = {}
+        # asset -> Balance
+        self.balances = {}
+        self._reconcile_task = None
+        self._subscriptions = {('order', None, None), ('balance', None, None)}
+
+    async def close(self):
+        if self._reconcile_task is not None:
+            self._reconcile_task.cancel()
+        await super().close()
+
+    async def _on_connected(self):
+        if self._reconcile_task is not None:
+            self._reconcile_task.cancel()
+        self._reconcile_task = asyncio.ensure_future(self._reconcile_in_background())
+
+    async def _reconcile_in_background(self):
+        try:
+            await self.reconcile()
+        except (ExchangeException, OSError):
+            # caches are reconciled again after the next reconnect or by an explicit reconcile call
+            pass
+
+    async def reconcile(self):
+        """
+        Replaces balances and open orders with REST state,
+        cached open orders which are not open anymore are requested one by one.
+        """
+        raise NotImplementedException
+
+    def _apply_open_orders(self, open_orders):
+        """
+        Replaces cached open orders, returns cached orders that were closed while events were missed.
+        """
+        open_ids = {order.order_id for order in open_orders}
+        closed = [order for order in self.orders.values()
+                  if order.status in self._OPEN_STATUSES and order.order_id not in open_ids]
+        for order in open_orders:
+            self.orders[order.order_id] = order
+        return closed
+
+    def get_open_orders(self, symbol=None):
+        return [order for order in self.orders.values()
+                if order.status in self._OPEN_STATUSES and (symbol is None or order.symbol == symbol)]
+
+    def pop_closed_orders(self):
+        """
+        Removes closed orders from the cache and returns them.
+        """
+        closed = [order for order in self.orders.values() if order.status not in self._OPEN_STATUSES]
+        for order in closed:
+            del self.orders[order.order_id]
+        return closed
+
+    def _update_order(self, order):
+        self.orders[order.order_id] = order
+        return 'order', order.symbol, order
+
+    def _update_balance(self, balance):
+        self.balances[balance.asset] = balance
+        return 'balance', balance.asset, balance
+
+    def _make_order(self, local_symbol, order_id, side, type, status, price, orig_qty, qty, quote_qty, timestamp,
+                    message):
+        # fields follow REST parsers: lowercase side, type and status, raw numeric strings
+        order = Order()
+        order.symbol = self.exchange._convert_symbol_to_global(local_symbol)
+        if self.exchange._GLOBAL_SYMBOL_SEPARATOR in order.symbol:
+            order.base_asset, order.quote_asset = self.exchange.get_symbol_assets(order.symbol)
+        order.order_id = str(order_id)
+        order.side = side.lower()
+        order.type = type.lower()
+        order.status = status
+        order.price_str = price
+        order.orig_qty_str = orig_qty
+        order.qty_str = qty
+        order.quote_qty_str = quote_qty
+        order.timestamp = int(timestamp) if timestamp is not None else None
+        # market orders have no price
+        if not float(price or 0) and float(qty or 0):
+            order.price = round(float(quote_qty) / float(qty), 8)
+            order.price_str = '{:0.0{}f}'.format(order.price, 8)
+        order.response = message if self.exchange._KEEP_RESPONSE else None
+        return order
+
+    def _make_balance(self, asset, free, locked, timestamp, message):
+        balance = Balance()
+        balance.asset = asset
+        balance.free = float(free)
+        balance.free_str = free
+        balance.locked = float(locked)
+        balance.locked_str = locked
+        balance.total = balance.free + balance.locked
+        balance.total_str = '{:0.8f}'.format(balance.total)
+        balance.timestamp = int(timestamp) if timestamp is not None else None
+        balance.response = message if self.exchange._KEEP_RESPONSE else None
+        return balance
+
+
+class BinanceUserStream(UserStream):
+    # https://binance-docs.github.io/apidocs/spot/en/#user-data-streams
+
+    _URL = 'wss://stream.binance.com:9443/ws'
+    _FUTURES_URL = 'wss://fstream.binance.com/ws'
+
+    # listen key expires after 60 minutes without keepalive
+    _KEEPALIVE_INTERVAL = 30 * 60
+
+    def __init__(self, exchange, **kwargs):
+        super().__init__(exchange, **kwargs)
+        self._listen_key = None
+        self._keepalive_task = None
+
+    def _get_listen_key_endpoint(self):
+        return '/fapi/v1/listenKey' if self._FUTURES else '/api/v3/userDataStream'
+
+    async def _get_url(self):
+        # listen key requests are not signed, only the API key header is required
+        response = await self._call_exchange(self.exchange._post, self._get_listen_key_endpoint())
+        self._listen_key = response['listenKey']
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+        self._keepalive_task = asyncio.ensure_future(self._keepalive(self._listen_key))
+        return f'{await super()._get_url()}/{self._listen_key}'
+
+    async def _keepalive(self, listen_key):
+        while True:
+            await asyncio.sleep(self._KEEPALIVE_INTERVAL)
+            try:
+                await self._call_exchange(self.exchange._put, self._get_listen_key_endpoint(),
+                                          params={'listenKey': listen_key})
+            except (ExchangeException, OSError):
+                # the stream is reconnected with a new listen key when it expires
+                pass
+
+    async def close(self):
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+        await super().close()
+
+    def _get_subscribe_messages(self, subscriptions):
+        # user data streams have no subscriptions
+        return []
+
+    def _get_unsubscribe_messages(self, subscriptions):
+        return []
+
+    def _parse_message(self, message):
+        event = message.get('e') if isinstance(message, dict) else None
+        if event == 'executionReport':
+            # {"e": "executionReport", "E": 1499405658658, "s": "ETHBTC", "S": "BUY", "o": "LIMIT",
+            #  "q": "1.00000000", "p": "0.10264410", "X": "NEW", "i": 4293153, "z": "0.00000000",
+            #  "Z": "0.00000000", ...}
+            return [self._update_order(self._make_order(
+                message['s'], message['i'], message['S'], message['o'], self._get_status(message['X'], message['z']),
+                message['p'], message['q'], message['z'], message['Z'], message['E'], message))]
+        if event == 'outboundAccountPosition':
+            # {"e": "outboundAccountPosition", "E": 1564034571105, "B": [{"a": "ETH", "f": "10000.000000",
+            #  "l": "0.000000"}]}
+            return [self._update_balance(self._make_balance(item['a'], item['f'], item['l'], message['E'], item))
+                    for item in message['B']]
+        if event == 'ORDER_TRADE_UPDATE':
+            # futures: {"e": "ORDER_TRADE_UPDATE", "E": 1568879465651, "o": {"s": "BTCUSDT", "i": 8886774,
+            #  "S": "SELL", "o": "TRAILING_STOP_MARKET", "q": "0.001", "p": "0", "ap": "0", "X": "NEW", "z": "0"}}
+            order = message['o']
+            quote_qty = '{:0.8f}'.format(float(order['ap']) * float(order['z']))
+            return [self._update_order(self._make_order(
+                order['s'], order['i'], order['S'], order['o'], self._get_status(order['X'], order['z']),
+                order['p'], order['q'], order['z'], quote_qty, message['E'], message))]
+        if event == 'ACCOUNT_UPDATE':
+            # futures: {"e": "ACCOUNT_UPDATE", "E": 1564745798939, "a": {"B": [{"a": "USDT", "wb": "122624.12345678",
+            #  "cw": "100.12345678"}], ...}}, unrealized profit is not sent per asset
+            return [self._update_balance(self._make_balance(item['a'], item['wb'], '0', message['E'], item))
+                    for item in message['a']['B']]
+        if event == 'listenKeyExpired':
+            asyncio.ensure_future(self._disconnect())
+        return []
+
+    @staticmethod
+    def _get_status(status, qty):
+        # same statuses as get_order, canceled orders with fills are partially filled
+        status = status.lower()
+        if status == 'canceled' and float(qty):
+            return 'partially_filled'
+        return status
+
+    async def reconcile(self):
+        open_orders, balances = await asyncio.gather(self._call_exchange(self.exchange.get_open_orders),
+                                                     self._call_exchange(self.exchange.get_balances))
+        self.balances.update(balances)
+        for order in self._apply_open_orders(open_orders):
+            self._update_order(await self._call_exchange(self.exchange.get_order, order.order_id, order.symbol))
+
+
+class ByBitUserStream(UserStream):
+    # https://bybit-exchange.github.io/docs/v5/ws/private/order
+
+    _URL = 'wss://stream.bybit.com/v5/private'
+    _FUTURES_URL = 'wss://stream.bybit.com/v5/private'
+    _PING_INTERVAL = 20
+
+    _STATUSES = {
+        'New': 'new',
+        'PartiallyFilled': 'partially_filled',
+        'Untriggered': 'new',
+        'Filled': 'filled',
+        'Cancelled': 'canceled',
+        'PartiallyFilledCanceled': 'partially_filled',
+        'Rejected': 'rejected',
+        'Deactivated': 'canceled',
+        'Triggered': 'new',
+    }
+
+    def _get_subscribe_messages(self, subscriptions):
+        # authentication is valid for the connection, signature is 'GET/realtime' + expires
+        expires = int(time.time() * 1000) + 10000
+        signature = self.exchange._generate_hmac(f'GET/realtime{expires}')
+        return [{'op': 'auth', 'args': [self.exchange._API_KEY, expires, signature]},
+                {'op': 'subscribe', 'args': ['order', 'wallet']}]
+
+    def _get_unsubscribe_messages(self, subscriptions):
+        return []
+
+    def _get_ping_message(self):
+        return {'op': 'ping'}
+
+    def _parse_message(self, message):
+        if message.get('op') == 'auth' and not message.get('success'):
+            raise ExchangeException(f"Authentication failed: {message.get('ret_msg')}")
+
+        topic = message.get('topic')
+        if topic == 'order':
+            # {"topic": "order", "creationTime": 1672364262474, "data": [{"symbol": "ETH-30DEC22-1400-C",
+            #  "orderId": "5cf98598-39a7-459e-97bf-76ca765ee020", "side": "Sell", "orderType": "Market",
+            #  "price": "72.5", "qty": "1", "cumExecQty": "1", "cumExecValue": "75", "orderStatus": "Filled",
+            #  "updatedTime": "1672364262457", "category": "option", ...}]}
+            return [self._update_order(self._make_rest_order(item, message))
+                    for item in message['data'] if item.get('category', self.exchange._CATEGORY) == self.exchange._CATEGORY]
+        if topic == 'wallet':
+            # {"topic": "wallet", "creationTime": 1672364262482, "data": [{"accountType": "UNIFIED",
+            #  "coin": [{"coin": "USDC", "walletBalance": "21.5", "locked": "0", ...}]}]}
+            return [self._update_balance(balance) for balance in self._make_balances(message['data'],
+                                                                                    message.get('creationTime'))]
+        return []
+
+    def _make_rest_order(self, item, message=None):
+        # REST and stream orders have the same fields
+        return self._make_order(item['symbol'], item['orderId'], item['side'], item['orderType'],
+                                self._STATUSES.get(item['orderStatus'], item['orderStatus'].lower()),
+                                item['price'], item['qty'], item['cumExecQty'], item['cumExecValue'],
+                                item.get('updatedTime'), message or item)
+
+    def _make_balances(self, accounts, timestamp=None):
+        balances = []
+        for account in accounts:
+            for coin in account['coin']:
+                locked = coin.get('locked') or '0'
+                free = '{:0.8f}'.format(float(coin['walletBalance']) - float(locked))
+                balances.append(self._make_balance(coin['coin'], free, locked, timestamp, coin))
+        return balances
+
+    async def reconcile(self):
+        category = self.exchange._CATEGORY
+        params = {'category': category}
+        if category == 'linear':
+            # linear open orders are filtered by symbol or settle coin
+            params['settleCoin'] = 'USDT'
+        open_orders, balances = await asyncio.gather(
+            self._call_exchange(self.exchange._request, '/v5/order/realtime', params=params, signed=True),
+            self._call_exchange(self.exchange.get_balances))
+
+        for balance in self._make_balances(balances['result']['list']):
+            self.balances[balance.asset] = balance
+        closed = self._apply_open_orders([self._make_rest_order(item) for item in open_orders['result']['list']])
+        for order in closed:
+            response = await self._call_exchange(self.exchange._request, '/v5/order/history', signed=True,
+                                                 params={'category': category, 'orderId': order.order_id})
+            for item in response['result']['list']:
+                self._update_order(self._make_rest_order(item))
+
+
+class KuCoinUserStream(UserStream):
+    # https://www.kucoin.com/docs/websocket/spot-trading/private-channels/private-order-change-v2
+
+    _EXCHANGE_CLASS = KuCoin
+
+    def __init__(self, exchange, **kwargs):
+        super().__init__(exchange, **kwargs)
+        if self._FUTURES:
+            raise NotImplementedException('KuCoin futures streams are not implemented')
+
+    async def _get_url(self):
+        response = await self._call_exchange(self.exchange._post, '/api/v1/bullet-private', signed=True)
+        server = response['instanceServers'][0]
+        self._ping_interval = server['pingInterval'] / 1000
+        return f"{server['endpoint']}?token={response['token']}&connectId={uuid.uuid4().hex}"
+
+    def _get_subscribe_messages(self, subscriptions):
+        return [{'id': self._get_message_id(), 'type': 'subscribe', 'topic': topic, 'privateChannel': True,
+                 'response': True} for topic in ('/spotMarket/tradeOrdersV2', '/account/balance')]
+
+    def _get_unsubscribe_messages(self, subscriptions):
+        return []
+
+    def _get_ping_message(self):
+        return {'id': self._get_message_id(), 'type': 'ping'}
+
+    def _parse_message(self, message):
+        if message.get('type') != 'message':
+            return []
+        data = message['data']
+        if message['topic'] == '/spotMarket/tradeOrdersV2':
+            # {"type": "message", "topic": "/spotMarket/tradeOrdersV2", "subject": "orderChange",
+            #  "data": {"symbol": "KCS-USDT", "orderId": "5efab07953bdea00089e2d5d", "side": "buy",
+            #           "orderType": "limit", "type": "match", "status": "match", "price": "0.00001",
+            #           "size": "1", "filledSize": "0.5", "ts": 1593487481683297666, ...}}
+            filled = data.get('filledSize') or '0'
+            quote_qty = '{:0.8f}'.format(float(data.get('matchPrice') or data.get('price') or 0) * float(filled))
+            return [self._update_order(self._make_order(
+                data['symbol'], data['orderId'], data['side'], data['orderType'],
+                self._get_status(data['status'], data['type'], filled), data.get('price') or '0',
+                data.get('size') or filled, filled, quote_qty, data['ts'] // 1000000, message))]
+        if message['topic'] == '/account/balance':
+            # {"type": "message", "topic": "/account/balance", "subject": "account.balance",
+            #  "data": {"currency": "USDT", "total": "88", "available": "88", "hold": "0",
+            #           "relationContext": {"tradeType": "TRADE"}, "time": "1729234455201"}}
+            if data.get('relationContext', {}).get('tradeType', 'TRADE') != 'TRADE':
+                return []
+            return [self._update_balance(self._make_balance(data['currency'], data['available'], data['hold'],
+                                                            data['time'], message))]
+        return []
+
+    @staticmethod
+    def _get_status(status, type, filled):
+        if status == 'done':
+            if type == 'filled':
+                return 'filled'
+            return 'partially_filled' if float(filled) else 'canceled'
+        return 'partially_filled' if float(filled) else 'new'
+
+    def _make_rest_order(self, item):
+        # REST orders: {"id": "5c35c02703aa673ceec2a168", "symbol": "BTC-USDT", "type": "limit", "side": "buy",
+        #  "price": "10", "size": "2", "dealSize": "0", "dealFunds": "0", "isActive": true, "cancelExist": false,
+        #  "createdAt": 1547026471000}
+        if item['isActive']:
+            status = 'partially_filled' if float(item['dealSize']) else 'new'
+        elif float(item['dealSize']) and item['dealSize'] == item['size']:
+            status = 'filled'
+        else:
+            status = 'partially_filled' if float(item['dealSize']) else 'canceled'
+        return self._make_order(item['symbol'], item['id'], item['side'], item['type'], status, item['price'],
+                                item['size'], item['dealSize'], item['dealFunds'], item['createdAt'], item)
+
+    async def reconcile(self):
+        params = {'status': 'active', 'pageSize': 500}
+        response, accounts = await asyncio.gather(
+            self._call_exchange(self.exchange._get, '/api/v1/orders', signed=True, params=params),
+            self._call_exchange(self.exchange._get, '/api/v1/accounts', signed=True))
+        items = list(response['items'])
+        pages = range(2, response['totalPage'] + 1)
+        for page in await self._call_exchange(self.exchange._fetch_pages, '/api/v1/orders', 'get', True, params,
+                                              'currentPage', pages):
+            items.extend(page['items'])
+
+        for account in accounts:
+            if account['type'] == 'trade':
+                self.balances[account['currency']] = self._make_balance(account['currency'], account['available'],
+                                                                        account['holds'], None, account)
+        for order in self._apply_open_orders([self._make_rest_order(item) for item in items]):
+            item = await self._call_exchange(self.exchange._get, f'/api/v1/orders/{order.order_id}', signed=True)
+            self._update_order(self._make_rest_order(item))
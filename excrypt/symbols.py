@@ -0,0 +1,49 @@
+class SuffixMatcher:
+    """
+    Finds the longest asset a separator-less symbol ends with.
+
+    Assets are stored in a reversed trie built once, so a lookup walks the symbol
+    from its end and costs O(symbol length) regardless of the assets count.
+
+    >>> matcher = SuffixMatcher(['USD', 'USDT', 'BTC'])
+    >>> matcher.split('ETHUSDT')
+    ('ETH', 'USDT')
+    """
+
+    _END = ''  # marks the end of an asset inside the trie
+
+    def __init__(self, assets=()):
+        self._trie = {}
+        for asset in assets:
+            self.add(asset)
+
+    def add(self, asset):
+        node = self._trie
+        for char in reversed(asset):
+            node = node.setdefault(char, {})
+        node[self._END] = asset
+
+    def match(self, symbol):
+        """
+        Returns the longest asset the symbol ends with or None.
+        The asset should be shorter than the symbol, so the base asset is never empty.
+        """
+        node = self._trie
+        longest = None
+        for i in range(len(symbol) - 1, 0, -1):
+            node = node.get(symbol[i])
+            if node is None:
+                break
+            if self._END in node:
+                longest = node[self._END]
+        return longest
+
+    def split(self, symbol):
+        """
+        Splits the symbol into base and quote assets.
+        Returns None if the symbol does not end with any known asset.
+        """
+        quote_asset = self.match(symbol)
+        if quote_asset is None:
+            return None
+        return symbol[:-len(quote_asset)], quote_asset
@@ -0,0 +1,313 @@
+"""Async exchanges against a local aiohttp server: request signing, retries and response parsing."""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+
+import pytest
+
+aiohttp = pytest.importorskip('aiohttp')
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from excrypt import AsyncBinance, AsyncKuCoin, AsyncByBit, AsyncBitfinex, RetryPolicy, Order, OrderBook
+from excrypt.exceptions import ExchangeAPIException
+
+KEY = 'key'
+SECRET = 'secret'
+PASSWORD = 'password'
+
+
+def _hmac(message):
+    return hmac.new(SECRET.encode('utf-8'), message.encode('utf-8'), hashlib.sha256)
+
+
+def _serve(routes, scenario):
+    """
+    Runs scenario(url) against a local server of routes {(method, path): handler}, returns its result.
+    """
+    async def main():
+        app = web.Application()
+        for (method, path), handler in routes.items():
+            app.router.add_route(method, path, handler)
+        async with TestServer(app) as server:
+            return await scenario(str(server.make_url('')).rstrip('/'))
+
+    return asyncio.run(main())
+
+
+def _respond(data, check=None):
+    """Handler returning data as JSON, check(request, body) asserts the request first."""
+    async def handler(request):
+        body = await request.text()
+        if check is not None:
+            check(request, body)
+        return web.json_response(data)
+
+    return handler
+
+
+def _flaky(handler, failures):
+    """Handler answering 503 to the first failures requests."""
+    attempts = []
+
+    async def flaky(request):
+        attempts.append(request.path)
+        if len(attempts) <= failures:
+            return web.Response(status=503, text='unavailable')
+        return await handler(request)
+
+    flaky.attempts = attempts
+    return flaky
+
+
+def _retry_policy():
+    return RetryPolicy(max_retries=3, base_delay=0.01, max_delay=0.02)
+
+
+def _binance(url, futures=False):
+    exchange = AsyncBinance(KEY, SECRET, futures=futures, retry_policy=_retry_policy())
+    exchange._API_URL = url
+    return exchange
+
+
+def _check_binance_signature(request, body):
+    query, signature = request.query_string.split('&signature=')
+    assert request.headers['X-MBX-APIKEY'] == KEY
+    assert 'timestamp=' in query
+    assert signature == _hmac(query).hexdigest()
+
+
+BINANCE_ORDER = {'symbol': 'BTCUSDT', 'orderId': 28, 'clientOrderId': 'x1', 'price': '60000.00', 'origQty': '0.002',
+                 'executedQty': '0.001', 'cummulativeQuoteQty': '60.0', 'status': 'PARTIALLY_FILLED',
+                 'type': 'LIMIT', 'side': 'BUY', 'time': 1710931501565}
+
+BINANCE_POSITION = {'symbol': 'BTCUSDT', 'positionAmt': '0.010', 'entryPrice': '60000.0', 'markPrice': '60100.0',
+                    'unRealizedProfit': '1.00000000', 'liquidationPrice': '0', 'leverage': '20',
+                    'marginType': 'cross', 'isolatedMargin': '0.00000000', 'isAutoAddMargin': 'false',
+                    'positionSide': 'BOTH', 'notional': '601.0', 'isolatedWallet': '0'}
+
+
+def test_binance_signs_and_parses_orders():
+    routes = {
+        ('GET', '/api/v3/openOrders'): _respond([BINANCE_ORDER], _check_binance_signature),
+        ('POST', '/api/v3/order'): _respond(BINANCE_ORDER, _check_binance_signature),
+    }
+
+    async def scenario(url):
+        async with _binance(url) as exchange:
+            return (await exchange.get_open_orders('BTC/USDT'),
+                    await exchange.create_order('BTC/USDT', 'buy', '0.002', '60000.00'))
+
+    open_orders, order = _serve(routes, scenario)
+    assert isinstance(order, Order)
+    assert order.symbol == 'BTC/USDT' and order.order_id == '28' and order.status == 'partially_filled'
+    assert order.price == 60000.0 and order.qty == 0.001
+    assert [open_order.order_id for open_order in open_orders] == ['28']
+
+
+def test_binance_retries_signed_requests():
+    handler = _flaky(_respond([BINANCE_ORDER], _check_binance_signature), failures=2)
+    routes = {('GET', '/api/v3/openOrders'): handler}
+
+    async def scenario(url):
+        async with _binance(url) as exchange:
+            return await exchange.get_open_orders('BTC/USDT', parse=False), exchange.get_retry_stats()
+
+    orders, stats = _serve(routes, scenario)
+    assert orders == [BINANCE_ORDER]
+    assert len(handler.attempts) == 3
+    assert stats['/api/v3/openOrders']['retries'] == 2
+
+
+def test_binance_futures_positions_and_settings():
+    routes = {
+        ('GET', '/fapi/v2/positionRisk'): _respond([BINANCE_POSITION], _check_binance_signature),
+        ('POST', '/fapi/v1/marginType'): _respond({'code': 200, 'msg': 'success'}, _check_binance_signature),
+        ('POST', '/fapi/v1/leverage'): _respond({'symbol': 'BTCUSDT', 'leverage': 10}, _check_binance_signature),
+    }
+
+    async def scenario(url):
+        async with _binance(url, futures=True) as exchange:
+            return (await exchange.get_position_info('BTC/USDT'),
+                    await exchange.get_positions_info(),
+                    await exchange.set_margin_type('BTC/USDT', 'isolated'),
+                    await exchange.set_leverage('BTC/USDT', 10))
+
+    position, positions, margin_type, leverage = _serve(routes, scenario)
+    assert position['amount'] == 0.01 and position['leverage'] == 20.0
+    assert positions == {'BTC/USDT': position}
+    assert margin_type == {'code': 200, 'msg': 'success'}
+    assert leverage['leverage'] == 10
+
+
+def test_binance_history_and_symbols():
+    exchange_info = {'symbols': [{'symbol': 'BTCUSDT', 'baseAsset': 'BTC', 'quoteAsset': 'USDT', 'status': 'TRADING',
+                                  'filters': [{'filterType': 'PRICE_FILTER', 'tickSize': '0.01'}]}]}
+    trade = {'symbol': 'BTCUSDT', 'id': 7, 'orderId': 28, 'price': '60000.00', 'qty': '0.001', 'quoteQty': '60.0',
+             'commission': '0.06', 'commissionAsset': 'USDT', 'time': 1710931501565, 'isBuyer': True,
+             'isMaker': False}
+    routes = {
+        ('GET', '/api/v3/exchangeInfo'): _respond(exchange_info),
+        ('GET', '/api/v3/myTrades'): _respond([trade], _check_binance_signature),
+    }
+
+    async def scenario(url):
+        async with _binance(url) as exchange:
+            return await exchange.get_symbols(), await exchange.get_trades('BTC/USDT')
+
+    symbols, trades = _serve(routes, scenario)
+    assert symbols == ['BTC/USDT']
+    assert [(trade.trade_id, trade.price) for trade in trades] == [('7', 60000.0)]
+
+
+def _kucoin(url):
+    exchange = AsyncKuCoin(KEY, SECRET, PASSWORD, retry_policy=_retry_policy())
+    exchange._API_URL = url
+    return exchange
+
+
+def _check_kucoin_signature(request, body):
+    signature_string = request.headers['KC-API-TIMESTAMP'] + request.method + request.path_qs + body
+    assert request.headers['KC-API-KEY'] == KEY
+    assert request.headers['KC-API-SIGN'] == base64.b64encode(_hmac(signature_string).digest()).decode()
+    assert request.headers['KC-API-PASSPHRASE'] == base64.b64encode(_hmac(PASSWORD).digest()).decode()
+
+
+def _kucoin_order(order_id):
+    return {'id': order_id, 'symbol': 'BTC-USDT', 'type': 'limit', 'side': 'buy', 'price': '60000', 'size': '0.002',
+            'dealSize': '0', 'dealFunds': '0', 'createdAt': 1710931501565, 'isActive': True, 'cancelExist': False}
+
+
+def test_kucoin_signs_and_parses():
+    def check_order(request, body):
+        _check_kucoin_signature(request, body)
+        assert json.loads(body)['clientOid'] == 'client-1'
+
+    async def orders(request):
+        _check_kucoin_signature(request, '')
+        page = int(request.query.get('currentPage', 1))
+        return web.json_response({'code': '200000', 'data': {
+            'totalPage': 2, 'items': [_kucoin_order(f'{page}a'), _kucoin_order(f'{page}b')]}})
+
+    routes = {
+        ('GET', '/api/v1/accounts'): _respond({'code': '200000', 'data': [
+            {'currency': 'USDT', 'type': 'trade', 'balance': '10.5', 'available': '10', 'holds': '0.5'}]},
+            _check_kucoin_signature),
+        ('POST', '/api/v1/orders'): _respond({'code': '200000', 'data': {'orderId': 'k1'}}, check_order),
+        ('GET', '/api/v1/orders'): orders,
+    }
+
+    async def scenario(url):
+        async with _kucoin(url) as exchange:
+            return (await exchange.get_balances(),
+                    await exchange.create_order('BTC/USDT', 'buy', '0.002', '60000', client_order_id='client-1'),
+                    await exchange.get_open_orders('BTC/USDT'))
+
+    balances, order, open_orders = _serve(routes, scenario)
+    assert balances['USDT'] == {'total': 10.5, 'free': 10.0, 'locked': 0.5}
+    assert order.order_id == 'k1' and order.symbol == 'BTC/USDT' and order.price_str == '60000'
+    assert sorted(open_order['order_id'] for open_order in open_orders) == ['1a', '1b', '2a', '2b']
+
+
+def test_kucoin_retries():
+    handler = _flaky(_respond({'code': '200000', 'data': {
+        'sequence': '3262786978', 'time': 1550653727731, 'bids': [['60000', '1']], 'asks': [['60001', '2']]}}), 1)
+    routes = {('GET', '/api/v1/market/orderbook/level2_20'): handler}
+
+    async def scenario(url):
+        async with _kucoin(url) as exchange:
+            return await exchange.get_order_book('BTC/USDT', limit=20)
+
+    book = _serve(routes, scenario)
+    assert isinstance(book, OrderBook)
+    assert book.update_id == 3262786978
+    assert len(handler.attempts) == 2
+
+
+def _bybit(url):
+    exchange = AsyncByBit(KEY, SECRET, retry_policy=_retry_policy())
+    exchange._API_URL = url
+    return exchange
+
+
+def _check_bybit_signature(request, body):
+    params_string = request.query_string if request.method == 'GET' else body
+    signature_string = request.headers['X-BAPI-TIMESTAMP'] + KEY + request.headers['X-BAPI-RECV-WINDOW'] + params_string
+    assert request.headers['X-BAPI-API-KEY'] == KEY
+    assert request.headers['X-BAPI-SIGN'] == _hmac(signature_string).hexdigest()
+
+
+def test_bybit_signs_and_parses():
+    open_orders = {'retCode': 0, 'result': {'list': [{'orderId': 'b1'}]}}
+
+    def check_order(request, body):
+        _check_bybit_signature(request, body)
+        assert json.loads(body)['orderLinkId']
+
+    async def create(request):
+        body = await request.text()
+        check_order(request, body)
+        if json.loads(body)['symbol'] == 'ETHUSDT':
+            return web.json_response({'retCode': 170131, 'retMsg': 'Insufficient balance.'})
+        return web.json_response({'retCode': 0, 'result': {'orderId': 'b2', 'orderLinkId': 'x'}})
+
+    routes = {
+        ('GET', '/v5/order/realtime'): _respond(open_orders, _check_bybit_signature),
+        ('POST', '/v5/order/create'): create,
+    }
+
+    async def scenario(url):
+        async with _bybit(url) as exchange:
+            result = (await exchange.get_open_orders('BTCUSDT'),
+                      await exchange.create_order('BTCUSDT', 'buy', '0.002', '60000'))
+            with pytest.raises(ExchangeAPIException):
+                await exchange.create_order('ETHUSDT', 'buy', '0.1', '3000')
+            return result
+
+    orders, order = _serve(routes, scenario)
+    assert orders == open_orders
+    assert order.order_id == 'b2' and order.side == 'buy' and order.orig_qty_str == '0.002'
+
+
+def test_bybit_retries():
+    handler = _flaky(_respond({'retCode': 0, 'result': {
+        's': 'BTCUSDT', 'b': [['60000', '1']], 'a': [['60001', '2']], 'ts': 1716863719031, 'u': 230704}}), 2)
+    routes = {('GET', '/v5/market/orderbook'): handler}
+
+    async def scenario(url):
+        async with _bybit(url) as exchange:
+            return await exchange.get_order_book('BTCUSDT')
+
+    book = _serve(routes, scenario)
+    assert book.update_id == 230704
+    assert len(handler.attempts) == 3
+
+
+def _bitfinex(url):
+    exchange = AsyncBitfinex(retry_policy=_retry_policy())
+    exchange._PUBLIC_API_URL = url
+    exchange._SIGNED_API_URL = url
+    return exchange
+
+
+def test_bitfinex_retries_and_parses():
+    tickers = [['tBTCUSD', 60361, 4.5, 60362, 6.7, -2535, -0.04, 60362, 1021.3, 63177, 59686],
+               ['fUSD', 0.0001, 0, 0, 0, 0.0001, 30, 9999.5, 0, 0, 0.0001, 291.5, 0.0001, 0.0001, None, None, 0]]
+    handler = _flaky(_respond(tickers), 1)
+    routes = {
+        ('GET', '/v2/tickers'): handler,
+        ('GET', '/v2/conf/pub:list:currency'): _respond([['BTC', 'USD', 'ETH']]),
+        ('GET', '/v2/conf/pub:info:pair'): _respond([[['BTCUSD', [None, None, None, '0.0001', '2000']],
+                                                      ['ETHBTC', [None, None, None, '0.001', '2000']]]]),
+    }
+
+    async def scenario(url):
+        async with _bitfinex(url) as exchange:
+            return await exchange.get_tickers(), await exchange.get_exchange_info()
+
+    tickers, symbols_info = _serve(routes, scenario)
+    assert tickers == {'BTC/USD': {'price': 60362.0, 'price_str': '60362'}}
+    assert sorted(symbols_info) == ['BTC/USD', 'ETH/BTC']
+    assert len(handler.attempts) == 2
@@ -0,0 +1,67 @@
+"""Binance account history pagination against a stubbed transport."""
+from excrypt import Binance, CursorStore
+
+
+def _trade(trade_id, order_id):
+    return {'symbol': 'BTCUSDT', 'id': trade_id, 'orderId': order_id, 'price': '60000.00', 'qty': '0.001',
+            'quoteQty': '60.0', 'commission': '0.00000100', 'commissionAsset': 'BTC', 'time': 1710931501565 + trade_id,
+            'isBuyer': True, 'isMaker': False}
+
+
+# trades of orders 4, 5 and 6, order 5 is filled by 5 trades
+TRADES = [_trade(9, 4)] + [_trade(trade_id, 5) for trade_id in range(10, 15)] + [_trade(15, 6)]
+
+
+def _stub_my_trades(exchange, page_size=2):
+    """Serves myTrades like Binance: orderId filters trades of the order, fromId is the first trade id."""
+    requests = []
+
+    def request(endpoint, params, **kwargs):
+        assert endpoint == '/api/v3/myTrades'
+        requests.append(dict(params))
+        trades = [trade for trade in TRADES if trade['id'] >= params.get('fromId', 0)
+                  and trade['orderId'] == params.get('orderId', trade['orderId'])]
+        return trades[:params.get('limit', page_size)]
+
+    exchange._request = request
+    return requests
+
+
+def test_trades_of_order_are_paged_by_trade_id():
+    exchange = Binance('key', 'secret')
+    requests = _stub_my_trades(exchange)
+    trades = exchange.get_trades('BTC/USDT', from_order_id=5)
+    assert [trade.trade_id for trade in trades] == ['10', '11', '12', '13', '14']
+    assert {trade.order_id for trade in trades} == {'5'}
+    assert requests == [{'symbol': 'BTCUSDT', 'orderId': 5}, {'symbol': 'BTCUSDT', 'orderId': 5, 'fromId': 12},
+                        {'symbol': 'BTCUSDT', 'orderId': 5, 'fromId': 14},
+                        {'symbol': 'BTCUSDT', 'orderId': 5, 'fromId': 15}]
+
+    requests.clear()
+    trades = list(exchange.iter_trades('BTC/USDT', from_order_id=5, parse=False))
+    assert [trade['id'] for trade in trades] == [10, 11, 12, 13, 14]
+    assert all(request['orderId'] == 5 for request in requests)
+
+
+def test_trades_are_paged_from_trade_id():
+    exchange = Binance('key', 'secret')
+    requests = _stub_my_trades(exchange)
+    trades = exchange.get_trades('BTC/USDT', from_trade_id=12)
+    assert [trade.trade_id for trade in trades] == ['12', '13', '14', '15']
+    assert [request.get('fromId') for request in requests] == [12, 14, 16]
+
+
+def test_sync_trades_continues_from_cursor(tmp_path):
+    exchange = Binance('key', 'secret')
+    requests = _stub_my_trades(exchange)
+    exchange._HISTORY_LIMIT = 3
+    cursors = CursorStore(str(tmp_path / 'cursors.json'))
+
+    assert [trade.trade_id for trade in exchange.sync_trades('BTC/USDT', cursors)] == [
+        '9', '10', '11', '12', '13', '14', '15']
+    # a page shorter than the limit is the last one
+    assert [request['fromId'] for request in requests] == [0, 12, 15]
+
+    requests.clear()
+    assert exchange.sync_trades('BTC/USDT', CursorStore(cursors.path)) == []
+    assert requests == [{'symbol': 'BTCUSDT', 'fromId': 16, 'limit': 3}]
@@ -0,0 +1,100 @@
+"""On-disk exchange info cache and history cursors."""
+import gzip
+import os
+
+from excrypt import Binance, CursorStore, ExchangeInfoCache, SymbolInfo
+
+EXCHANGE_INFO = {'symbols': [
+    {'symbol': 'BTCUSDT', 'baseAsset': 'BTC', 'quoteAsset': 'USDT', 'status': 'TRADING',
+     'filters': [{'filterType': 'PRICE_FILTER', 'tickSize': '0.01'},
+                 {'filterType': 'LOT_SIZE', 'minQty': '0.00001', 'stepSize': '0.00001'},
+                 {'filterType': 'NOTIONAL', 'minNotional': '5.00000000'}]},
+    {'symbol': 'ETHFDUSD', 'baseAsset': 'ETH', 'quoteAsset': 'FDUSD', 'status': 'BREAK',
+     'filters': [{'filterType': 'PRICE_FILTER', 'tickSize': '0.25'},
+                 {'filterType': 'LOT_SIZE', 'minQty': '0.0001', 'stepSize': '0.0001'}]},
+]}
+
+
+def _exchange():
+    exchange = Binance()
+    exchange.requests = []
+
+    def request(endpoint, **kwargs):
+        exchange.requests.append(endpoint)
+        return EXCHANGE_INFO
+
+    exchange._request = request
+    return exchange
+
+
+def test_missing_cache_is_requested_and_saved(tmp_path):
+    cache = ExchangeInfoCache(str(tmp_path))
+    exchange = _exchange()
+    symbols_info = exchange.load_exchange_info(cache)
+    assert exchange.requests == ['/api/v3/exchangeInfo']
+    assert symbols_info['BTC/USDT'].price_precision == 2
+    assert os.listdir(tmp_path) == ['binance_spot_exchange_info.json.gz']
+
+
+def test_cached_exchange_info_is_restored_without_requests(tmp_path):
+    cache = ExchangeInfoCache(str(tmp_path))
+    _exchange().load_exchange_info(cache)
+
+    exchange = _exchange()
+    symbols_info = exchange.load_exchange_info(cache)
+    assert exchange.requests == []
+    info = symbols_info['ETH/FDUSD']
+    assert isinstance(info, SymbolInfo) and info.status == 'BREAK' and info.response is None
+    assert info.price_tick_size_str == '0.25' and info.price_precision == 2
+    assert exchange.get_quantizer('ETH/FDUSD').price_to_str(2000.3) == '2000.25'
+    # symbols index and quote assets are restored too
+    assert exchange._convert_symbol_to_global('ETHFDUSD') == 'ETH/FDUSD'
+    assert exchange._convert_symbol_to_global('SOLFDUSD') == 'SOL/FDUSD'
+
+
+def test_expired_cache_is_refreshed(tmp_path):
+    cache = ExchangeInfoCache(str(tmp_path), ttl=-1)
+    _exchange().load_exchange_info(cache)
+    created = cache.load('binance', 'spot')[0]
+
+    exchange = _exchange()
+    exchange.load_exchange_info(cache, background=False)
+    assert exchange.requests == ['/api/v3/exchangeInfo']
+    assert cache.load('binance', 'spot')[0] > created
+
+
+def test_unreadable_cache_is_a_miss(tmp_path):
+    cache = ExchangeInfoCache(str(tmp_path))
+    file_path = tmp_path / 'binance_spot_exchange_info.json.gz'
+    file_path.write_bytes(b'not gzip')
+    assert cache.load('binance', 'spot') is None
+    with gzip.open(file_path, 'wt') as f:
+        f.write('{"created": 1, "type": "SymbolInfo", "symbols": {"BTC/USDT": {"unknown": 1}}}')
+    assert cache.load('binance', 'spot') is None
+
+    exchange = _exchange()
+    exchange.load_exchange_info(cache)
+    assert exchange.requests == ['/api/v3/exchangeInfo']
+    assert cache.load('binance', 'spot') is not None
+
+
+def test_cursors_are_persisted(tmp_path):
+    path = str(tmp_path / 'excrypt' / 'cursors.json')
+    cursors = CursorStore(path)
+    cursors.set('binance:spot::BTCUSDT:/api/v3/myTrades', 28)
+    cursors.set('binance:spot::ETHUSDT:/api/v3/myTrades', 7)
+    cursors.delete('binance:spot::ETHUSDT:/api/v3/myTrades')
+    cursors.delete('unknown')
+
+    cursors = CursorStore(path)
+    assert cursors.get('binance:spot::BTCUSDT:/api/v3/myTrades') == 28
+    assert cursors.get('binance:spot::ETHUSDT:/api/v3/myTrades', 0) == 0
+    assert os.listdir(tmp_path / 'excrypt') == ['cursors.json']
+
+
+def test_cursor_keys_identify_accounts_without_keys():
+    key = Binance('key', 'secret')._get_cursor_key('BTC/USDT', '/api/v3/myTrades')
+    assert key.startswith('binance:spot:') and key.endswith(':BTC/USDT:/api/v3/myTrades')
+    assert 'key' not in key.split(':')[2]
+    assert key != Binance('other', 'secret')._get_cursor_key('BTC/USDT', '/api/v3/myTrades')
+    assert key != Binance('key', 'secret', futures=True)._get_cursor_key('BTC/USDT', '/api/v3/myTrades')
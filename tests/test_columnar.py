@@ -0,0 +1,122 @@
+"""Columnar tickers and candles, concurrent candle ranges and the local candle store."""
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from excrypt import Binance, ByBit, CandleFrame, CandleStore, TickerSnapshot
+
+T0 = 1699999980  # minute open time, seconds
+
+
+def _stub_candles(exchange, missing=()):
+    """Serves 1m ByBit candles of [start, end] newest first, candles of missing open times do not exist."""
+    requests = []
+
+    def request(endpoint, params, **kwargs):
+        assert endpoint == '/v5/market/kline' and params['interval'] == '1'
+        requests.append((params['start'] // 1000, params['end'] // 1000))
+        timestamps = [t for t in range(params['start'] // 1000, params['end'] // 1000 + 1, 60) if t not in missing]
+        rows = [[str(t * 1000), str(t % 997), str(t % 997 + 2), str(t % 997 - 1), str(t % 997 + 1), '0.5', '1']
+                for t in timestamps[:params['limit']]]
+        return {'retCode': 0, 'result': {'list': rows[::-1]}}
+
+    exchange._request = request
+    return requests
+
+
+def test_ticker_snapshot():
+    exchange = Binance()
+    exchange._request = lambda endpoint, **kwargs: [{'symbol': 'BTCUSDT', 'price': '60000.50'},
+                                                    {'symbol': 'ETHBTC', 'price': '0.05'}]
+    snapshot = exchange.get_ticker_snapshot()
+    assert isinstance(snapshot, TickerSnapshot) and len(snapshot) == 2
+    assert list(snapshot.symbols) == ['BTC/USDT', 'ETH/BTC']
+    assert snapshot.price.dtype == np.float64 and snapshot.get_price('BTC/USDT') == 60000.5
+    assert 'ETH/BTC' in snapshot and 'ETH/USDT' not in snapshot
+    assert snapshot.timestamp[0] == snapshot.timestamp[1] > 0
+    assert list(snapshot.symbols[snapshot.price > 1]) == ['BTC/USDT']
+
+
+def test_candle_frame_from_rows():
+    rows = [[1700000040000, '1', '3', '0.5', '2', '10'], [1700000100000, '2', '4', '1.5', '3', '20']]
+    frame = CandleFrame.from_rows(rows)
+    assert len(frame) == 2 and frame.timestamp.dtype == np.int64
+    assert list(frame.timestamp) == [1700000040, 1700000100]
+    assert list(frame.close) == [2.0, 3.0] and frame.volume.sum() == 30
+    assert frame[-1]['timestamp'] == 1700000100 and frame[-1]['high'] == 4.0
+    assert frame[0]['date_time'].isoformat() == '2023-11-14T22:14:00'
+    assert frame.to_dicts() == [frame[0], frame[1]]
+    assert len(CandleFrame.from_rows([])) == 0
+
+
+def test_candle_frame_slices_are_views():
+    frame = CandleFrame(range(T0, T0 + 600, 60), *([float(i) for i in range(10)] for _ in range(5)))
+    window = frame.between(T0 + 90, T0 + 300)
+    assert list(window.timestamp) == [T0 + 120, T0 + 180, T0 + 240, T0 + 300]
+    assert np.shares_memory(window.close, frame.close)
+    assert len(frame[2:4]) == 2 and len(frame.between(end=T0)) == 1
+    merged = CandleFrame.concat([frame[:3], CandleFrame.empty(), frame[3:]])
+    assert list(merged.timestamp) == list(frame.timestamp)
+
+
+def test_candles_range_is_fetched_in_windows():
+    exchange = ByBit()
+    exchange._CANDLES_LIMIT = 10
+    requests = _stub_candles(exchange)
+    frame = exchange.get_candles_range('BTC/USDT', '1m', T0 + 30, T0 + 34 * 60, max_workers=3)
+    assert list(frame.timestamp) == list(range(T0 + 60, T0 + 35 * 60, 60))
+    assert sorted(requests) == [(T0, T0 + 540), (T0 + 600, T0 + 1140), (T0 + 1200, T0 + 1740),
+                                (T0 + 1800, T0 + 2040)]
+    assert frame.close[0] == (T0 + 60) % 997 + 1
+
+
+def test_candle_store_syncs_incrementally(tmp_path):
+    exchange = ByBit()
+    requests = _stub_candles(exchange)
+    store = CandleStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.sync(exchange, 'BTC/USDT', '1m')
+
+    assert store.sync(exchange, 'BTC/USDT', '1m', start=T0, end=T0 + 19 * 60) == 20
+    assert store.sync(exchange, 'BTC/USDT', '1m', end=T0 + 19 * 60) == 0
+    assert store.sync(exchange, 'BTC/USDT', '1m', end=T0 + 29 * 60) == 10
+    assert requests == [(T0, T0 + 19 * 60), (T0 + 20 * 60, T0 + 29 * 60)]
+
+    assert store.get_last_timestamp(exchange, 'BTC/USDT', '1m') == T0 + 29 * 60
+    frame = store.read(exchange, 'BTC/USDT', '1m', start=T0 + 600, end=T0 + 660)
+    assert list(frame.timestamp) == [T0 + 600, T0 + 660] and frame.close[0] == (T0 + 600) % 997 + 1
+    assert len(store.read(exchange, 'BTC/USDT', '1h')) == 0
+
+
+def test_candle_store_drops_interrupted_append(tmp_path):
+    exchange = ByBit()
+    _stub_candles(exchange)
+    store = CandleStore(str(tmp_path))
+    store.sync(exchange, 'BTC/USDT', '1m', start=T0, end=T0 + 4 * 60)
+    file_path = os.path.join(str(tmp_path), os.listdir(str(tmp_path))[0])
+    with open(file_path, 'ab') as f:
+        f.write(b'partial row')
+
+    assert len(store.read(exchange, 'BTC/USDT', '1m')) == 5
+    store.sync(exchange, 'BTC/USDT', '1m', end=T0 + 9 * 60)
+    assert list(store.read(exchange, 'BTC/USDT', '1m').timestamp) == list(range(T0, T0 + 600, 60))
+    assert os.path.getsize(file_path) == 10 * 48
+
+
+def test_candle_store_repairs_gaps(tmp_path):
+    exchange = ByBit()
+    missing = {T0 + 3 * 60, T0 + 4 * 60, T0 + 8 * 60}
+    _stub_candles(exchange, missing)
+    store = CandleStore(str(tmp_path))
+    store.sync(exchange, 'BTC/USDT', '1m', start=T0, end=T0 + 9 * 60)
+    assert store.find_gaps(exchange, 'BTC/USDT', '1m') == [(T0 + 180, T0 + 240), (T0 + 480, T0 + 480)]
+
+    # exchange has no candles in the gaps yet
+    assert store.repair(exchange, 'BTC/USDT', '1m') == 0
+
+    missing.clear()
+    assert store.repair(exchange, 'BTC/USDT', '1m') == 3
+    assert store.find_gaps(exchange, 'BTC/USDT', '1m') == []
+    assert list(store.read(exchange, 'BTC/USDT', '1m').timestamp) == list(range(T0, T0 + 600, 60))
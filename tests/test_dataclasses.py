@@ -0,0 +1,48 @@
+"""Lazy fields of records: decoding, overrides and dataclass helpers."""
+import copy
+import dataclasses
+import pickle
+from datetime import datetime
+
+from excrypt import Order, Trade, Ticker
+
+
+def _order():
+    order = Order()
+    order.symbol = 'BTC/USDT'
+    order.price_str = '60000.5'
+    order.qty_str = '0.002'
+    order.timestamp = 1710931501565
+    return order
+
+
+def test_lazy_fields_decode_raw_fields():
+    order = _order()
+    assert order.price == 60000.5 and order.qty == 0.002 and order.stop_price is None
+    assert order.datetime == datetime(2024, 3, 20, 10, 45, 1)
+    order.price = 1.5
+    assert order.price == 1.5 and order.price_str == '60000.5'
+
+
+def test_lazy_fields_are_compared_and_shown():
+    assert Order(price=1.5) != Order(price=2.0)
+    assert Order(price=1.5) == Order(price=1.5)
+    assert 'price=60000.5' in repr(_order())
+    values = dataclasses.asdict(_order())
+    assert values['price'] == 60000.5 and values['datetime'] == datetime(2024, 3, 20, 10, 45, 1)
+    assert dataclasses.replace(_order(), side='buy').price == 60000.5
+
+
+def test_lazy_fields_survive_copies():
+    assert copy.copy(_order()).price == 60000.5
+    assert copy.deepcopy(_order()).qty == 0.002
+    assert pickle.loads(pickle.dumps(_order())).price == 60000.5
+
+
+def test_positional_fields_keep_their_order():
+    order = Order('BTC/USDT', '28', 60000.0, '60000.0')
+    assert order.order_id == '28' and order.price == 60000.0 and order.price_str == '60000.0'
+    trade = Trade('BTC/USDT', '28', '7', 60000.0)
+    assert trade.trade_id == '7' and trade.price == 60000.0
+    ticker = Ticker('BTC/USDT', 60000.0)
+    assert ticker.price == 60000.0 and ticker.price_str is None
@@ -0,0 +1,243 @@
+"""Exchange helpers: precision, pagination, order batches and request signing."""
+import base64
+import hashlib
+import hmac
+import json
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+
+from excrypt import Binance, ExchangeAPIException, ExchangeException, KuCoin
+from excrypt.exchange import Exchange
+
+KEY = 'key'
+SECRET = 'secret'
+PASSWORD = 'password'
+TIMESTAMP = 1710931501565
+
+
+def _order(order_id, symbol='BTCUSDT', side='BUY', price='60000.00', quantity='0.001'):
+    return {'symbol': symbol, 'orderId': order_id, 'price': price, 'origQty': quantity, 'executedQty': '0',
+            'status': 'NEW', 'type': 'LIMIT', 'side': side}
+
+
+def _kucoin_order(order_id):
+    return {'symbol': 'BTC-USDT', 'id': str(order_id), 'price': '60000', 'dealSize': '0', 'size': '0.001',
+            'dealFunds': '0', 'type': 'limit', 'side': 'buy', 'createdAt': TIMESTAMP, 'isActive': True,
+            'cancelExist': False}
+
+
+def _signature(query):
+    return hmac.new(SECRET.encode(), query.encode(), hashlib.sha256).hexdigest()
+
+
+@pytest.mark.parametrize('value, precision', [
+    ('0.01', 2), ('0.25', 2), ('0.00001000', 5), ('1', 0), ('1.0', 0), ('10', -1), ('1e-8', 8), (0.001, 3),
+    ('0', 0), (None, 0),
+])
+def test_get_precision(value, precision):
+    assert Exchange.get_precision(value) == precision
+
+
+@pytest.mark.parametrize('value, precision, truncated', [
+    (0.29, 2, 0.29), (1.23456, 3, 1.234), (-1.239, 2, -1.23), (1234.5, -1, 1230.0), ('0.1', 1, 0.1),
+])
+def test_truncate_value(value, precision, truncated):
+    assert Exchange.truncate_value(value, precision) == truncated
+
+
+def _stub_pages(exchange, items, page_size=3):
+    """Serves items with id >= fromId, page_size per page. Returns requested params."""
+    requests = []
+
+    def request(endpoint, method=None, signed=False, params=None):
+        requests.append(dict(params))
+        return [item for item in items if item['id'] >= params.get('fromId', 0)][:page_size]
+
+    exchange._request = request
+    return requests
+
+
+def test_paginated_data_until_empty_page():
+    exchange = Binance(KEY, SECRET)
+    requests = _stub_pages(exchange, [{'id': i} for i in range(7)])
+    params = {'symbol': 'BTCUSDT'}
+    responses = exchange._get_paginated_data('/api/v3/myTrades', 'get', True, params, 'fromId', 'id')
+    assert [item['id'] for item in responses] == list(range(7))
+    assert [request.get('fromId') for request in requests] == [None, 3, 6, 7]
+    assert params == {'symbol': 'BTCUSDT'}
+
+
+@pytest.mark.parametrize('prefetch', [True, False])
+def test_iter_paginated_data_stops_on_short_page(prefetch):
+    exchange = Binance(KEY, SECRET)
+    requests = _stub_pages(exchange, [{'id': i} for i in range(7)])
+    pages = list(exchange._iter_paginated_data('/api/v3/myTrades', 'get', True, {}, 'fromId', 'id',
+                                               prefetch=prefetch, page_size=3))
+    assert [[item['id'] for item in page] for page in pages] == [[0, 1, 2], [3, 4, 5], [6]]
+    assert [request.get('fromId') for request in requests] == [None, 3, 6]
+
+
+def test_iter_paginated_data_stops_when_closed():
+    exchange = Binance(KEY, SECRET)
+    requests = _stub_pages(exchange, [{'id': i} for i in range(100)])
+    pages = exchange._iter_paginated_data('/api/v3/myTrades', 'get', True, {}, 'fromId', 'id')
+    assert [item['id'] for item in next(pages)] == [0, 1, 2]
+    pages.close()
+    # at most the prefetched page is requested
+    assert len(requests) <= 2
+
+
+def test_kucoin_orders_pages_are_fetched_after_first_page():
+    exchange = KuCoin(KEY, SECRET, PASSWORD)
+    requests = []
+
+    def request(endpoint, method=None, signed=False, params=None):
+        assert endpoint == '/api/v1/orders' and signed
+        requests.append(dict(params))
+        page = params.get('currentPage', 1)
+        return {'currentPage': page, 'totalPage': 3, 'items': [_kucoin_order(page * 10 + i) for i in range(2)]}
+
+    exchange._request = request
+    orders = exchange.get_orders('BTC/USDT', max_workers=2)
+    # pages are newest first, orders are oldest first
+    assert [order['order_id'] for order in orders] == ['31', '30', '21', '20', '11', '10']
+    assert requests[0] == {'symbol': 'BTC-USDT'}
+    assert sorted(request['currentPage'] for request in requests[1:]) == [2, 3]
+
+
+def test_futures_orders_are_created_in_batches():
+    exchange = Binance(KEY, SECRET, futures=True)
+    batches = []
+
+    def request(endpoint, method=None, signed=False, params=None):
+        assert endpoint == '/fapi/v1/batchOrders' and method == 'post' and signed
+        orders = json.loads(params['batchOrders'])
+        batches.append(orders)
+        return [{'code': -2019, 'msg': 'Margin is insufficient.'} if order['price'] == '1' else
+                _order(int(order['newClientOrderId']), price=order['price']) for order in orders]
+
+    exchange._request = request
+    orders = [{'symbol': 'BTC/USDT', 'side': 'buy', 'quantity': 0.001, 'price': 60000 + i,
+               'client_order_id': str(i)} for i in range(7)]
+    orders[5]['price'] = 1
+    results = exchange.create_orders(orders)
+    assert [len(batch) for batch in batches] == [5, 2]
+    assert batches[0][0] == {'symbol': 'BTCUSDT', 'side': 'BUY', 'type': 'LIMIT', 'quantity': '0.001',
+                             'timeInForce': 'GTC', 'price': '60000', 'newClientOrderId': '0'}
+    assert isinstance(results[5], ExchangeAPIException)
+    assert [result.order_id for result in results if not isinstance(result, ExchangeException)] == \
+        ['0', '1', '2', '3', '4', '6']
+
+
+def test_futures_orders_are_canceled_in_batches_per_symbol():
+    exchange = Binance(KEY, SECRET, futures=True)
+    batches = []
+
+    def request(endpoint, method=None, signed=False, params=None):
+        if params['symbol'] == 'ETHUSDT':
+            raise ExchangeAPIException('Status code 400')
+        batches.append(params)
+        return [_order(order_id) for order_id in json.loads(params['orderIdList'])]
+
+    exchange._request = request
+    orders = [{'symbol': 'BTC/USDT', 'order_id': str(i)} for i in range(12)]
+    orders.append({'symbol': 'ETH/USDT', 'order_id': '1'})
+    results = exchange.cancel_orders(orders)
+    assert [json.loads(batch['orderIdList']) for batch in batches] == [list(range(10)), [10, 11]]
+    assert [result.order_id for result in results[:12]] == [str(i) for i in range(12)]
+    assert isinstance(results[12], ExchangeAPIException)
+
+
+def test_spot_orders_are_created_concurrently():
+    exchange = Binance(KEY, SECRET)
+
+    def request(endpoint, method=None, signed=False, params=None):
+        assert endpoint == '/api/v3/order' and method == 'post' and params['newClientOrderId']
+        if params['price'] == 1:
+            raise ExchangeAPIException('Status code 400')
+        return _order(params['price'])
+
+    exchange._request = request
+    results = exchange.create_orders([{'symbol': 'BTC/USDT', 'side': 'buy', 'quantity': 0.001, 'price': price}
+                                      for price in (3, 1, 2)], max_workers=2)
+    assert results[0].order_id == '3' and results[2].order_id == '2'
+    assert isinstance(results[1], ExchangeAPIException)
+    assert exchange.create_orders([]) == []
+
+
+def test_hmac_follows_secret():
+    exchange = Binance(KEY, SECRET)
+    assert exchange._generate_hmac('symbol=BTCUSDT') == _signature('symbol=BTCUSDT')
+    assert exchange._generate_hmac('symbol=ETHUSDT') == _signature('symbol=ETHUSDT')
+    exchange._API_SECRET = 'rotated'
+    assert exchange._generate_hmac('symbol=BTCUSDT') == \
+        hmac.new(b'rotated', b'symbol=BTCUSDT', hashlib.sha256).hexdigest()
+
+
+def test_kucoin_passphrase_follows_keys():
+    exchange = KuCoin(KEY, SECRET, PASSWORD)
+    expected = base64.b64encode(hmac.new(SECRET.encode(), PASSWORD.encode(), hashlib.sha256).digest())
+    assert exchange._generate_passphrase() == expected
+    assert exchange._generate_passphrase() is exchange._generate_passphrase()
+    exchange._API_PASSWORD = 'changed'
+    assert exchange._generate_passphrase() == \
+        base64.b64encode(hmac.new(SECRET.encode(), b'changed', hashlib.sha256).digest())
+
+
+class _Response:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, content):
+        self.content = content
+        self.text = content.decode()
+
+
+def _stub_post(exchange):
+    sent = []
+
+    def post(uri, **kwargs):
+        sent.append((uri, kwargs))
+        query = dict(parse_qsl(urlsplit(uri).query))
+        return _Response(json.dumps(_order(28, side=query['side'], price=query.get('price', '0'),
+                                           quantity=query['quantity'])).encode())
+
+    exchange._session.post = post
+    exchange._generate_timestamp = lambda: TIMESTAMP
+    return sent
+
+
+def test_prepared_order_is_signed_like_create_order():
+    exchange = Binance(KEY, SECRET, rate_limit=False)
+    sent = _stub_post(exchange)
+    prepared = exchange.prepare_order('BTC/USDT', 'buy')
+    order = prepared.send('0.00100', '60000.00')
+    assert order.order_id == '28' and order.price_str == '60000.00' and order.orig_qty_str == '0.00100'
+
+    uri, kwargs = sent[0]
+    assert uri.startswith('https://api.binance.com/api/v3/order?') and kwargs == {'timeout': 10}
+    query, signature = urlsplit(uri).query.rsplit('&signature=', 1)
+    assert signature == _signature(query)
+    assert dict(parse_qsl(query)) == {'symbol': 'BTCUSDT', 'side': 'BUY', 'type': 'LIMIT', 'timeInForce': 'GTC',
+                                      'quantity': '0.00100', 'price': '60000.00', 'timestamp': str(TIMESTAMP)}
+
+    with pytest.raises(ExchangeException):
+        prepared.send('0.00100')
+
+
+def test_prepared_market_order():
+    exchange = Binance(KEY, SECRET, futures=True, rate_limit=False)
+    sent = _stub_post(exchange)
+    exchange.prepare_order('BTC/USDT', 'sell', type='MARKET').send('0.002')
+    uri = sent[0][0]
+    assert uri.startswith('https://fapi.binance.com/fapi/v1/order?')
+    query, signature = urlsplit(uri).query.rsplit('&signature=', 1)
+    assert signature == _signature(query)
+    assert dict(parse_qsl(query)) == {'symbol': 'BTCUSDT', 'side': 'SELL', 'type': 'MARKET', 'quantity': '0.002',
+                                      'timestamp': str(TIMESTAMP)}
+
+
+def test_prepared_order_requires_keys():
+    with pytest.raises(ExchangeException):
+        Binance().prepare_order('BTC/USDT', 'buy')
@@ -0,0 +1,42 @@
+"""Grid orders: price spacing, rounding away from the range and symbol limits."""
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from excrypt import Quantizer
+from excrypt.grid import build_grid
+from excrypt.exceptions import ExchangeException
+
+
+def _quantizer():
+    return Quantizer('0.01', '0.001', min_quantity='0.001', min_notional='5')
+
+
+def test_buy_grid_rounds_prices_down():
+    prices, quantities = build_grid(_quantizer(), 'buy', 100, 101, 4, quantity=0.1)
+    assert prices == ['100.00', '100.33', '100.66', '101.00']
+    assert quantities == ['0.100'] * 4
+
+
+def test_sides_are_case_insensitive():
+    assert build_grid(_quantizer(), 'SELL', 100, 101, 4, quantity=0.1) == \
+        build_grid(_quantizer(), 'sell', 100, 101, 4, quantity=0.1)
+    prices, _ = build_grid(_quantizer(), 'Sell', 100, 101, 4, quantity=0.1)
+    assert prices == ['100.00', '100.34', '100.67', '101.00']
+    with pytest.raises(ExchangeException):
+        build_grid(_quantizer(), 'long', 100, 101, 4, quantity=0.1)
+
+
+def test_quote_quantity_and_limits():
+    # 10 quote per level, levels below min notional are dropped
+    prices, quantities = build_grid(_quantizer(), 'buy', 1000, 2000, 3, quote_quantity=[10, 10, 4])
+    assert prices == ['1000.00', '1500.00'] and quantities == ['0.010', '0.006']
+
+
+def test_levels_rounded_to_one_tick_are_merged():
+    prices, _ = build_grid(_quantizer(), 'buy', 100, 100.02, 5, quantity=1, geometric=True)
+    assert prices == ['100.00', '100.01', '100.02']
+    with pytest.raises(ExchangeException):
+        build_grid(_quantizer(), 'buy', 100, 101, 4)
+    with pytest.raises(ExchangeException):
+        build_grid(_quantizer(), 'buy', 101, 100, 4, quantity=1)
@@ -0,0 +1,44 @@
+"""JSON backend selection."""
+import pytest
+
+from excrypt import ExchangeException, KuCoin, jsonlib
+
+
+@pytest.fixture(autouse=True)
+def default_backend():
+    yield
+    jsonlib.set_backend()
+
+
+def test_default_backend_is_the_fastest_installed():
+    try:
+        import orjson
+    except ImportError:
+        assert jsonlib.backend == 'json'
+    else:
+        assert jsonlib.backend == 'orjson'
+
+
+@pytest.mark.parametrize('name', sorted(jsonlib._BACKENDS))
+def test_backends_agree(name):
+    jsonlib.set_backend(name)
+    assert jsonlib.backend == name
+    assert jsonlib.loads(b'{"price": "60000.5", "qty": 1}') == {'price': '60000.5', 'qty': 1}
+    assert jsonlib.loads('[1, 2]') == [1, 2]
+    assert jsonlib.dumps({'symbol': 'BTC-USDT', 'size': '0.1', 'remark': 'é'}) == \
+        '{"symbol":"BTC-USDT","size":"0.1","remark":"é"}'
+    with pytest.raises(ValueError):
+        jsonlib.loads(b'{"price":')
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ExchangeException):
+        jsonlib.set_backend('simplejson')
+
+
+def test_custom_functions_are_used_by_exchanges():
+    dumped = []
+    jsonlib.set_backend('json', custom_dumps=lambda data: dumped.append(data) or 'custom')
+    kwargs = KuCoin('key', 'secret', 'password')._prepare_request('/api/v1/orders', 'post', True,
+                                                                  {'params': {'symbol': 'BTC-USDT'}})[2]
+    assert dumped[-1] == {'symbol': 'BTC-USDT'} and kwargs['data'] == 'custom'
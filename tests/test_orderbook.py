@@ -0,0 +1,61 @@
+"""Order book levels, best prices, depth and VWAP with both book side implementations."""
+import pytest
+
+from excrypt import orderbook
+from excrypt.orderbook import OrderBook, _BisectBookSide, _SortedBookSide
+from excrypt.exceptions import ExchangeException
+
+SIDES = [_BisectBookSide]
+if orderbook.SortedDict is not None:
+    SIDES.append(_SortedBookSide)
+
+
+@pytest.fixture(params=SIDES, ids=lambda side: side.__name__)
+def book(request, monkeypatch):
+    monkeypatch.setattr(orderbook, '_BookSide', request.param)
+    book = OrderBook('BTC/USDT')
+    book.apply_snapshot([['100', '1'], ['99', '2'], ['98', '3']], [['101', '1'], ['102', '2'], ['103', '3']], 10)
+    return book
+
+
+def test_best_levels_follow_updates(book):
+    assert book.best_bid == (100.0, 1.0) and book.best_ask == (101.0, 1.0)
+    assert book.spread == 1.0 and book.mid_price == 100.5
+    book.update([['100.5', '4']], [['100.8', '5']], 11)
+    assert book.best_bid == (100.5, 4.0) and book.best_ask == (100.8, 5.0) and book.update_id == 11
+    # removing the best level exposes the next one
+    book.update([['100.5', '0'], ['100', '0']], [['100.8', '0']])
+    assert book.best_bid == (99.0, 2.0) and book.best_ask == (101.0, 1.0)
+    # levels behind the best one don't change it
+    book.update([['97', '1'], ['99', '0.5']], [['104', '1']])
+    assert book.best_bid == (99.0, 0.5) and book.best_ask == (101.0, 1.0)
+    book.update([['99', '0'], ['98', '0'], ['97', '0']], [])
+    assert book.best_bid is None and book.spread is None and book.mid_price is None
+    book.update([['95', '1']], [])
+    assert book.best_bid == (95.0, 1.0)
+
+
+def test_snapshot_replaces_levels(book):
+    book.apply_snapshot([['90', '1']], [['91', '1']], 20)
+    assert book.best_bid == (90.0, 1.0) and book.best_ask == (91.0, 1.0)
+    assert len(book.bids) == 1 and len(book.asks) == 1 and book.update_id == 20
+
+
+def test_levels_depth_and_vwap(book):
+    pytest.importorskip('numpy')
+    prices, quantities = book.get_levels('bids', 2)
+    assert prices.tolist() == [100.0, 99.0] and quantities.tolist() == [1.0, 2.0]
+    assert book.get_depth('buy', 102) == 3.0
+    assert book.get_depth('sell', 99) == 3.0
+    assert book.get_vwap('buy', 2) == pytest.approx((101 + 102) / 2)
+    assert book.get_vwap('sell', 1.5) == pytest.approx((100 + 99 * 0.5) / 1.5)
+
+
+def test_vwap_errors(book):
+    pytest.importorskip('numpy')
+    with pytest.raises(ExchangeException):
+        book.get_vwap('buy', 0)
+    with pytest.raises(ExchangeException):
+        book.get_vwap('buy', 7)
+    with pytest.raises(ExchangeException):
+        book.get_vwap('long', 1)
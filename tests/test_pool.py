@@ -0,0 +1,75 @@
+"""Connections shared by exchanges mounted on one ConnectionPool."""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from excrypt import Binance, ConnectionPool
+
+TICKER = b'{"symbol": "BTCUSDT", "price": "60000.00"}'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keeps connections open
+
+    def do_GET(self):
+        self.server.headers.append(dict(self.headers))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(TICKER)))
+        self.end_headers()
+        self.wfile.write(TICKER)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    server.headers = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _exchange(server, pool):
+    exchange = Binance(connection_pool=pool, rate_limit=False)
+    exchange._API_URL = f'http://127.0.0.1:{server.server_port}'
+    return exchange
+
+
+def test_exchanges_reuse_pool_connections(server):
+    pool = ConnectionPool(pool_size=2)
+    exchanges = [_exchange(server, pool) for _ in range(3)]
+    assert pool.sessions == 3
+
+    for exchange in exchanges * 2:
+        assert exchange.get_ticker('BTC/USDT').price == 60000.0
+
+    stats = pool.get_stats()['127.0.0.1']
+    assert stats == {'requests': 6, 'hits': 5, 'misses': 1}
+    pool.close()
+
+
+def test_closing_a_session_keeps_pool_open(server):
+    pool = ConnectionPool()
+    first, second = _exchange(server, pool), _exchange(server, pool)
+    first.get_ticker('BTC/USDT')
+    first._session.close()
+    second.get_ticker('BTC/USDT')
+    assert pool.get_stats()['127.0.0.1']['hits'] == 1
+
+    pool.close()
+    assert pool.get_stats() == {}
+
+
+def test_keep_alive_can_be_disabled(server):
+    pool = ConnectionPool(keep_alive=False)
+    exchange = _exchange(server, pool)
+    exchange.get_ticker('BTC/USDT')
+    exchange.get_ticker('BTC/USDT')
+    assert [headers['Connection'] for headers in server.headers] == ['close', 'close']
+    pool.close()
@@ -0,0 +1,51 @@
+"""Rounding of prices and quantities to tick and step sizes, scalars and arrays."""
+import random
+
+import pytest
+
+from excrypt import Quantizer
+from excrypt.exceptions import ExchangeException
+
+ROUNDINGS = (Quantizer.ROUND_DOWN, Quantizer.ROUND_UP, Quantizer.ROUND_NEAREST)
+
+
+def test_scalars_are_rounded_on_decimals():
+    quantizer = Quantizer('0.01', '0.00001', min_quantity='0.0001', min_notional='5')
+    assert quantizer.price_to_str(0.29, Quantizer.ROUND_UP) == '0.29'
+    assert quantizer.price_to_str('60000.125') == '60000.13'
+    assert quantizer.round_price(60000.123, Quantizer.ROUND_DOWN) == 60000.12
+    assert quantizer.quantity_to_str(0.0012345) == '0.00123'
+    assert quantizer.prepare_order(60000.123, 0.0012345) == ('60000.12', '0.00123')
+    assert not quantizer.validate(60000, 0.00005)
+    with pytest.raises(ExchangeException):
+        quantizer.prepare_order(1000, 0.001)
+    with pytest.raises(ExchangeException):
+        quantizer.round_price(1, 'half')
+
+
+def test_tick_sizes_which_are_not_powers_of_ten():
+    quantizer = Quantizer('0.25', '10')
+    assert quantizer.price_to_str(100.4) == '100.50' and quantizer.price_to_str(100.1) == '100.00'
+    assert quantizer.quantity_to_str(129) == '120' and quantizer.price_precision == 2
+
+
+def test_arrays_match_scalars():
+    np = pytest.importorskip('numpy')
+    rng = random.Random(7)
+    values = [round(rng.uniform(-1, 1) * 10 ** rng.randint(-6, 9), rng.randint(0, 17)) for _ in range(3000)]
+    values += [0.29, 50000.29, 0.1 + 0.2, 1 / 3, 123456789.12345679, 0.0]
+    for tick_size in ('0.01', '0.25', '1', '10', '0.00000001'):
+        quantizer = Quantizer(tick_size, tick_size)
+        for rounding in ROUNDINGS:
+            units = quantizer.price.to_units_array(np.array(values), rounding)
+            assert units.tolist() == [quantizer.price.to_units(value, rounding) for value in values]
+            assert quantizer.price_to_str(values, rounding) == [quantizer.price_to_str(value, rounding)
+                                                                for value in values]
+
+
+def test_large_values_with_fine_ticks():
+    np = pytest.importorskip('numpy')
+    quantizer = Quantizer('0.00000001', '0.00000001')
+    assert quantizer.price_to_str(np.array([50000.0, 50000.29])) == ['50000.00000000', '50000.29000000']
+    assert quantizer.price_to_str(50000.29) == '50000.29000000'
+    assert quantizer.validate(np.array([50000.0, 0.0]), np.array([0.001, 0.001])).tolist() == [True, False]
@@ -0,0 +1,65 @@
+"""Token bucket pacing and rate limits calibrated from exchange response headers."""
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from excrypt import RateLimiter, KuCoin, ByBit
+
+
+def _response(status_code=200, **headers):
+    return SimpleNamespace(status_code=status_code, headers=headers)
+
+
+def test_bucket_paces_requests():
+    limiter = RateLimiter(100, interval=1, safety=1)
+    assert limiter.acquire(60) == 0
+    assert limiter.available == pytest.approx(40, abs=1)
+    # 30 more weight refills in 0.3 seconds
+    waited = limiter.acquire(70)
+    assert 0.2 < waited < 0.5
+
+
+def test_bucket_calibration_and_pause():
+    limiter = RateLimiter(100, interval=10, safety=0.5)
+    assert limiter.available == pytest.approx(50)
+    limiter.calibrate(20, limit=200)
+    assert limiter.limit == 200 and limiter.available == pytest.approx(80, abs=1)
+    limiter.pause(0.2)
+    start = time.monotonic()
+    limiter.acquire(1)
+    assert time.monotonic() - start >= 0.19
+
+
+def test_kucoin_limiters_per_resource_pool():
+    exchange = KuCoin()
+    spot, = exchange._get_rate_limiters('/api/v1/orders')
+    public, = exchange._get_rate_limiters('/api/v1/market/allTickers')
+    management, = exchange._get_rate_limiters('/api/v1/accounts')
+    assert spot is exchange._RATE_LIMITER and spot.limit == 4000
+    assert public.limit == 2000 and management.limit == 2000 and public is not management
+    assert exchange._get_rate_limiters('/api/v1/market/orderbook/level2_20') == [public]
+
+    # public quota reported by a market data response does not touch the spot pool
+    exchange._handle_rate_limit('/api/v1/market/allTickers',
+                                _response(**{'gw-ratelimit-limit': '2000', 'gw-ratelimit-remaining': '100'}))
+    # 1900 used of 1900 safe capacity
+    assert public.available < 10
+    assert spot.available == pytest.approx(spot.limit * spot.safety)
+    exchange._handle_rate_limit('/api/v1/orders',
+                                _response(**{'gw-ratelimit-limit': '8000', 'gw-ratelimit-remaining': '7000'}))
+    assert spot.limit == 8000 and public.limit == 2000
+
+    assert KuCoin(rate_limit=False)._get_rate_limiters('/api/v1/market/allTickers') == []
+
+
+def test_bybit_limiters_per_endpoint():
+    exchange = ByBit()
+    assert exchange._get_rate_limiters('/v5/order/create') == [exchange._RATE_LIMITER]
+    exchange._handle_rate_limit('/v5/order/create', _response(**{'X-Bapi-Limit': '10', 'X-Bapi-Limit-Status': '9'}))
+    ip, endpoint = exchange._get_rate_limiters('/v5/order/create')
+    assert ip is exchange._RATE_LIMITER and endpoint.limit == 10 and endpoint.interval == 1
+    assert exchange._get_rate_limiters('/v5/order/realtime') == [exchange._RATE_LIMITER]
+    # 429 pauses every limiter of the endpoint
+    exchange._handle_rate_limit('/v5/order/create', _response(429, **{'Retry-After': '0.5'}))
+    assert ip.available == 0 and endpoint.available == 0
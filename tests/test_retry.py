@@ -0,0 +1,122 @@
+"""Retries of transient failures and idempotency of retried requests."""
+import json
+
+import pytest
+import requests
+
+from excrypt import Binance, ByBit, ExchangeAPIException, RetryPolicy
+from excrypt.exchange import time
+
+ORDER = {'symbol': 'BTCUSDT', 'orderId': 28, 'clientOrderId': 'client-28', 'price': '60000.00',
+         'origQty': '0.001', 'executedQty': '0', 'status': 'NEW', 'type': 'LIMIT', 'side': 'BUY',
+         'transactTime': 1710931501565}
+TICKER = b'{"symbol": "BTCUSDT", "price": "60000.00"}'
+
+
+class _Response:
+
+    def __init__(self, status_code=200, content=b'{}', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.text = content.decode()
+        self.headers = headers or {}
+
+
+def _stub_session(exchange, method, *results):
+    """Answers requests with results in order, exceptions are raised. Returns sent requests."""
+    results = list(results)
+    sent = []
+
+    def send(uri, **kwargs):
+        sent.append(kwargs)
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    setattr(exchange._session, method, send)
+    return sent
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    delays = []
+    monkeypatch.setattr(time, 'sleep', delays.append)
+    return delays
+
+
+def test_policy_delays_grow_within_limits():
+    policy = RetryPolicy(max_retries=20, base_delay=0.5, max_delay=4)
+    delay = None
+    for attempt in range(20):
+        delay = policy.get_delay('/api', attempt, delay)
+        assert 0.5 <= delay <= 4
+    assert policy.get_delay('/api', 20, delay) is None
+    assert policy.get_stats()['/api']['retries'] == 20
+
+
+def test_policy_budgets_and_retry_after():
+    policy = RetryPolicy(max_retries=1, base_delay=0.1, max_delay=0.1, budgets={'/api/v3/exchangeInfo': 3})
+    assert policy.get_delay('/api/v3/order', 1) is None
+    assert policy.get_delay('/api/v3/exchangeInfo', 2) is not None
+    assert policy.get_delay('/api/v3/order', 0, retry_after='7') == 7
+    assert policy.get_delay('/api/v3/order', 0, retry_after='Wed, 21 Oct 2015 07:28:00 GMT') == 0.1
+    assert policy.get_stats()['/api/v3/order'] == {'retries': 2, 'backoff': pytest.approx(7.1)}
+    policy.reset_stats()
+    assert policy.get_stats() == {}
+
+
+def test_get_requests_are_retried(delays):
+    exchange = Binance(rate_limit=False, retry_policy=RetryPolicy(base_delay=0.01, max_delay=0.01))
+    sent = _stub_session(exchange, 'get', requests.exceptions.ConnectionError(), _Response(503),
+                         _Response(429, headers={'Retry-After': '2'}), _Response(content=TICKER))
+    assert exchange.get_ticker('BTC/USDT').price == 60000.0
+    assert len(sent) == 4
+    assert delays == [0.01, 0.01, 2]
+    assert exchange.get_retry_stats()['/api/v3/ticker/price']['retries'] == 3
+
+
+def test_retries_stop_when_budget_is_spent(delays):
+    exchange = Binance(rate_limit=False, retry_policy=RetryPolicy(max_retries=1, base_delay=0, max_delay=0))
+    _stub_session(exchange, 'get', _Response(502), _Response(502, b'bad gateway'))
+    with pytest.raises(ExchangeAPIException, match='502'):
+        exchange.get_ticker('BTC/USDT')
+
+    _stub_session(exchange, 'get', requests.exceptions.Timeout(), requests.exceptions.Timeout())
+    with pytest.raises(requests.exceptions.Timeout):
+        exchange.get_ticker('BTC/USDT')
+
+
+def test_client_errors_are_not_retried(delays):
+    exchange = Binance(rate_limit=False)
+    sent = _stub_session(exchange, 'get', _Response(400, b'{"code": -1121}'))
+    with pytest.raises(ExchangeAPIException, match='400'):
+        exchange.get_ticker('BTC/USDT')
+    assert len(sent) == 1 and delays == []
+
+
+def test_orders_are_retried_with_client_order_id(delays):
+    exchange = Binance('key', 'secret', rate_limit=False, retry_policy=RetryPolicy(base_delay=0, max_delay=0))
+    sent = _stub_session(exchange, 'post', requests.exceptions.ConnectionError(),
+                         _Response(content=json.dumps(ORDER).encode()))
+    order = exchange.create_order('BTC/USDT', 'buy', '0.001', '60000.00')
+    assert order.order_id == '28'
+    # the retry is the same order, signed again
+    client_order_ids = [kwargs['params']['newClientOrderId'] for kwargs in sent]
+    assert client_order_ids[0] and client_order_ids[0] == client_order_ids[1]
+    assert sent[0]['params']['signature'] and 'signature' in sent[1]['params']
+
+
+def test_requests_are_retryable_only_if_idempotent():
+    exchange = Binance('key', 'secret')
+    assert exchange._is_retryable('/api/v3/order', 'get', {})
+    assert exchange._is_retryable('/api/v3/order', 'delete', {})
+    assert exchange._is_retryable('/api/v3/time', None, None)
+    assert not exchange._is_retryable('/api/v3/order', 'post', {'symbol': 'BTCUSDT'})
+    assert exchange._is_retryable('/api/v3/order', 'post', {'newClientOrderId': 'client-28'})
+    assert not Binance('key', 'secret', retry=False)._is_retryable('/api/v3/order', 'get', {})
+
+    bybit = ByBit('key', 'secret')
+    assert bybit._is_retryable('/v5/order/cancel', 'post', {'orderId': '1'})
+    assert not bybit._is_retryable('/v5/order/create', 'post', {'symbol': 'BTCUSDT'})
+    assert bybit._is_retryable('/v5/order/create', 'post', {'orderLinkId': 'client-28'})
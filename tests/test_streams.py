@@ -0,0 +1,644 @@
+"""Streams against a local aiohttp WebSocket server: subscriptions, message normalization and reconnects."""
+import asyncio
+import base64
+import datetime as dt
+import hashlib
+import hmac
+import json
+
+import pytest
+
+aiohttp = pytest.importorskip('aiohttp')
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from excrypt import AsyncBinance, AsyncKuCoin, KuCoin, ByBit, Ticker, Order, Balance, OrderBook
+from excrypt import BinanceStream, ByBitStream, KuCoinStream, BitfinexStream
+from excrypt import BinanceUserStream, ByBitUserStream, KuCoinUserStream
+
+KEY = 'key'
+SECRET = 'secret'
+PASSWORD = 'password'
+
+
+def _hmac(message):
+    return hmac.new(SECRET.encode('utf-8'), message.encode('utf-8'), hashlib.sha256)
+
+
+def _serve(routes, scenario):
+    """
+    Runs scenario(url) against a local server of routes {(method, path): handler}, returns its result.
+    """
+    async def main():
+        app = web.Application()
+        for (method, path), handler in routes.items():
+            app.router.add_route(method, path, handler)
+        async with TestServer(app) as server:
+            return await scenario(str(server.make_url('')).rstrip('/'))
+
+    return asyncio.run(main())
+
+
+def _respond(data, check=None):
+    """Handler returning data as JSON, check(request, body) asserts the request first."""
+    async def handler(request):
+        body = await request.text()
+        if check is not None:
+            check(request, body)
+        return web.json_response(data)
+
+    return handler
+
+
+def _websocket(*connections, wait=1):
+    """
+    WebSocket handler sending connections[i] messages on the i-th connection once wait client messages
+    are received. Every connection but the last one is closed by the server after its messages.
+    Client messages of every connection are kept in handler.received.
+    """
+    received = []
+
+    async def send(ws, index):
+        for message in connections[index]:
+            await ws.send_str(json.dumps(message))
+        if index < len(connections) - 1:
+            await ws.close()
+
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        index = len(received)
+        received.append([])
+        if not wait:
+            await send(ws, index)
+        async for msg in ws:
+            received[index].append(json.loads(msg.data))
+            if len(received[index]) == wait:
+                await send(ws, index)
+        return ws
+
+    handler.received = received
+    return handler
+
+
+async def _collect(stream, count, timeout=5):
+    """Returns the first count events of the stream."""
+    events = stream.__aiter__()
+    try:
+        return [await asyncio.wait_for(events.__anext__(), timeout) for _ in range(count)]
+    finally:
+        await events.aclose()
+
+
+async def _kucoin_bullet(request):
+    """Connect token pointing to /ws of the same server."""
+    endpoint = str(request.url.with_scheme('ws').with_path('/ws').with_query(None))
+    return web.json_response({'code': '200000', 'data': {'token': 'token', 'instanceServers': [
+        {'endpoint': endpoint, 'protocol': 'websocket', 'encrypt': False, 'pingInterval': 18000,
+         'pingTimeout': 10000}]}})
+
+
+KUCOIN_TICKER = {'type': 'message', 'topic': '/market/ticker:BTC-USDT', 'subject': 'trade.ticker',
+                 'data': {'price': '67523', 'time': 1729843222921}}
+
+
+def test_stream_awaits_async_exchange():
+    ws = _websocket([{'type': 'welcome'}, KUCOIN_TICKER])
+    routes = {('POST', '/api/v1/bullet-public'): _kucoin_bullet, ('GET', '/ws'): ws}
+
+    async def scenario(url):
+        async with AsyncKuCoin(KEY, SECRET, PASSWORD) as exchange:
+            exchange._API_URL = url
+            async with KuCoinStream(exchange, reconnect_delay=0.01) as stream:
+                await stream.subscribe_tickers('BTC/USDT')
+                return await _collect(stream, 1)
+
+    [(channel, symbol, ticker)] = _serve(routes, scenario)
+    assert (channel, symbol) == ('ticker', 'BTC/USDT')
+    assert isinstance(ticker, Ticker) and ticker.price_str == '67523' and ticker.timestamp == 1729843222921
+    assert ws.received[0][0]['type'] == 'subscribe' and ws.received[0][0]['topic'] == '/market/ticker:BTC-USDT'
+
+
+BINANCE_TICKER = {'e': '24hrMiniTicker', 'E': 1672515782136, 's': 'BTCUSDT', 'c': '60000.10', 'o': '59000.00'}
+BINANCE_KLINE = {'e': 'kline', 'E': 1672515782136, 's': 'BTCUSDT', 'k': {
+    't': 1672515780000, 'i': '1m', 'o': '60000', 'c': '60010', 'h': '60020', 'l': '59990', 'v': '12.5', 'x': True}}
+
+
+def _assert_candle(candle, timestamp, interval, closed):
+    assert candle['timestamp'] == timestamp and candle['interval'] == interval and candle['closed'] is closed
+    assert candle['date_time'] == dt.datetime.fromtimestamp(timestamp, dt.timezone.utc).replace(tzinfo=None)
+    assert (candle['open'], candle['high'], candle['low'], candle['close']) == (60000.0, 60020.0, 59990.0, 60010.0)
+    assert candle['volume'] == 12.5
+
+
+def test_binance_stream_subscribes_and_normalizes():
+    ws = _websocket([{'result': None, 'id': 1}, BINANCE_TICKER, BINANCE_KLINE])
+
+    async def scenario(url):
+        async with BinanceStream(url=f'{url}/ws') as stream:
+            await stream.subscribe_tickers('BTC/USDT')
+            await stream.subscribe_candles('1m', 'BTC/USDT')
+            return await _collect(stream, 2)
+
+    (ticker_event, candle_event) = _serve({('GET', '/ws'): ws}, scenario)
+    assert ws.received[0] == [{'method': 'SUBSCRIBE', 'params': ['btcusdt@kline_1m', 'btcusdt@miniTicker'], 'id': 1}]
+    channel, symbol, ticker = ticker_event
+    assert (channel, symbol) == ('ticker', 'BTC/USDT')
+    assert ticker.price == 60000.1 and ticker.timestamp == 1672515782136
+    channel, symbol, candle = candle_event
+    assert (channel, symbol) == ('candle', 'BTC/USDT')
+    _assert_candle(candle, 1672515780, '1m', True)
+
+
+def test_bybit_stream_subscribes_and_normalizes():
+    ws = _websocket([
+        {'success': True, 'op': 'subscribe'},
+        {'topic': 'tickers.BTCUSDT', 'ts': 1673853746003, 'type': 'snapshot',
+         'data': {'symbol': 'BTCUSDT', 'lastPrice': '60000.1'}},
+        # linear deltas without the last price are skipped
+        {'topic': 'tickers.BTCUSDT', 'ts': 1673853746004, 'type': 'delta', 'data': {'symbol': 'BTCUSDT'}},
+        {'topic': 'kline.1.BTCUSDT', 'ts': 1672324988882, 'type': 'snapshot', 'data': [
+            {'start': 1672324980000, 'interval': '1', 'open': '60000', 'close': '60010', 'high': '60020',
+             'low': '59990', 'volume': '12.5', 'confirm': False}]},
+    ])
+
+    async def scenario(url):
+        exchange = ByBit()
+        exchange._add_symbol('BTCUSDT', 'BTC/USDT')
+        async with ByBitStream(exchange, url=f'{url}/ws') as stream:
+            await stream.subscribe_tickers('BTC/USDT')
+            await stream.subscribe_candles('1m', 'BTC/USDT')
+            return await _collect(stream, 2)
+
+    (ticker_event, candle_event) = _serve({('GET', '/ws'): ws}, scenario)
+    assert ws.received[0] == [{'op': 'subscribe', 'args': ['kline.1.BTCUSDT', 'tickers.BTCUSDT']}]
+    channel, symbol, ticker = ticker_event
+    assert (channel, symbol) == ('ticker', 'BTC/USDT') and ticker.price == 60000.1
+    channel, symbol, candle = candle_event
+    assert (channel, symbol) == ('candle', 'BTC/USDT')
+    _assert_candle(candle, 1672324980, '1m', False)
+
+
+def test_kucoin_stream_subscribes_and_normalizes():
+    ws = _websocket([
+        {'type': 'welcome'},
+        {'type': 'ack', 'id': 1},
+        {'type': 'message', 'topic': '/market/candles:BTC-USDT_1min', 'subject': 'trade.candles.update',
+         'data': {'symbol': 'BTC-USDT', 'candles': ['1589968800', '60000', '60010', '60020', '59990', '12.5',
+                                                    '750000'], 'time': 1589970010253893337}},
+        KUCOIN_TICKER,
+    ])
+    routes = {('POST', '/api/v1/bullet-public'): _kucoin_bullet, ('GET', '/ws'): ws}
+
+    async def scenario(url):
+        # token of a sync exchange is requested in a thread
+        exchange = KuCoin()
+        exchange._API_URL = url
+        async with KuCoinStream(exchange) as stream:
+            await stream.subscribe_candles('1m', 'BTC/USDT')
+            return await _collect(stream, 2)
+
+    (candle_event, ticker_event) = _serve(routes, scenario)
+    [subscribe] = ws.received[0]
+    assert subscribe['type'] == 'subscribe' and subscribe['topic'] == '/market/candles:BTC-USDT_1min'
+    channel, symbol, candle = candle_event
+    assert (channel, symbol) == ('candle', 'BTC/USDT')
+    _assert_candle(candle, 1589968800, '1m', None)
+    channel, symbol, ticker = ticker_event
+    assert (channel, symbol) == ('ticker', 'BTC/USDT') and ticker.price == 67523.0
+
+
+def test_bitfinex_stream_subscribes_and_normalizes():
+    ws = _websocket([
+        {'event': 'info', 'version': 2},
+        {'event': 'subscribed', 'channel': 'ticker', 'chanId': 224555, 'symbol': 'tBTCUSD', 'pair': 'BTCUSD'},
+        {'event': 'subscribed', 'channel': 'candles', 'chanId': 343351, 'key': 'trade:1m:tBTCUSD'},
+        [224555, 'hb'],
+        [224555, [59999, 1.5, 60001, 2.5, 100, 0.01, 60000.1, 1000, 61000, 59000]],
+        # snapshot, newest first
+        [343351, [[1672515840000, 60000, 60010, 60020, 59990, 12.5],
+                  [1672515780000, 60000, 60010, 60020, 59990, 12.5]]],
+    ], wait=2)
+
+    async def scenario(url):
+        async with BitfinexStream(url=f'{url}/ws') as stream:
+            await stream.subscribe_tickers('BTC/USD')
+            await stream.subscribe_candles('1m', 'BTC/USD')
+            return await _collect(stream, 3)
+
+    (ticker_event, *candle_events) = _serve({('GET', '/ws'): ws}, scenario)
+    assert ws.received[0] == [{'event': 'subscribe', 'channel': 'candles', 'key': 'trade:1m:tBTCUSD'},
+                              {'event': 'subscribe', 'channel': 'ticker', 'symbol': 'tBTCUSD'}]
+    channel, symbol, ticker = ticker_event
+    assert (channel, symbol) == ('ticker', 'BTC/USD') and ticker.price == 60000.1
+    assert [(channel, symbol) for channel, symbol, _ in candle_events] == [('candle', 'BTC/USD')] * 2
+    _assert_candle(candle_events[0][2], 1672515780, '1m', None)
+    _assert_candle(candle_events[1][2], 1672515840, '1m', None)
+
+
+def test_stream_reconnects_and_resubscribes():
+    ws = _websocket([{'result': None, 'id': 1}, BINANCE_TICKER],
+                    [{'result': None, 'id': 2}, dict(BINANCE_TICKER, c='60000.20')])
+
+    async def scenario(url):
+        async with BinanceStream(url=f'{url}/ws', reconnect_delay=0.01) as stream:
+            await stream.subscribe_tickers('BTC/USDT')
+            return await _collect(stream, 2)
+
+    events = _serve({('GET', '/ws'): ws}, scenario)
+    assert [ticker.price for _, _, ticker in events] == [60000.1, 60000.2]
+    assert len(ws.received) == 2
+    assert ws.received[1] == [{'method': 'SUBSCRIBE', 'params': ['btcusdt@miniTicker'], 'id': 2}]
+
+
+def _book_stream(stream, *snapshots):
+    """Replaces REST snapshots of the stream with (update_id, bids, asks) snapshots, returns requested symbols."""
+    requested = []
+
+    async def get_book_snapshot(local_symbol):
+        requested.append(local_symbol)
+        update_id, bids, asks = snapshots[len(requested) - 1]
+        book = OrderBook(stream.exchange._convert_symbol_to_global(local_symbol))
+        book.apply_snapshot(bids, asks, update_id)
+        return book
+
+    stream._get_book_snapshot = get_book_snapshot
+    return requested
+
+
+def _depth(first_id, last_id, bids=(), asks=(), previous_id=None):
+    message = {'e': 'depthUpdate', 'E': 1672515782136, 's': 'BTCUSDT', 'U': first_id, 'u': last_id,
+               'b': [list(level) for level in bids], 'a': [list(level) for level in asks]}
+    if previous_id is not None:
+        message['pu'] = previous_id
+    return message
+
+
+def test_book_syncs_from_snapshot_and_buffered_diffs():
+    async def scenario():
+        stream = BinanceStream(reconnect_delay=0)
+        requested = _book_stream(stream, (100, [['100', '1']], [['101', '1']]))
+        await stream.subscribe_order_book('BTC/USDT')
+        book_sync = stream._book_syncs['BTCUSDT']
+
+        # diffs before the snapshot are buffered, the one older than the snapshot is skipped
+        assert stream._parse_message(_depth(95, 99, bids=[('99', '5')])) == []
+        assert stream._parse_message(_depth(100, 102, bids=[('100', '2')])) == []
+        assert stream._parse_message(_depth(103, 104, asks=[('101', '0'), ('102', '3')])) == []
+        assert not book_sync.synced and len(book_sync.buffer) == 3
+        await book_sync.task
+
+        book = stream.order_books['BTC/USDT']
+        assert requested == ['BTCUSDT']
+        assert book_sync.synced and book_sync.buffer == [] and book_sync.task is None
+        assert book.update_id == 104 and book.best_bid == (100.0, 2.0) and book.best_ask == (102.0, 3.0)
+        assert book.bids.get_quantity(99) == 0.0
+
+        # synced books send an event per diff
+        assert stream._parse_message(_depth(105, 106, bids=[('100.5', '1')])) == [('book', 'BTC/USDT', book)]
+        assert book.best_bid == (100.5, 1.0) and book.update_id == 106
+        # repeated diffs are ignored
+        assert stream._parse_message(_depth(105, 106, bids=[('100.5', '7')])) == []
+        assert book.best_bid == (100.5, 1.0)
+        await stream.close()
+
+    asyncio.run(scenario())
+
+
+def test_book_requests_snapshot_again_when_it_is_older_than_diffs():
+    async def scenario():
+        stream = BinanceStream(reconnect_delay=0)
+        requested = _book_stream(stream, (90, [['100', '1']], []), (101, [['100', '3']], [['101', '1']]))
+        await stream.subscribe_order_book('BTC/USDT')
+        book_sync = stream._book_syncs['BTCUSDT']
+        stream._parse_message(_depth(100, 102, asks=[('101', '2')]))
+        await book_sync.task
+
+        book = stream.order_books['BTC/USDT']
+        assert requested == ['BTCUSDT', 'BTCUSDT']
+        assert book_sync.synced and book.update_id == 102
+        assert book.best_bid == (100.0, 3.0) and book.best_ask == (101.0, 2.0)
+        await stream.close()
+
+    asyncio.run(scenario())
+
+
+def test_book_resyncs_after_gap():
+    async def scenario():
+        stream = BinanceStream(reconnect_delay=0)
+        requested = _book_stream(stream, (100, [['100', '1']], [['101', '1']]),
+                                 (110, [['99', '1']], [['102', '1']]))
+        await stream.subscribe_order_book('BTC/USDT')
+        book_sync = stream._book_syncs['BTCUSDT']
+        stream._parse_message(_depth(101, 101))
+        await book_sync.task
+
+        # update 102-104 is missed
+        assert stream._parse_message(_depth(105, 106, bids=[('100', '9')])) == []
+        assert not book_sync.synced and book_sync.task is None
+        # the next diff starts the resync
+        assert stream._parse_message(_depth(107, 111, bids=[('99', '2')])) == []
+        await book_sync.task
+
+        book = stream.order_books['BTC/USDT']
+        assert requested == ['BTCUSDT', 'BTCUSDT']
+        assert book_sync.synced and book.update_id == 111
+        assert book.best_bid == (99.0, 2.0) and book.best_ask == (102.0, 1.0)
+        await stream.close()
+
+    asyncio.run(scenario())
+
+
+def test_futures_book_checks_previous_update_id():
+    async def scenario():
+        stream = BinanceStream(futures=True, reconnect_delay=0)
+        _book_stream(stream, (100, [['100', '1']], [['101', '1']]))
+        await stream.subscribe_order_book('BTC/USDT')
+        book_sync = stream._book_syncs['BTCUSDT']
+        stream._parse_message(_depth(99, 102, previous_id=98))
+        await book_sync.task
+
+        book = stream.order_books['BTC/USDT']
+        assert stream._parse_message(_depth(103, 105, bids=[('100', '2')], previous_id=102)) == [
+            ('book', 'BTC/USDT', book)]
+        # futures update ids are not consecutive, the previous diff id is checked
+        assert stream._parse_message(_depth(110, 112, previous_id=107)) == []
+        assert not book_sync.synced
+        await stream.close()
+
+    asyncio.run(scenario())
+
+
+def test_kucoin_book_skips_changes_included_in_snapshot():
+    def l2update(sequence_start, sequence_end, bids=(), asks=()):
+        return {'type': 'message', 'topic': '/market/level2:BTC-USDT', 'subject': 'trade.l2update',
+                'data': {'changes': {'bids': [list(level) for level in bids], 'asks': [list(level) for level in asks]},
+                         'sequenceStart': sequence_start, 'sequenceEnd': sequence_end, 'symbol': 'BTC-USDT',
+                         'time': 1663747970273}}
+
+    async def scenario():
+        stream = KuCoinStream(reconnect_delay=0)
+        _book_stream(stream, (101, [['100', '1']], [['101', '1']]))
+        await stream.subscribe_order_book('BTC/USDT')
+        book_sync = stream._book_syncs['BTC-USDT']
+        # change 101 is already in the snapshot, change 102 is not
+        stream._parse_message(l2update(101, 102, bids=[('100', '5', '101')], asks=[('101', '3', '102')]))
+        await book_sync.task
+
+        book = stream.order_books['BTC/USDT']
+        assert book.update_id == 102 and book.best_bid == (100.0, 1.0) and book.best_ask == (101.0, 3.0)
+        await stream.close()
+
+    asyncio.run(scenario())
+
+
+def test_bybit_book_resubscribes_after_gap():
+    def orderbook(type, update_id, bids=(), asks=()):
+        return {'topic': 'orderbook.50.BTCUSDT', 'type': type, 'ts': 1672304484978,
+                'data': {'s': 'BTCUSDT', 'b': [list(level) for level in bids], 'a': [list(level) for level in asks],
+                         'u': update_id, 'seq': 7961638724}}
+
+    ws = _websocket([
+        orderbook('snapshot', 10, bids=[('100', '1')], asks=[('101', '1')]),
+        orderbook('delta', 11, bids=[('100', '2')]),
+        # update 12 is missed
+        orderbook('delta', 13, bids=[('100', '3')]),
+        # answer to subscribing again
+        orderbook('snapshot', 20, bids=[('100', '4')], asks=[('101', '1')]),
+    ])
+
+    async def scenario(url):
+        exchange = ByBit()
+        exchange._add_symbol('BTCUSDT', 'BTC/USDT')
+        async with ByBitStream(exchange, url=f'{url}/ws') as stream:
+            await stream.subscribe_order_book('BTC/USDT')
+            # the same book object is sent with every event
+            events = []
+            async for channel, symbol, book in stream:
+                events.append((channel, symbol, book.update_id, book.best_bid))
+                if len(events) == 3:
+                    break
+            for _ in range(100):
+                if len(ws.received[0]) == 3:
+                    break
+                await asyncio.sleep(0.01)
+            return events
+
+    events = _serve({('GET', '/ws'): ws}, scenario)
+    assert events == [('book', 'BTC/USDT', 10, (100.0, 1.0)), ('book', 'BTC/USDT', 11, (100.0, 2.0)),
+                      ('book', 'BTC/USDT', 20, (100.0, 4.0))]
+    # the snapshot is requested by subscribing again
+    assert ws.received[0][1:] == [{'op': 'unsubscribe', 'args': ['orderbook.50.BTCUSDT']},
+                                  {'op': 'subscribe', 'args': ['orderbook.50.BTCUSDT']}]
+
+
+def _binance_execution_report(order_id, status, executed, quote):
+    return {'e': 'executionReport', 'E': 1710931501565, 's': 'BTCUSDT', 'S': 'BUY', 'o': 'LIMIT', 'q': '0.002',
+            'p': '60000.00', 'X': status, 'i': order_id, 'z': executed, 'Z': quote}
+
+
+def _binance_order(order_id, status, executed, quote):
+    return {'symbol': 'BTCUSDT', 'orderId': order_id, 'price': '60000.00', 'origQty': '0.002',
+            'executedQty': executed, 'cummulativeQuoteQty': quote, 'status': status, 'type': 'LIMIT',
+            'side': 'BUY', 'time': 1710931501565}
+
+
+async def _wait_for(condition, timeout=5):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError('condition is not met')
+
+
+def test_binance_user_stream_reconciles_after_reconnect():
+    listen_keys = []
+    keepalives = []
+    open_orders = []
+
+    async def listen_key(request):
+        assert request.headers['X-MBX-APIKEY'] == KEY
+        listen_keys.append(f'listen-key-{len(listen_keys) + 1}')
+        return web.json_response({'listenKey': listen_keys[-1]})
+
+    async def keepalive(request):
+        keepalives.append(request.query['listenKey'])
+        return web.json_response({})
+
+    async def get_open_orders(request):
+        # order 1 is filled while the stream is reconnecting
+        open_orders.append(request.path)
+        return web.json_response([_binance_order(1, 'NEW', '0', '0')] if len(listen_keys) == 1 else [])
+
+    ws = _websocket([
+        _binance_execution_report(1, 'NEW', '0.00000000', '0.00000000'),
+        {'e': 'outboundAccountPosition', 'E': 1710931501566, 'B': [{'a': 'USDT', 'f': '880.0', 'l': '120.0'}]},
+    ], [
+        {'e': 'outboundAccountPosition', 'E': 1710931501568, 'B': [{'a': 'BTC', 'f': '0.002', 'l': '0'}]},
+    ], wait=0)
+    routes = {
+        ('POST', '/api/v3/userDataStream'): listen_key,
+        ('PUT', '/api/v3/userDataStream'): keepalive,
+        ('GET', '/api/v3/openOrders'): get_open_orders,
+        ('GET', '/api/v3/account'): _respond({'balances': [{'asset': 'USDT', 'free': '880.0', 'locked': '120.0'}]}),
+        ('GET', '/api/v3/order'): _respond(_binance_order(1, 'FILLED', '0.002', '120.0')),
+        ('GET', '/ws/{listen_key}'): ws,
+    }
+
+    async def scenario(url):
+        async with AsyncBinance(KEY, SECRET) as exchange:
+            exchange._API_URL = url
+            async with BinanceUserStream(exchange, reconnect_delay=0.01) as stream:
+                stream._URL = f'{url}/ws'
+                stream._KEEPALIVE_INTERVAL = 0.01
+                events = await _collect(stream, 3)
+                await stream._reconcile_task
+                await _wait_for(lambda: 'listen-key-2' in keepalives)
+                return events, stream.orders, stream.balances
+
+    events, orders, balances = _serve(routes, scenario)
+    assert [event[:2] for event in events] == [('order', 'BTC/USDT'), ('balance', 'USDT'), ('balance', 'BTC')]
+    order = events[0][2]
+    assert isinstance(order, Order) and order.order_id == '1' and order.status == 'new' and order.side == 'buy'
+    assert order.base_asset == 'BTC' and order.quote_asset == 'USDT'
+    assert isinstance(balances['USDT'], Balance) and balances['USDT'].locked == 120.0
+    assert balances['BTC'].free_str == '0.002'
+    # a new listen key is requested on reconnect and kept alive
+    assert listen_keys == ['listen-key-1', 'listen-key-2'] and keepalives[-1] == 'listen-key-2'
+    assert open_orders
+    # the order missed while disconnected is requested by id
+    assert orders['1'].status == 'filled' and orders['1'].qty == 0.002
+
+
+def _bybit_order(order_id, status, executed, value):
+    return {'symbol': 'BTCUSDT', 'orderId': order_id, 'side': 'Buy', 'orderType': 'Limit', 'price': '60000',
+            'qty': '0.002', 'cumExecQty': executed, 'cumExecValue': value, 'orderStatus': status,
+            'updatedTime': '1710931501565', 'category': 'spot'}
+
+
+def test_bybit_user_stream_authenticates_and_reconciles():
+    history = []
+
+    async def order_history(request):
+        history.append(request.query['orderId'])
+        return web.json_response({'retCode': 0, 'result': {'list': [
+            _bybit_order(request.query['orderId'], 'Filled', '0.002', '120')]}})
+
+    ws = _websocket([
+        {'success': True, 'op': 'auth'},
+        {'topic': 'order', 'creationTime': 1710931501565, 'data': [
+            _bybit_order('b2', 'PartiallyFilled', '0.001', '60'),
+            dict(_bybit_order('o1', 'New', '0', '0'), category='option')]},
+        {'topic': 'wallet', 'creationTime': 1710931501566, 'data': [
+            {'accountType': 'UNIFIED', 'coin': [{'coin': 'USDT', 'walletBalance': '1000', 'locked': '60'}]}]},
+    ], wait=2)
+    routes = {
+        ('GET', '/v5/order/realtime'): _respond({'retCode': 0, 'result': {'list': [
+            _bybit_order('b1', 'New', '0', '0'), _bybit_order('b2', 'PartiallyFilled', '0.001', '60')]}}),
+        ('GET', '/v5/account/wallet-balance'): _respond({'retCode': 0, 'result': {'list': [
+            {'accountType': 'UNIFIED', 'coin': [{'coin': 'BTC', 'walletBalance': '0.5', 'locked': ''}]}]}}),
+        ('GET', '/v5/order/history'): order_history,
+        ('GET', '/ws'): ws,
+    }
+
+    async def scenario(url):
+        # REST requests of a sync exchange run in threads
+        exchange = ByBit(KEY, SECRET)
+        exchange._API_URL = url
+        exchange._add_symbol('BTCUSDT', 'BTC/USDT')
+        async with ByBitUserStream(exchange, url=f'{url}/ws') as stream:
+            # order b0 was open before the stream was started
+            stream.orders['b0'] = Order(symbol='BTC/USDT', order_id='b0', status='new')
+            events = await _collect(stream, 2)
+            await stream._reconcile_task
+            return events, stream
+
+    events, stream = _serve(routes, scenario)
+    auth, subscribe = ws.received[0]
+    assert auth['op'] == 'auth' and auth['args'][0] == KEY
+    assert auth['args'][2] == _hmac(f"GET/realtime{auth['args'][1]}").hexdigest()
+    assert subscribe == {'op': 'subscribe', 'args': ['order', 'wallet']}
+
+    (channel, symbol, order), (balance_channel, asset, balance) = events
+    assert (channel, symbol, balance_channel, asset) == ('order', 'BTC/USDT', 'balance', 'USDT')
+    assert order.order_id == 'b2' and order.status == 'partially_filled' and order.qty == 0.001
+    assert balance.free == 940.0 and balance.locked == 60.0
+    # options orders of other categories are skipped
+    assert 'o1' not in stream.orders
+    assert history == ['b0'] and stream.orders['b0'].status == 'filled'
+    assert stream.orders['b1'].status == 'new' and stream.balances['BTC'].free == 0.5
+    assert sorted(order.order_id for order in stream.get_open_orders('BTC/USDT')) == ['b1', 'b2']
+    assert sorted(order.order_id for order in stream.pop_closed_orders()) == ['b0']
+
+
+def _kucoin_rest_order(order_id, active, deal_size):
+    return {'id': order_id, 'symbol': 'BTC-USDT', 'type': 'limit', 'side': 'buy', 'price': '60000', 'size': '0.002',
+            'dealSize': deal_size, 'dealFunds': '{:0.1f}'.format(float(deal_size) * 60000),
+            'createdAt': 1710931501565, 'isActive': active, 'cancelExist': False}
+
+
+def test_kucoin_user_stream_with_async_exchange():
+    def check_signature(request, body):
+        signature_string = request.headers['KC-API-TIMESTAMP'] + request.method + request.path_qs + body
+        assert request.headers['KC-API-KEY'] == KEY
+        assert request.headers['KC-API-SIGN'] == base64.b64encode(_hmac(signature_string).digest()).decode()
+
+    async def bullet(request):
+        check_signature(request, await request.text())
+        return await _kucoin_bullet(request)
+
+    async def orders(request):
+        check_signature(request, '')
+        assert request.query['status'] == 'active'
+        page = int(request.query.get('currentPage', 1))
+        return web.json_response({'code': '200000', 'data': {
+            'totalPage': 2, 'items': [_kucoin_rest_order(f'k{page}', True, '0')]}})
+
+    ws = _websocket([
+        {'type': 'welcome'},
+        {'type': 'message', 'topic': '/spotMarket/tradeOrdersV2', 'subject': 'orderChange', 'data': {
+            'symbol': 'BTC-USDT', 'orderId': 'k9', 'side': 'sell', 'orderType': 'limit', 'type': 'filled',
+            'status': 'done', 'price': '61000', 'size': '0.001', 'filledSize': '0.001', 'ts': 1710931501565000000}},
+        {'type': 'message', 'topic': '/account/balance', 'subject': 'account.balance', 'data': {
+            'currency': 'USDT', 'total': '100', 'available': '40', 'hold': '60',
+            'relationContext': {'tradeType': 'TRADE'}, 'time': '1710931501566'}},
+        {'type': 'message', 'topic': '/account/balance', 'subject': 'account.balance', 'data': {
+            'currency': 'USDT', 'total': '5', 'available': '5', 'hold': '0',
+            'relationContext': {'tradeType': 'MARGIN_TRADE'}, 'time': '1710931501567'}},
+        {'type': 'message', 'topic': '/account/balance', 'subject': 'account.balance', 'data': {
+            'currency': 'BTC', 'total': '1', 'available': '1', 'hold': '0',
+            'relationContext': {'tradeType': 'TRADE'}, 'time': '1710931501568'}},
+    ], wait=2)
+    routes = {
+        ('POST', '/api/v1/bullet-private'): bullet,
+        ('GET', '/api/v1/orders'): orders,
+        ('GET', '/api/v1/orders/k0'): _respond({'code': '200000', 'data': _kucoin_rest_order('k0', False, '0.002')}),
+        ('GET', '/api/v1/accounts'): _respond({'code': '200000', 'data': [
+            {'currency': 'ETH', 'type': 'trade', 'balance': '2', 'available': '1.5', 'holds': '0.5'},
+            {'currency': 'ETH', 'type': 'main', 'balance': '9', 'available': '9', 'holds': '0'}]}),
+        ('GET', '/ws'): ws,
+    }
+
+    async def scenario(url):
+        async with AsyncKuCoin(KEY, SECRET, PASSWORD) as exchange:
+            exchange._API_URL = url
+            async with KuCoinUserStream(exchange) as stream:
+                stream.orders['k0'] = Order(symbol='BTC/USDT', order_id='k0', status='new')
+                events = await _collect(stream, 3)
+                await stream._reconcile_task
+                return events, stream
+
+    events, stream = _serve(routes, scenario)
+    assert [subscribe['topic'] for subscribe in ws.received[0]] == ['/spotMarket/tradeOrdersV2', '/account/balance']
+    assert all(subscribe['privateChannel'] for subscribe in ws.received[0])
+
+    (channel, symbol, order), balance_event, _ = events
+    assert (channel, symbol) == ('order', 'BTC/USDT')
+    assert order.order_id == 'k9' and order.side == 'sell' and order.status == 'filled'
+    assert order.timestamp == 1710931501565 and order.quote_qty == 61.0
+    # margin balances are skipped
+    assert balance_event[:2] == ('balance', 'USDT') and balance_event[2].locked == 60.0
+    assert stream.balances['USDT'].free == 40.0 and stream.balances['ETH'].locked == 0.5
+    # open orders of every page are cached, the missed order is requested by id
+    assert [order.order_id for order in stream.get_open_orders()] == ['k1', 'k2']
+    assert stream.orders['k0'].status == 'filled'
@@ -0,0 +1,64 @@
+"""Symbol conversion: suffix matcher and local/global symbols index."""
+from excrypt import Binance
+from excrypt.symbols import SuffixMatcher
+
+
+def _symbol(base_asset, quote_asset, tick_size='0.01', step_size='0.00001'):
+    return {'symbol': base_asset + quote_asset, 'baseAsset': base_asset, 'quoteAsset': quote_asset,
+            'status': 'TRADING',
+            'filters': [{'filterType': 'PRICE_FILTER', 'tickSize': tick_size},
+                        {'filterType': 'LOT_SIZE', 'minQty': step_size, 'stepSize': step_size},
+                        {'filterType': 'NOTIONAL', 'minNotional': '5.00000000'}]}
+
+
+EXCHANGE_INFO = {'symbols': [_symbol('BTC', 'USDT'), _symbol('ETH', 'BTC', '0.00001', '0.0001'),
+                             _symbol('USDT', 'TRY', '0.01', '1'), _symbol('1000SATS', 'FDUSD', '0.0000001', '1')]}
+
+
+def _exchange():
+    exchange = Binance()
+    exchange._request = lambda endpoint, **kwargs: EXCHANGE_INFO
+    return exchange
+
+
+def test_suffix_matcher_prefers_longest_asset():
+    matcher = SuffixMatcher(['USD', 'USDT', 'BTC', 'T'])
+    assert matcher.split('ETHUSDT') == ('ETH', 'USDT')
+    assert matcher.split('ETHUSD') == ('ETH', 'USD')
+    assert matcher.split('ETHBTC') == ('ETH', 'BTC')
+    assert matcher.split('ETHEUR') is None
+
+
+def test_suffix_matcher_keeps_base_asset_non_empty():
+    matcher = SuffixMatcher(['USDT', 'DT'])
+    assert matcher.match('USDT') == 'DT'
+    assert matcher.split('USDT') == ('US', 'DT')
+    assert SuffixMatcher(['USDT']).split('USDT') is None
+    assert SuffixMatcher().match('BTCUSDT') is None
+
+
+def test_suffix_matcher_add():
+    matcher = SuffixMatcher(['USDT'])
+    matcher.add('FDUSD')
+    assert matcher.split('BTCFDUSD') == ('BTC', 'FDUSD')
+
+
+def test_symbols_index_is_built_from_exchange_info():
+    exchange = _exchange()
+    exchange.get_exchange_info()
+    assert exchange._convert_symbol_to_global('BTCUSDT') == 'BTC/USDT'
+    assert exchange._convert_symbol_to_global('USDTTRY') == 'USDT/TRY'
+    assert exchange._convert_symbol_to_global('1000SATSFDUSD') == '1000SATS/FDUSD'
+    assert exchange._convert_symbol_to_local('ETH/BTC') == 'ETHBTC'
+    assert exchange.symbols_info['ETH/BTC'].original_symbol == 'ETHBTC'
+
+
+def test_unknown_symbols_are_split_with_exchange_quote_assets():
+    exchange = _exchange()
+    exchange.get_exchange_info()
+    # quote assets are replaced by the exchange info ones
+    assert exchange._convert_symbol_to_global('SOLBTC') == 'SOL/BTC'
+    assert exchange._convert_symbol_to_global('SOLEUR') is None
+    # without exchange info the built-in quote assets are used
+    assert Binance()._convert_symbol_to_global('SOLEUR') == 'SOL/EUR'
+    assert Binance()._convert_symbol_to_local('SOL/EUR') == 'SOLEUR'
@@ -0,0 +1,457 @@
+"""Offline micro-benchmarks for excrypt hot paths.
+
+Exchange responses are generated locally, so no network access or API keys are required.
+
+Usage:
+    python tools/benchmark.py [name ...]
+"""
+import base64
+import hashlib
+import hmac
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, fields
+from datetime import datetime
+
+import requests
+
+from excrypt import Binance, ByBit, KuCoin, jsonlib
+from excrypt.dataclasses import SymbolInfo, Balance, Ticker, Order, Trade
+from excrypt.orderbook import SortedDict, _BisectBookSide, _SortedBookSide
+
+
+def _timeit(func, repeat=5):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _timeit_pair(first, second, repeat=5):
+    """Best times of two functions run in turns, so machine load drifts affect both of them."""
+    first_best = second_best = None
+    for _ in range(repeat):
+        first_time = _timeit(first, repeat=1)
+        second_time = _timeit(second, repeat=1)
+        first_best = first_time if first_best is None else min(first_best, first_time)
+        second_best = second_time if second_best is None else min(second_best, second_time)
+    return first_best, second_best
+
+
+def _binance_exchange_info(count):
+    symbols = []
+    for i in range(count):
+        base_asset = f'COIN{i}'
+        symbols.append({
+            'symbol': base_asset + 'USDT',
+            'baseAsset': base_asset,
+            'quoteAsset': 'USDT',
+            'status': 'TRADING',
+            'filters': [
+                {'filterType': 'PRICE_FILTER', 'tickSize': '0.00010000'},
+                {'filterType': 'LOT_SIZE', 'minQty': '0.10000000', 'stepSize': '0.10000000'},
+                {'filterType': 'NOTIONAL', 'minNotional': '5.00000000'},
+            ],
+        })
+    return {'symbols': symbols}
+
+
+def _binance_tickers(count):
+    return [{'symbol': f'COIN{i}USDT', 'price': '1.2234', 'time': 1710931501565} for i in range(count)]
+
+
+def bench_tickers():
+    """get_tickers refresh time by symbols count, should grow linearly."""
+    print('get_tickers refresh')
+    for count in (250, 500, 1000, 2000, 4000):
+        client = Binance()
+        exchange_info = _binance_exchange_info(count)
+        tickers = _binance_tickers(count)
+
+        client._request = lambda endpoint, **kwargs: exchange_info
+        client.get_exchange_info()
+        client._request = lambda endpoint, **kwargs: tickers
+
+        elapsed = _timeit(client.get_tickers)
+        print(f'  {count:>5} symbols: {elapsed * 1000:8.2f} ms, {elapsed / count * 1e6:6.2f} us/symbol')
+
+
+# record definitions before slots and lazy decoding, parsers filled floats and datetimes of every record
+@dataclass
+class _BaselineSymbolInfo:
+    symbol: str = None
+    original_symbol: str = None
+    base_asset: str = None
+    quote_asset: str = None
+    price_precision: int = None
+    price_tick_size: float = None
+    price_tick_size_str: str = None
+    min_quantity: float = None
+    min_quantity_str: str = None
+    quantity_step_size: float = None
+    quantity_step_size_str: str = None
+    quantity_precision: int = None
+    min_order_size: float = None
+    min_order_size_str: str = None
+    status: str = None
+    response: dict = None
+
+
+@dataclass
+class _BaselineBalance:
+    asset: str = None
+    free: float = None
+    free_str: str = None
+    locked: float = None
+    locked_str: str = None
+    total: float = None
+    total_str: str = None
+    timestamp: int = None
+    datetime: datetime = None
+    response: dict = None
+
+
+@dataclass
+class _BaselineTicker:
+    symbol: str = None
+    price: float = None
+    price_str: str = None
+    timestamp: int = None
+    datetime: datetime = None
+    response: dict = None
+
+
+@dataclass
+class _BaselineOrder:
+    symbol: str = None
+    order_id: str = None
+    price: float = None
+    price_str: str = None
+    stop_price: float = None
+    stop_price_str: str = None
+    qty: float = None
+    qty_str: str = None
+    orig_qty: float = None
+    orig_qty_str: str = None
+    quote_qty: float = None
+    quote_qty_str: str = None
+    status: str = None
+    type: str = None
+    side: str = None
+    timestamp: int = None
+    datetime: datetime = None
+    response: dict = None
+
+
+@dataclass
+class _BaselineTrade:
+    symbol: str = None
+    order_id: str = None
+    trade_id: str = None
+    price: float = None
+    price_str: str = None
+    qty: float = None
+    qty_str: str = None
+    quote_qty: float = None
+    quote_qty_str: str = None
+    comm: float = None
+    comm_str: str = None
+    comm_asset: str = None
+    pnl: float = None
+    pnl_str: str = None
+    position: str = None
+    status: str = None
+    type: str = None
+    side: str = None
+    buyer: bool = None
+    maker: bool = None
+    timestamp: int = None
+    datetime: datetime = None
+    response: dict = None
+
+
+def _record_values(record_type):
+    values = {}
+    for field in fields(record_type):
+        # parsers leave lazy fields to be decoded from raw fields
+        if field.name == 'response' or not field.init or 'lazy' in field.metadata:
+            continue
+        if field.name == 'datetime':
+            values[field.name] = datetime(2024, 3, 20, 10, 45, 1)
+        elif field.type is float:
+            values[field.name] = 1234.5678
+        elif field.type is int:
+            values[field.name] = 1710931501565
+        elif field.type is bool:
+            values[field.name] = True
+        elif field.type is str:
+            values[field.name] = field.name.upper()
+    return values
+
+
+def _measure_records(record_type, values, response, count=10000):
+    """response: values of the exchange response kept by every record, None to keep no response."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = []
+    for i in range(count):
+        # build response, floats and datetimes per record like parsers do
+        record = record_type(**{key: (value + i if isinstance(value, float) else
+                                      value.replace(second=i % 60) if isinstance(value, datetime) else value)
+                                for key, value in values.items()})
+        if response is not None:
+            record.response = {key: str(value) for key, value in response.items()}
+        records.append(record)
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return size / count
+
+
+def bench_records_memory():
+    """
+    Bytes per record: records as defined before slots and lazy decoding,
+    slotted records as parsers build them, slotted records without response.
+    """
+    print('records memory, bytes per record')
+    print(f'  {"type":<12}{"baseline":>10}{"slots":>10}{"no response":>14}')
+    for baseline_type, record_type in ((_BaselineSymbolInfo, SymbolInfo), (_BaselineBalance, Balance),
+                                       (_BaselineTicker, Ticker), (_BaselineOrder, Order), (_BaselineTrade, Trade)):
+        baseline_values = _record_values(baseline_type)
+        values = _record_values(record_type)
+        # both record shapes keep the same exchange response
+        baseline = _measure_records(baseline_type, baseline_values, response=values)
+        slotted = _measure_records(record_type, values, response=values)
+        no_response = _measure_records(record_type, values, response=None)
+        print(f'  {record_type.__name__:<12}{baseline:>10.0f}{slotted:>10.0f}{no_response:>14.0f}')
+
+
+def _binance_trades(count):
+    return [{'symbol': 'BTCUSDT', 'id': 28457 + i, 'orderId': 100234 + i, 'price': '4.00000100',
+             'qty': '12.00000000', 'quoteQty': '48.000012', 'commission': '10.10000000',
+             'commissionAsset': 'BNB', 'time': 1499865549590 + i, 'isBuyer': True, 'isMaker': False}
+            for i in range(count)]
+
+
+def bench_lazy_parsing():
+    """Parsing with lazy decoding vs parsing and decoding every field, as eager parsers did."""
+    print('lazy parsing')
+    client = Binance(keep_response=False)
+    exchange_info = _binance_exchange_info(2000)
+    client._request = lambda endpoint, **kwargs: exchange_info
+    client.get_exchange_info()
+
+    trades = _binance_trades(5000)
+    tickers = _binance_tickers(2000)
+
+    def parse_trades():
+        return [client._parse_trade(trade) for trade in trades]
+
+    def parse_and_decode_trades():
+        for trade in parse_trades():
+            trade.price, trade.qty, trade.quote_qty, trade.comm, trade.datetime
+
+    def parse_and_decode_tickers():
+        for ticker in client._parse_tickers(tickers).values():
+            ticker.price, ticker.datetime
+
+    for name, lazy, eager in (('5000 trades', parse_trades, parse_and_decode_trades),
+                              ('2000 tickers', lambda: client._parse_tickers(tickers), parse_and_decode_tickers)):
+        lazy_time = _timeit(lazy)
+        eager_time = _timeit(eager)
+        print(f'  {name:<13} lazy {lazy_time * 1000:7.2f} ms, decoded {eager_time * 1000:7.2f} ms, '
+              f'x{eager_time / lazy_time:.2f}')
+
+
+def _sign_fresh(secret, signature_string):
+    # signing before keyed HMAC state was cached: the secret is encoded and hashed into the key every time
+    return hmac.new(secret.encode('utf-8'), signature_string.encode('utf-8'), hashlib.sha256)
+
+
+def bench_signing(count=100000, repeat=9):
+    """
+    Request signatures, fresh HMAC per request as before vs cached keyed HMAC state and passphrase.
+    A signature takes a few microseconds, so runs are long and interleaved to keep ratios stable.
+    Measured ratios: binance x1.1-1.3 and bybit x1.2, the keyed state saves one hash of the key per request,
+    kucoin x1.9-2.0, the passphrase signature is computed once.
+    Request bodies are serialized with jsonlib on both sides, so only signing is compared.
+    """
+    print('signing, us per signed request')
+    secret = 'NhqPtmdSJYdKjVHjA7PZj4Mge3R5YNiP1e3UZjInClVN65XAbvqqM6A7H5fATj0j'
+    params = {'symbol': 'BTCUSDT', 'side': 'BUY', 'type': 'LIMIT', 'timeInForce': 'GTC', 'quantity': '0.00100',
+              'price': '60000.00', 'recvWindow': 5000, 'timestamp': 1710931501565}
+    timestamp = 1710931501565
+
+    binance = Binance('key', secret)
+    bybit = ByBit('key', secret)
+    kucoin = KuCoin('key', secret, 'password')
+
+    def binance_fresh():
+        _sign_fresh(secret, binance._generate_query_string(params)).hexdigest()
+
+    def bybit_fresh():
+        _sign_fresh(secret, str(timestamp) + 'key' + bybit._RECV_WINDOW + jsonlib.dumps(params)).hexdigest()
+
+    def kucoin_fresh():
+        signature_string = str(timestamp) + 'POST' + '/api/v1/orders' + kucoin._json_dumps(params)
+        base64.b64encode(_sign_fresh(secret, signature_string).digest())
+        base64.b64encode(_sign_fresh(secret, 'password').digest())
+
+    def kucoin_cached():
+        kucoin._generate_signature('post', timestamp, '/api/v1/orders', params)
+        kucoin._generate_passphrase()
+
+    for name, fresh, cached in (
+            ('binance', binance_fresh, lambda: binance._generate_signature('get', timestamp, '', params)),
+            ('bybit', bybit_fresh, lambda: bybit._generate_signature('post', timestamp, '', params)),
+            ('kucoin', kucoin_fresh, kucoin_cached)):
+        fresh_time, cached_time = (elapsed / count for elapsed in _timeit_pair(
+            lambda: [fresh() for _ in range(count)], lambda: [cached() for _ in range(count)], repeat))
+        print(f'  {name:<8} fresh {fresh_time * 1e6:6.2f} us, cached {cached_time * 1e6:6.2f} us, '
+              f'x{fresh_time / cached_time:.2f}')
+
+
+class _FakeResponse:
+    status_code = 200
+    headers = {'X-MBX-USED-WEIGHT-1M': '10'}
+    text = ''
+
+    def __init__(self, data):
+        self.content = json.dumps(data).encode('utf-8')
+
+
+class _FakeSession:
+    """Records when a request would be written to the socket."""
+
+    def __init__(self, response):
+        self.response = response
+        self.written = None
+
+    def post(self, url, **kwargs):
+        self.written = time.perf_counter()
+        return self.response
+
+
+def bench_prepared_order(count=20000):
+    """Python time from the order decision to the socket write, create_order vs PreparedOrder.send."""
+    print('order hot path, us from call to socket write')
+    client = Binance('key', 'NhqPtmdSJYdKjVHjA7PZj4Mge3R5YNiP1e3UZjInClVN65XAbvqqM6A7H5fATj0j',
+                     rate_limit=False, keep_response=False)
+    exchange_info = _binance_exchange_info(2000)
+    client._request = lambda endpoint, **kwargs: exchange_info
+    client.get_exchange_info()
+    del client._request
+
+    order = {'symbol': 'COIN1USDT', 'orderId': 28, 'clientOrderId': '6gCrw2kRUAF9CvJDGP16IP', 'price': '1.2234',
+             'origQty': '10.0', 'executedQty': '0.0', 'cummulativeQuoteQty': '0.0', 'status': 'NEW',
+             'type': 'LIMIT', 'side': 'BUY', 'transactTime': 1507725176595}
+    client._session = session = _FakeSession(_FakeResponse(order))
+    prepared = client.prepare_order('COIN1/USDT', 'buy')
+
+    def measure(send):
+        def run():
+            total = 0
+            for _ in range(count):
+                started = time.perf_counter()
+                send()
+                total += session.written - started
+            return total
+        return min(run() for _ in range(5)) / count
+
+    create_time = measure(lambda: client.create_order('COIN1/USDT', 'buy', '10.0', '1.2234'))
+    prepared_time = measure(lambda: prepared.send('10.0', '1.2234'))
+    print(f'  create_order {create_time * 1e6:6.2f} us, prepared {prepared_time * 1e6:6.2f} us, '
+          f'x{create_time / prepared_time:.2f}')
+
+
+def _requests_response(data):
+    response = requests.models.Response()
+    response.status_code = 200
+    response._content = json.dumps(data).encode('utf-8')
+    return response
+
+
+def bench_json_parsing():
+    """
+    Response parse time per endpoint: requests Response.json() vs _handle_response with every JSON backend.
+    Response.json() parses with the stdlib json module, so the json column is the same serializer
+    and shows the overhead of the response handling itself, other columns show the backend gain.
+    """
+    print(f'json parsing, ms per response, default backend {jsonlib.backend}')
+    exchange_info = _binance_exchange_info(2000)
+    for info in exchange_info['symbols']:
+        info.update({'baseAssetPrecision': 8, 'quoteAssetPrecision': 8, 'orderTypes': ['LIMIT', 'MARKET'],
+                     'permissions': ['SPOT', 'MARGIN'], 'isSpotTradingAllowed': True})
+    kucoin_tickers = {'code': '200000', 'data': {'time': 1710931501565, 'ticker': [
+        {'symbol': f'COIN{i}-USDT', 'last': '1.2234', 'buy': '1.2233', 'sell': '1.2235', 'vol': '123456.789',
+         'volValue': '151234.56', 'changeRate': '0.0123'} for i in range(2000)]}}
+    endpoints = (
+        (Binance, '/api/v3/exchangeInfo', exchange_info),
+        (Binance, '/api/v3/ticker/price', _binance_tickers(2000)),
+        (Binance, '/api/v3/myTrades', _binance_trades(1000)),
+        (KuCoin, '/api/v1/market/allTickers', kucoin_tickers),
+    )
+
+    backends = list(jsonlib._BACKENDS)
+    print(f'  {"endpoint":<28}{"size":>9}{"Response.json":>15}' + ''.join(f'{name:>10}' for name in backends))
+    for exchange, endpoint, data in endpoints:
+        response = _requests_response(data)
+        row = f'  {endpoint:<28}{len(response.content) / 1024:>7.0f}KB{_timeit(response.json) * 1000:>15.2f}'
+        for name in backends:
+            jsonlib.set_backend(name)
+            row += f'{_timeit(lambda: exchange._handle_response(response)) * 1000:>10.2f}'
+        print(row)
+    jsonlib.set_backend()
+
+
+def bench_order_book(updates=20000):
+    """Order book level updates by book depth: bisect-sorted lists vs SortedDict."""
+    print('order book updates, us per level update')
+    sides = [('bisect', _BisectBookSide)]
+    if SortedDict is not None:
+        sides.append(('SortedDict', _SortedBookSide))
+    print(f'  {"levels":>7}' + ''.join(f'{name:>12}' for name, _ in sides))
+    for depth in (100, 1000, 10000, 100000, 300000):
+        # a diff stream near the top of the book: half of updates add or remove levels
+        prices = [60000 - i * 0.01 for i in range(depth * 2)]
+        stream = [(prices[(i * 7919) % (depth * 2)], float(i % 2)) for i in range(updates)]
+        row = f'  {depth:>7}'
+        for _, side_type in sides:
+            best = None
+            for _ in range(3):
+                # a fresh book for every run, the stream inserts and removes levels only once
+                side = side_type(descending=True)
+                for price in prices[:depth * 2:2]:
+                    side.update(price, 1.0)
+                started = time.perf_counter()
+                for price, quantity in stream:
+                    side.update(price, quantity)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            row += f'{best / updates * 1e6:>12.3f}'
+        print(row)
+
+
+BENCHMARKS = {
+    'tickers': bench_tickers,
+    'records_memory': bench_records_memory,
+    'lazy_parsing': bench_lazy_parsing,
+    'signing': bench_signing,
+    'prepared_order': bench_prepared_order,
+    'json_parsing': bench_json_parsing,
+    'order_book': bench_order_book,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main()